@@ -0,0 +1,223 @@
+## \file ../src/advertisement/facebook/browser_daemon.py
+# -*- coding: utf-8 -*-
+# /path/to/interpreter/python
+"""
+Pre-warmed browser daemon.
+
+The daemon keeps one or more Chrome instances running with a remote-debugging port and a
+persistent profile, logged in and sitting on Facebook. Entry points attach to a running
+instance instead of cold-starting Chrome:
+
+    python -m src.advertisement.facebook.browser_daemon --instances 2 --profile-template <logged-in profile dir>
+
+A new instance profile starts as a copy of the template (`--profile-template` or the
+`FACEBOOK_PROFILE_TEMPLATE` environment variable), so it carries the Facebook session. An
+instance that still lands on the login page is logged in with the `login` scenario.
+
+    >>> d = attach_or_launch()              # attaches in well under a second
+    >>> promoter = FacebookPromoter(d, group_file_paths=files)
+
+`quit()` of an attached driver only stops chromedriver; the browser stays warm for the next run.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import time
+import urllib.request
+from pathlib import Path
+
+from selenium import webdriver
+
+from src import gs
+from src.webdriver import Driver, Chrome
+from src.logger import logger
+from src.advertisement.facebook.browser_profile import chrome_arguments, browser_pid, psutil
+
+DEFAULT_PORT: int = 9222
+START_URL: str = r"https://www.facebook.com"
+PROFILES_DIR: Path = gs.path.data / 'facebook' / 'browser_profiles'
+# Файлы блокировки работающего Chrome не копируются в новый профиль
+PROFILE_LOCKS: tuple[str, ...] = ('Singleton*', 'lockfile', '*.lock')
+LOGIN_FORM_SCRIPT: str = "return !!document.querySelector('input[name=\"pass\"]');"
+
+CHROME_CANDIDATES: tuple[str, ...] = (
+    'google-chrome',
+    'google-chrome-stable',
+    'chromium',
+    'chromium-browser',
+    'chrome',
+    r'C:\Program Files\Google\Chrome\Application\chrome.exe',
+    r'C:\Program Files (x86)\Google\Chrome\Application\chrome.exe',
+    '/Applications/Google Chrome.app/Contents/MacOS/Google Chrome',
+)
+
+
+class AttachedChrome(webdriver.Chrome):
+    """ Chrome driver attached to a browser started with `--remote-debugging-port`. """
+
+    def __init__(self, port: int = DEFAULT_PORT, *args, **kwargs):
+        options = webdriver.ChromeOptions()
+        options.debugger_address = f"127.0.0.1:{port}"
+        super().__init__(options=options)
+        self.port = port
+
+    def quit(self):
+        """ Detaches: stops chromedriver and leaves the browser running. """
+        self.service.stop()
+
+
+def chrome_binary() -> str:
+    """ Chrome executable: `CHROME_BINARY` environment variable or the first known installation. """
+    if os.environ.get('CHROME_BINARY'):
+        return os.environ['CHROME_BINARY']
+    for candidate in CHROME_CANDIDATES:
+        found = shutil.which(candidate) or (candidate if Path(candidate).exists() else None)
+        if found:
+            return found
+    raise FileNotFoundError("Chrome executable not found, set CHROME_BINARY")
+
+
+def is_alive(port: int = DEFAULT_PORT, timeout: float = 0.5) -> bool:
+    """ Checks whether a browser answers on the remote-debugging port. """
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/json/version", timeout=timeout) as response:
+            return bool(json.load(response).get('webSocketDebuggerUrl'))
+    except (OSError, ValueError):
+        return False
+
+
+def profile_template() -> Path | None:
+    """ Logged-in Chrome profile new instances start from: `FACEBOOK_PROFILE_TEMPLATE` environment variable. """
+    template = os.environ.get('FACEBOOK_PROFILE_TEMPLATE')
+    return Path(template) if template else None
+
+
+def launch_browser(port: int = DEFAULT_PORT, profile: str = None, wait: float = 30, template: str | Path = None) -> subprocess.Popen:
+    """ Starts Chrome with a remote-debugging port and a persistent profile.
+
+    Args:
+        port (int, optional): Remote-debugging port. Defaults to 9222.
+        profile (str, optional): Profile name in `data/facebook/browser_profiles`. Defaults to `port_<port>`.
+        wait (float, optional): Seconds to wait for the debugging endpoint. Defaults to 30.
+        template (str | Path, optional): Logged-in profile copied into a profile that does not exist yet. Defaults to `profile_template()`.
+    """
+    profile_dir = PROFILES_DIR / (profile or f"port_{port}")
+    template = Path(template) if template else profile_template()
+    if not profile_dir.exists() and template and template.exists():
+        shutil.copytree(template, profile_dir, ignore=shutil.ignore_patterns(*PROFILE_LOCKS))
+        logger.info(f"Profile {profile_dir} copied from {template}")
+    profile_dir.mkdir(parents=True, exist_ok=True)
+    process = subprocess.Popen(
+        [chrome_binary(), f"--remote-debugging-port={port}", f"--user-data-dir={profile_dir}", *chrome_arguments(), START_URL],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + wait
+    while not is_alive(port):
+        if process.poll() is not None or time.monotonic() > deadline:
+            raise RuntimeError(f"Chrome did not start on port {port}")
+        time.sleep(0.2)
+    logger.info(f"Chrome started on port {port} with profile {profile_dir}")
+    return process
+
+
+def stop_browser(d: Driver, port: int = DEFAULT_PORT, wait: float = 15) -> bool:
+    """ Closes the daemon browser on `port`, so that the next `attach_or_launch` gets a fresh one.
+
+    The profile stays on disk, the session of the new browser is the same.
+
+    Returns:
+        bool: `True` if the port no longer answers.
+    """
+    try:
+        d.execute_cdp_cmd('Browser.close', {})
+    except Exception as ex:
+        logger.debug(f"Browser.close on port {port} failed: {ex}", None, False)
+    deadline = time.monotonic() + wait
+    while is_alive(port) and time.monotonic() < deadline:
+        pid = browser_pid(port)
+        if pid:
+            try:
+                psutil.Process(pid).terminate()
+            except psutil.Error:
+                pass
+        time.sleep(0.5)
+    return not is_alive(port)
+
+
+def on_facebook(d: Driver) -> bool:
+    """ Checks whether the current tab is a Facebook page of a logged-in session, not the login page. """
+    try:
+        url = d.current_url or ''
+        return 'facebook.com' in url and '/login' not in url and not d.execute_script(LOGIN_FORM_SCRIPT)
+    except Exception:
+        return False
+
+
+def log_in(d: Driver, wait: float = 5) -> bool:
+    """ Logs the browser in with the `login` scenario and checks that the login page is gone. """
+    from src.advertisement.facebook.scenarios.login import login
+    try:
+        if not login(d):
+            return False
+    except Exception as ex:
+        logger.error("Facebook login failed", ex)
+        return False
+    d.wait(wait)
+    return on_facebook(d)
+
+
+def attach_or_launch(port: int = DEFAULT_PORT, launch: bool = True) -> Driver:
+    """ Attaches to the daemon browser on `port`; starts one if there is none.
+
+    Args:
+        port (int, optional): Remote-debugging port. Defaults to 9222.
+        launch (bool, optional): Start a browser on the port if none answers. Otherwise fall back to `Driver(Chrome)`
+            with the configured Chrome profile.
+
+    Returns:
+        Driver: Driver on a Facebook page.
+    """
+    if not is_alive(port):
+        if not launch:
+            d = Driver(Chrome)
+            d.get_url(START_URL)
+            return d
+        launch_browser(port)
+    d = Driver(AttachedChrome, port=port)
+    if not on_facebook(d):
+        d.get_url(START_URL)
+        if not on_facebook(d) and not log_in(d):
+            logger.error(f"Browser on port {port} is not logged in to Facebook, start the daemon with --profile-template")
+    return d
+
+
+def serve(instances: int = 1, base_port: int = DEFAULT_PORT, check_interval: float = 10, template: str | Path = None):
+    """ Keeps `instances` browsers on consecutive ports alive and restarts those that exit. """
+    processes: dict[int, subprocess.Popen | None] = {}
+    for port in range(base_port, base_port + instances):
+        processes[port] = None if is_alive(port) else launch_browser(port, template=template)
+    logger.info(f"Browser daemon serving ports {base_port}-{base_port + instances - 1}")
+    try:
+        while True:
+            time.sleep(check_interval)
+            for port in processes:
+                if not is_alive(port):
+                    logger.info(f"Browser on port {port} is gone, restarting")
+                    processes[port] = launch_browser(port, template=template)
+    except KeyboardInterrupt:
+        for process in processes.values():
+            if process:
+                process.terminate()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Keep warm Chrome instances for Facebook promoters")
+    parser.add_argument('--instances', type=int, default=1)
+    parser.add_argument('--base-port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--profile-template', type=Path, help="Logged-in Chrome profile copied into new instance profiles")
+    args = parser.parse_args()
+    serve(args.instances, args.base_port, template=args.profile_template)
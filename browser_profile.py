@@ -0,0 +1,216 @@
+## \file ../src/advertisement/facebook/browser_profile.py
+# -*- coding: utf-8 -*-
+# /path/to/interpreter/python
+"""
+Resource-light browser profile for posting workers.
+
+A posting worker only needs the group page shell, the composer and the upload flow. Feed
+videos, ads, trackers and (optionally) feed images are blocked through CDP request blocking
+(`Network.setBlockedURLs`) without a restart. CDP commands of a driver reach only its current
+tab, so the blocking holds for every page loaded in that tab; `tabs.open_tabs` applies the
+same profile to each tab it opens (`apply_to_tab`). Facebook's own scripts and styles
+(`static.xx.fbcdn.net`) and the upload endpoints (`upload.facebook.com`, `rupload.facebook.com`,
+`vupload*.facebook.com`) are never matched: media patterns are limited to the `fbcdn.net` CDN.
+
+Browsers started by `browser_daemon` get the light profile's command line (`chrome_arguments`).
+
+Run the module to compare memory use and load time of the default and the light profile:
+    python -m src.advertisement.facebook.browser_profile https://www.facebook.com/groups/<id>/ --runs 3
+"""
+
+import argparse
+import statistics
+import time
+
+from src.webdriver import Driver, Chrome
+from src.logger import logger
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+# Feed video: progressive and DASH segments from the media CDN.
+VIDEO_URL_PATTERNS: list[str] = [
+    '*video*.fbcdn.net/*',
+    '*.fbcdn.net/*.mp4*',
+    '*.fbcdn.net/*.m4s*',
+    '*.fbcdn.net/*.webm*',
+]
+
+# Ads, pixels, telemetry and third-party scripts; none of them is used by the composer.
+TRACKER_URL_PATTERNS: list[str] = [
+    '*facebook.com/tr/*',
+    '*facebook.com/tr?*',
+    '*facebook.com/ajax/bz*',
+    '*facebook.com/ajax/bnzai*',
+    '*facebook.com/security/hsts-pixel*',
+    '*an.facebook.com/*',
+    '*connect.facebook.net/*',
+    '*doubleclick.net/*',
+    '*googlesyndication.com/*',
+    '*google-analytics.com/*',
+    '*googletagmanager.com/*',
+]
+
+# Feed pictures and profile photos. Previews of uploaded media are `blob:` URLs and stay visible.
+IMAGE_URL_PATTERNS: list[str] = [
+    '*scontent*.fbcdn.net/*',
+    '*external*.fbcdn.net/*',
+]
+
+# Chrome arguments for browsers started with their own command line (`browser_daemon`).
+CHROME_ARGUMENTS: list[str] = [
+    '--autoplay-policy=user-gesture-required',
+    '--disable-background-networking',
+    '--disable-component-update',
+    '--disable-default-apps',
+    '--disable-extensions',
+    '--disable-sync',
+    '--mute-audio',
+    '--no-first-run',
+    '--renderer-process-limit=2',
+]
+
+
+def blocked_url_patterns(block_images: bool = False) -> list[str]:
+    """ Patterns blocked by the light profile. """
+    return VIDEO_URL_PATTERNS + TRACKER_URL_PATTERNS + (IMAGE_URL_PATTERNS if block_images else [])
+
+
+def chrome_arguments(block_images: bool = False) -> list[str]:
+    """ Chrome command line arguments of the light profile. """
+    return CHROME_ARGUMENTS + (['--blink-settings=imagesEnabled=false'] if block_images else [])
+
+
+def apply_light_profile(d: Driver, block_images: bool = False) -> list[str]:
+    """ Blocks heavy and irrelevant requests in a running browser.
+
+    Args:
+        d (Driver): Driver of a Chromium based browser.
+        block_images (bool, optional): Also block feed images. Defaults to False.
+
+    Returns:
+        list[str]: The blocked URL patterns.
+
+    Example:
+        >>> d = Driver(Chrome)
+        >>> apply_light_profile(d)
+        >>> d.get_url('https://www.facebook.com/groups/<id>/')
+    """
+    patterns = blocked_url_patterns(block_images)
+    apply_to_tab(d, patterns)
+    d.blocked_url_patterns = patterns  # <- `tabs.open_tabs` повторяет профиль в новых вкладках
+    logger.debug(f"Light browser profile: {len(patterns)} blocked URL patterns", None, False)
+    return patterns
+
+
+def apply_to_tab(d: Driver, patterns: list[str]):
+    """ Blocks `patterns` and media autoplay in the current tab of the driver. """
+    d.execute_cdp_cmd('Network.enable', {})
+    d.execute_cdp_cmd('Network.setBlockedURLs', {'urls': patterns})
+    # Videos that are already in the DOM are not downloaded, but they must not start playing either.
+    d.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {
+        'source': "HTMLMediaElement.prototype.play = function () { this.pause(); return Promise.resolve(); };"
+    })
+
+
+def browser_pid(port: int) -> int | None:
+    """ PID of the browser listening on a remote-debugging port (a `browser_daemon` instance). """
+    if not psutil or not port:
+        return None
+    try:
+        for conn in psutil.net_connections(kind='tcp'):
+            if conn.status == psutil.CONN_LISTEN and conn.laddr and conn.laddr.port == port and conn.pid:
+                return conn.pid
+    except psutil.Error:
+        pass
+    return None
+
+
+def browser_memory_mb(d: Driver) -> float | None:
+    """ Resident memory of the browser and all its child processes in MB, `None` if it cannot be measured.
+
+    An attached browser (`browser_daemon.AttachedChrome`) is found by the process listening on
+    its debugging port; a browser started by chromedriver is a child of the chromedriver process.
+    Needs `psutil`: the JS heap of one page says nothing about the memory of the browser.
+    """
+    if not psutil:
+        return None
+    pid = browser_pid(getattr(d, 'port', None))
+    if not pid:
+        process = getattr(getattr(d, 'service', None), 'process', None)
+        pid = process.pid if process else None
+    if not pid:
+        return None
+    try:
+        root = psutil.Process(pid)
+        return sum(p.memory_info().rss for p in [root, *root.children(recursive=True)]) / 2**20
+    except psutil.Error:
+        return None
+
+
+def page_metrics(d: Driver) -> dict[str, float]:
+    """ `Performance.getMetrics` of the current page as a dict. """
+    d.execute_cdp_cmd('Performance.enable', {})
+    return {m['name']: m['value'] for m in d.execute_cdp_cmd('Performance.getMetrics', {})['metrics']}
+
+
+def measure_page(d: Driver, url: str) -> dict[str, float]:
+    """ Loads a page and returns its load time, transferred bytes and memory use. """
+    start = time.monotonic()
+    d.get_url(url)
+    wall = time.monotonic() - start
+    timing = d.execute_script("""
+        const nav = performance.getEntriesByType('navigation')[0];
+        const resources = performance.getEntriesByType('resource');
+        return {
+            load: nav ? nav.loadEventEnd : 0,
+            dom_content_loaded: nav ? nav.domContentLoadedEventEnd : 0,
+            requests: resources.length,
+            transfer: resources.reduce((sum, r) => sum + (r.transferSize || 0), 0),
+        };
+    """)
+    metrics = page_metrics(d)
+    return {
+        'wall_s': wall,
+        'load_ms': timing['load'],
+        'dom_content_loaded_ms': timing['dom_content_loaded'],
+        'requests': timing['requests'],
+        'transfer_mb': timing['transfer'] / 2**20,
+        'js_heap_mb': metrics.get('JSHeapUsedSize', 0) / 2**20,
+        'dom_nodes': metrics.get('Nodes', 0),
+        'browser_mb': browser_memory_mb(d) or 0,
+    }
+
+
+def benchmark(urls: list[str], runs: int = 3, block_images: bool = False) -> dict[str, dict[str, float]]:
+    """ Loads the pages with the default and with the light profile, one fresh browser per profile.
+
+    Returns:
+        dict[str, dict[str, float]]: Median of every measurement per profile.
+    """
+    results = {}
+    for profile in ('default', 'light'):
+        d = Driver(Chrome)
+        try:
+            if profile == 'light':
+                apply_light_profile(d, block_images)
+            samples = [measure_page(d, url) for _ in range(runs) for url in urls]
+        finally:
+            d.quit()
+        results[profile] = {key: statistics.median(s[key] for s in samples) for key in samples[0]}
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the default and the light browser profile on group pages")
+    parser.add_argument('urls', nargs='+', help="Group pages; the browser profile must be logged in")
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--block-images', action='store_true')
+    args = parser.parse_args()
+
+    results = benchmark(args.urls, args.runs, args.block_images)
+    print(f"{'':<24}{'default':>12}{'light':>12}")
+    for key in results['default']:
+        print(f"{key:<24}{results['default'][key]:>12.1f}{results['light'][key]:>12.1f}")
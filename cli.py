@@ -0,0 +1,214 @@
+## \file ../src/advertisement/facebook/cli.py
+# -*- coding: utf-8 -*-
+# /path/to/interpreter/python
+"""
+Command line runner for `FacebookPromoter`.
+
+Groups are sharded across worker processes by a stable hash of the group URL; every
+worker runs its own browser and promotes only the groups of its shard. Exit status and
+stats of all workers are aggregated.
+
+Examples:
+    python -m src.advertisement.facebook.cli --campaigns pain --groups ru_il.json he_il.json --workers 2
+    python -m src.advertisement.facebook.cli --mode event --events events.json --exclude my_managed_groups.json
+    python -m src.advertisement.facebook.cli --daemon --exclude my_managed_groups.json --attach
+"""
+
+import argparse
+import multiprocessing as mp
+import queue
+import sys
+from collections import Counter
+from datetime import datetime, timedelta
+from pathlib import Path
+from types import SimpleNamespace
+
+from src import gs
+from src.utils import get_filenames, j_loads_ns
+from src.logger import logger
+from src.advertisement.facebook.group_store import is_group_file
+from src.advertisement.facebook.group_loader import load_group_files
+from src.advertisement.facebook.verification import VerificationQueue, apply_verifications, run_verifier
+from src.advertisement.facebook.sharding import shard_of
+
+
+def load_events(path: str | Path) -> list[SimpleNamespace]:
+    """ Loads events from a JSON file: either a list of events or an object `{event_name: event}`. """
+    events = j_loads_ns(Path(path))
+    if isinstance(events, list):
+        return events
+    result = []
+    for event_name, event in vars(events).items():
+        if not hasattr(event, 'event_name'):
+            event.event_name = event_name
+        result.append(event)
+    return result
+
+
+def resolve_group_files(groups: list[str] = None, exclude: list[str] = None) -> list[str]:
+    """ Group files to process: the given ones or all `.json`/`.jsonl` files in `data/facebook/groups`, minus exclusions. """
+    files = groups or [f for f in get_filenames(gs.path.data / 'facebook' / 'groups') if is_group_file(f)]
+    return [f for f in files if f not in set(exclude or [])]
+
+
+def run_shard(shard: int, workers: int, options: dict, file_lock, results) -> None:
+    """ Worker process: starts a browser and promotes the groups of one shard.
+
+    Args:
+        shard (int): Shard number of this worker.
+        workers (int): Total number of shards.
+        options (dict): Parsed command line options.
+        file_lock: Lock shared by the workers for merging group file updates.
+        results: Queue for the stats of this worker.
+    """
+    from src.webdriver import Driver, Chrome
+    from src.advertisement.facebook.promoter import FacebookPromoter
+    from src.advertisement.facebook.browser_profile import apply_light_profile
+    from src.advertisement.facebook.driver_recycler import DriverRecycler
+    from src.advertisement.facebook.browser_daemon import attach_or_launch
+    from src.advertisement.facebook.promoter_daemon import PromoterDaemon
+    from src.advertisement.facebook.profiling import RunProfiler
+
+    def new_driver() -> Driver:
+        d = attach_or_launch(options['attach'] + shard) if options['attach'] else Driver(Chrome)
+        if options['light_profile']:
+            apply_light_profile(d, block_images=options['block_images'])
+        return d
+
+    recycler = DriverRecycler(new_driver, max_pages=options['recycle_pages'], max_memory_mb=options['recycle_memory_mb'],
+                              cookies_path=gs.path.tmp / 'facebook_cookies' / f"shard_{shard}.json")
+    d = recycler.start()
+    if options['verify']:
+        recycler.save_cookies(d)  # <- сессия для браузера проверки (`verification.verifier_driver`)
+    profiler = RunProfiler(gs.path.tmp / 'facebook_profiles' / f"{options['started']}_shard_{shard}").start() if options['profile'] else None
+    promoter = FacebookPromoter(d, group_file_paths=options['group_files'], no_video=options['no_video'],
+                                trace=options['trace'], shard=(shard, workers), file_lock=file_lock, recycler=recycler,
+                                repromote_after=timedelta(days=options['repromote_days']) if options['repromote_days'] else None,
+                                product_catalogs=options['product_catalogs'], tabs=options['tabs'],
+                                verification=VerificationQueue() if options['verify'] else None, profiler=profiler,
+                                max_batch=options['max_batch'])
+    try:
+        if options['daemon']:
+            # Без --groups/--campaigns демон следит за появлением новых файлов групп и кампаний
+            PromoterDaemon(promoter, campaigns=options['campaigns'] or None, group_file_paths=options['groups'],
+                           exclude=options['exclude']).run()
+        elif options['mode'] == 'event':
+            promoter.run_events(events=load_events(options['events']), group_file_paths=options['group_files'])
+        else:
+            promoter.run_campaigns(campaigns=options['campaigns'], group_file_paths=options['group_files'])
+    finally:
+        results.put((shard, dict(promoter.stats)))
+        promoter.stop()
+        if profiler:
+            profiler.stop()
+
+
+def main(argv: list[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Promote AliExpress campaigns and events in Facebook groups")
+    parser.add_argument('--mode', choices=['campaign', 'event'], default='campaign')
+    parser.add_argument('--campaigns', nargs='+', default=[], help="Campaign names (campaign mode)")
+    parser.add_argument('--events', type=Path, help="JSON file with events (event mode)")
+    parser.add_argument('--groups', nargs='+', help="Group files in data/facebook/groups. Defaults to all files")
+    parser.add_argument('--exclude', nargs='+', default=[], help="Group files to skip")
+    parser.add_argument('--strict', action='store_true', help="Do not start if any group is invalid")
+    parser.add_argument('--workers', type=int, default=1, help="Worker processes, one browser each")
+    parser.add_argument('--tabs', type=int, default=1, help="Groups posted concurrently in tabs of each worker's browser")
+    parser.add_argument('--daemon', action='store_true', help="Run campaigns in cycles, reloading changed group, campaign and locator files")
+    parser.add_argument('--max-batch', type=int, help="Groups of one language/currency batch posted before other batches get a turn")
+    parser.add_argument('--profile', action='store_true', help="Sample stacks and trace allocations; reports in tmp/facebook_profiles")
+    parser.add_argument('--verify', action='store_true', help="Queue published posts and verify them in a low-priority browser")
+    parser.add_argument('--no-video', action='store_true', help="Post images instead of videos")
+    parser.add_argument('--trace', action='store_true', help="Record a Chrome trace per worker")
+    parser.add_argument('--attach', type=int, nargs='?', const=9222, default=0, metavar='BASE_PORT',
+                        help="Attach worker N to the browser_daemon instance on BASE_PORT+N instead of starting Chrome")
+    parser.add_argument('--light-profile', action='store_true', help="Block feed videos, ads and trackers in the workers' browsers")
+    parser.add_argument('--block-images', action='store_true', help="With --light-profile: block feed images too")
+    parser.add_argument('--product-catalogs', action='store_true', help="Read products from catalogs built by product_catalog")
+    parser.add_argument('--repromote-days', type=float, default=0, help="Promote an item in a group again after this many days (0 - never)")
+    parser.add_argument('--recycle-pages', type=int, default=200, help="Restart a worker's browser after this many pages (0 - never)")
+    parser.add_argument('--recycle-memory-mb', type=float, default=1500, help="Restart a worker's browser above this memory use (0 - never)")
+    args = parser.parse_args(argv)
+
+    if args.daemon and args.mode == 'event':
+        parser.error("--daemon runs campaigns only")
+    if args.mode == 'campaign' and not args.campaigns and not args.daemon:
+        parser.error("--campaigns is required in campaign mode")
+    if args.mode == 'event' and not args.events:
+        parser.error("--events is required in event mode")
+
+    options = {
+        'mode': args.mode,
+        'campaigns': args.campaigns,
+        'events': str(args.events) if args.events else None,
+        'group_files': resolve_group_files(args.groups, args.exclude),
+        'groups': args.groups,
+        'exclude': args.exclude,
+        'daemon': args.daemon,
+        'no_video': args.no_video,
+        'trace': args.trace,
+        'attach': args.attach,
+        'light_profile': args.light_profile,
+        'block_images': args.block_images,
+        'product_catalogs': args.product_catalogs,
+        'tabs': args.tabs,
+        'verify': args.verify,
+        'profile': args.profile,
+        'max_batch': args.max_batch,
+        'started': f"{datetime.now():%y%m%d_%H%M%S}",
+        'repromote_days': args.repromote_days,
+        'recycle_pages': args.recycle_pages,
+        'recycle_memory_mb': args.recycle_memory_mb,
+    }
+    logger.info(f"Promoting {options['mode']} in {len(options['group_files'])} group files with {args.workers} workers")
+
+    # Validate all group files before any browser starts
+    loaded = load_group_files(options['group_files'], is_event=args.mode == 'event')
+    loaded.report()
+    if loaded.errors and args.strict:
+        return 2
+    if not loaded.due_count and not args.daemon:
+        logger.info("No groups are due for promotion")
+        return 0
+
+    ctx = mp.get_context('spawn')
+    file_lock = ctx.Lock()
+    results = ctx.Queue()
+    processes = [ctx.Process(target=run_shard, args=(shard, args.workers, options, file_lock, results), name=f"promoter-{shard}")
+                 for shard in range(args.workers)]
+    for process in processes:
+        process.start()
+    verifier, stop_verifier = None, ctx.Event()
+    if args.verify:
+        verifier = ctx.Process(target=run_verifier, args=(stop_verifier,), name="verifier")
+        verifier.start()
+
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        logger.info("Campaign promotion interrupted.")
+        for process in processes:
+            process.join()
+
+    if verifier:
+        # Посты, которые ещё рано проверять, остаются в очереди до следующего запуска
+        stop_verifier.set()
+        verifier.join()
+        apply_verifications(VerificationQueue())
+
+    total = Counter()
+    for _ in processes:
+        try:
+            shard, stats = results.get(timeout=5)
+        except queue.Empty:
+            break
+        logger.info(f"Shard {shard}: {stats}")
+        total.update(stats)
+
+    failed_workers = [p.name for p in processes if p.exitcode != 0]
+    logger.info(f"Total: {dict(total)}; failed workers: {failed_workers or 'none'}")
+    return 1 if failed_workers else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
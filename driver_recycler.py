@@ -0,0 +1,121 @@
+## \file ../src/advertisement/facebook/driver_recycler.py
+# -*- coding: utf-8 -*-
+# /path/to/interpreter/python
+"""
+Driver recycling for long-running promoters.
+
+The browser of a promoter grows with every group page it opens. `DriverRecycler` tracks
+the pages served and the browser memory, and once a threshold is passed the promoter
+restarts the driver between groups. The Facebook session is carried over in saved cookies,
+so the new browser does not have to log in.
+
+A driver attached to a `browser_daemon` instance is recycled by closing that browser: the
+driver factory then attaches to a fresh instance on the same port and profile. Detaching
+alone would re-attach to the same grown browser and free nothing.
+"""
+
+import os
+from pathlib import Path
+from typing import Callable
+
+from src import gs
+from src.webdriver import Driver, Chrome
+from src.utils import j_loads, j_dumps
+from src.logger import logger
+from src.advertisement.facebook.browser_profile import browser_memory_mb, psutil
+
+
+class DriverRecycler:
+    """ Decides when a driver is due for a restart and restarts it with the same session.
+
+    Example:
+        >>> recycler = DriverRecycler(lambda: Driver(Chrome), max_pages=200, max_memory_mb=1500)
+        >>> promoter = FacebookPromoter(recycler.start(), group_file_paths=files, recycler=recycler)
+        >>> promoter.run_campaigns(['pain'])    # restarts the driver between groups when due
+    """
+    start_url: str = r"https://www.facebook.com"
+
+    def __init__(self,
+                 driver_factory: Callable[[], Driver] = None,
+                 max_pages: int = 200,
+                 max_memory_mb: float = 1500,
+                 cookies_path: str | Path = None):
+        """
+        Args:
+            driver_factory (Callable[[], Driver], optional): Creates a new driver. Defaults to `Driver(Chrome)`.
+            max_pages (int, optional): Pages served before a restart. `0` disables the limit. Defaults to 200.
+            max_memory_mb (float, optional): Browser memory that triggers a restart. `0` disables the limit. Defaults to 1500.
+            cookies_path (str | Path, optional): File for the session cookies. Defaults to `tmp/facebook_cookies/<pid>.json`.
+        """
+        self.driver_factory = driver_factory or (lambda: Driver(Chrome))
+        self.max_pages = max_pages
+        self.max_memory_mb = max_memory_mb
+        self.cookies_path = Path(cookies_path) if cookies_path else gs.path.tmp / 'facebook_cookies' / f"{os.getpid()}.json"
+        self.pages = 0
+        self.restarts = 0
+        if self.max_memory_mb and not psutil:
+            logger.warning("psutil is not installed, drivers are recycled by pages served only")
+
+    def start(self) -> Driver:
+        """ Starts a driver on the Facebook start page, restoring saved cookies if there are any. """
+        d = self.driver_factory()
+        d.get_url(self.start_url)
+        self.restore_cookies(d)
+        self.pages = 0
+        return d
+
+    def restore_cookies(self, d: Driver) -> bool:
+        """ Adds the saved session cookies to the current Facebook page of `d` and reloads it.
+
+        Returns:
+            bool: `True` if there were cookies to restore.
+        """
+        cookies = j_loads(self.cookies_path) if self.cookies_path.exists() else None
+        if not cookies:
+            return False
+        for cookie in cookies:
+            try:
+                d.add_cookie(cookie)
+            except Exception as ex:
+                logger.debug(f"Cookie {cookie.get('name')} was not restored: {ex}", None, False)
+        d.refresh()
+        return True
+
+    def save_cookies(self, d: Driver):
+        self.cookies_path.parent.mkdir(parents=True, exist_ok=True)
+        j_dumps(d.get_cookies(), self.cookies_path)
+
+    def page_served(self):
+        """ Counts a page load of the current driver. """
+        self.pages += 1
+
+    def due(self, d: Driver) -> bool:
+        """ Checks the page and memory thresholds. """
+        if self.max_pages and self.pages >= self.max_pages:
+            logger.info(f"Driver served {self.pages} pages, restarting")
+            return True
+        if self.max_memory_mb:
+            memory = browser_memory_mb(d)
+            if memory and memory >= self.max_memory_mb:
+                logger.info(f"Browser uses {memory:.0f} MB, restarting")
+                return True
+        return False
+
+    def recycle(self, d: Driver) -> Driver:
+        """ Saves the session of `d`, quits it and returns a new driver with the same session. """
+        self.save_cookies(d)
+        port = getattr(d, 'port', None)  # <- `browser_daemon.AttachedChrome`: `quit()` only detaches
+        if port:
+            from src.advertisement.facebook.browser_daemon import stop_browser
+            if not stop_browser(d, port):
+                logger.error(f"Browser on port {port} did not stop, re-attaching to it")
+        try:
+            d.quit()
+        except Exception as ex:
+            logger.error("Error while quitting the driver", ex)
+        self.restarts += 1
+        return self.start()
+
+    def maybe_recycle(self, d: Driver) -> Driver:
+        """ Returns a new driver if `d` is due for a restart, otherwise `d`. """
+        return self.recycle(d) if self.due(d) else d
@@ -35,7 +35,8 @@ class Facebook():
 		"""
 		...
 		self.driver = driver	
-		self.driver.get_url (self.start_page)
+		if 'facebook.com' not in (self.driver.current_url or ''): # <- драйвер, подключённый к прогретому браузеру, уже на фейсбуке
+			self.driver.get_url (self.start_page)
 		#switch_account(self.driver) # <- переключение профиля, если не на своей странице
 
 	def login(self) -> bool:
@@ -4,11 +4,14 @@
 """ Раскрывающеся меню выбора групп для подачи объвления"""
 
 import header 
+from datetime import datetime
 from IPython.display import display
-from ipywidgets import Dropdown
-from src.utils import j_loads_ns
+from ipywidgets import Dropdown, Text, Button, Label, HTML, HBox, VBox, Layout
+from src.utils import j_loads, j_loads_ns
+from src.advertisement.facebook.group_store import load_groups
 from types import SimpleNamespace
 from pathlib import Path
+from typing import Callable
 
 class FacebookGroupsWidget:
     """ Создает выпадающий список с URL групп Facebook из предоставленного JSON."""
@@ -42,3 +45,204 @@ class FacebookGroupsWidget:
         display(self.dropdown)
 
 
+
+
+class GroupIndex:
+    """ Индекс групп фейсбук в памяти для поиска и постраничного просмотра.
+
+    Хранит поля групп колонками (URL, описание, язык, валюта, время последней рекламы)
+    и строку поиска для каждой группы. Поиск инкрементальный: если новый запрос
+    продолжает предыдущий, фильтруется только предыдущий результат.
+    """
+
+    def __init__(self, groups: dict[str, dict]):
+        """
+        Args:
+            groups (dict[str, dict]): Группы в виде `{group_url: group_info}`, как в JSON-файле групп.
+        """
+        self.urls: list[str] = list(groups.keys())
+        self.descriptions: list[str] = []
+        self.languages: list[str] = []
+        self.currencies: list[str] = []
+        self.last_promos: list[str] = []
+        self._last_promo_keys: list[datetime] = None
+        self._haystack: list[str] = []
+
+        for url, info in groups.items():
+            description = info.get('group_description') or ''
+            language = (info.get('language') or '').upper()
+            currency = (info.get('currency') or '').upper()
+            last_promo = info.get('last_promo_sended') or ''
+            self.descriptions.append(description)
+            self.languages.append(language)
+            self.currencies.append(currency)
+            self.last_promos.append(last_promo)
+            self._haystack.append(f"{url} {description} {language} {currency}".lower())
+
+        self._last_query: tuple = None
+        self._last_result: list[int] = list(range(len(self.urls)))
+
+    @classmethod
+    def from_files(cls, json_file_paths: list[Path] | Path) -> 'GroupIndex':
+        """ Строит индекс из одного или нескольких файлов групп (`.json` или `.jsonl`). """
+        paths = json_file_paths if isinstance(json_file_paths, list) else [json_file_paths]
+        groups = {}
+        for path in paths:
+            groups.update(load_groups(path))
+        return cls(groups)
+
+    def __len__(self) -> int:
+        return len(self.urls)
+
+    def languages_available(self) -> list[str]:
+        return sorted(set(self.languages) - {''})
+
+    def currencies_available(self) -> list[str]:
+        return sorted(set(self.currencies) - {''})
+
+    def search(self, query: str = '', language: str = None, currency: str = None, order: str = None) -> list[int]:
+        """ Возвращает номера групп, подходящих под запрос и фильтры.
+
+        Args:
+            query (str): Подстрока для поиска в URL и описании. Слова ищутся независимо.
+            language (str, optional): Фильтр по языку.
+            currency (str, optional): Фильтр по валюте.
+            order (str, optional): `last_promo` - сначала давно не рекламированные группы,
+                `url` - по URL, иначе порядок файла.
+
+        Returns:
+            list[int]: Номера групп в индексе.
+        """
+        words = query.lower().split()
+        key = (language, currency)
+        candidates = range(len(self.urls))
+        if self._last_query and self._last_query[1] == key:
+            previous_words = self._last_query[0]
+            # Запрос только уточнился - достаточно отфильтровать прошлый результат.
+            if all(any(p in w for w in words) for p in previous_words):
+                candidates = self._last_result
+
+        result = [
+            i for i in candidates
+            if (not language or self.languages[i] == language)
+            and (not currency or self.currencies[i] == currency)
+            and all(w in self._haystack[i] for w in words)
+        ]
+        self._last_query, self._last_result = (words, key), result
+
+        if order == 'last_promo':
+            return sorted(result, key=self._last_promo_key)
+        if order == 'url':
+            return sorted(result, key=self.urls.__getitem__)
+        return result
+
+    def _last_promo_key(self, i: int) -> datetime:
+        """ Время последней рекламы группы. Разбирается один раз при первой сортировке. """
+        if self._last_promo_keys is None:
+            self._last_promo_keys = []
+            for last_promo in self.last_promos:
+                try:
+                    self._last_promo_keys.append(datetime.strptime(last_promo, "%d/%m/%y %H:%M"))
+                except ValueError:
+                    self._last_promo_keys.append(datetime.min)
+        return self._last_promo_keys[i]
+
+    def row(self, i: int) -> dict:
+        """ Возвращает поля группы по номеру в индексе. """
+        return {
+            'group_url': self.urls[i],
+            'group_description': self.descriptions[i],
+            'language': self.languages[i],
+            'currency': self.currencies[i],
+            'last_promo_sended': self.last_promos[i],
+        }
+
+
+class FacebookGroupsBrowser:
+    """ Постраничный браузер групп фейсбук с поиском.
+
+    Виджеты строк создаются только для видимой страницы, поэтому открытие и поиск
+    остаются интерактивными на десятках тысяч групп.
+
+    Example:
+        >>> browser = FacebookGroupsBrowser(gs.path.data / 'facebook' / 'groups' / 'my_managed_groups.json',
+        ...                                 on_select=lambda url: d.get_url(url))
+        >>> browser.display_widget()
+    """
+
+    def __init__(self, groups: dict[str, dict] | list[Path] | Path, page_size: int = 25, on_select: Callable[[str], None] = None):
+        """
+        Args:
+            groups (dict[str, dict] | list[Path] | Path): Уже загруженные группы или JSON-файл(ы) групп.
+            page_size (int, optional): Число групп на странице. Defaults to 25.
+            on_select (Callable[[str], None], optional): Вызывается с URL группы при нажатии `Open`.
+        """
+        self.index = GroupIndex(groups) if isinstance(groups, dict) else GroupIndex.from_files(groups)
+        self.page_size = page_size
+        self.on_select = on_select
+        self.page = 0
+        self.matches: list[int] = []
+
+        self.search = Text(placeholder='URL или описание', description='Search:', continuous_update=True)
+        self.language = Dropdown(options=[('All', None)] + [(l, l) for l in self.index.languages_available()], description='Language:')
+        self.currency = Dropdown(options=[('All', None)] + [(c, c) for c in self.index.currencies_available()], description='Currency:')
+        self.order = Dropdown(options=[('File', None), ('Last promo', 'last_promo'), ('URL', 'url')], description='Order:')
+        self.prev_button = Button(description='<', layout=Layout(width='40px'))
+        self.next_button = Button(description='>', layout=Layout(width='40px'))
+        self.status = Label()
+        self.rows = VBox()
+
+        for widget in (self.search, self.language, self.currency, self.order):
+            widget.observe(self._on_filter_change, names='value')
+        self.prev_button.on_click(lambda _: self._turn(-1))
+        self.next_button.on_click(lambda _: self._turn(1))
+
+        self.widget = VBox([
+            HBox([self.search, self.language, self.currency, self.order]),
+            HBox([self.prev_button, self.status, self.next_button]),
+            self.rows,
+        ])
+        self.refresh()
+
+    def reload(self, groups: dict[str, dict]):
+        """ Перестраивает индекс после изменения групп, сохраняя поиск и фильтры. """
+        self.index = GroupIndex(groups)
+        self.refresh()
+
+    def refresh(self):
+        """ Заново выполняет поиск и показывает первую страницу. """
+        self.matches = self.index.search(self.search.value, self.language.value, self.currency.value, self.order.value)
+        self.page = 0
+        self.render_page()
+
+    def render_page(self):
+        """ Создает виджеты строк только для текущей страницы. """
+        pages = max(1, -(-len(self.matches) // self.page_size))
+        start = self.page * self.page_size
+        self.rows.children = [self._make_row(i) for i in self.matches[start:start + self.page_size]]
+        self.status.value = f"{self.page + 1}/{pages} · {len(self.matches)} of {len(self.index)} groups"
+        self.prev_button.disabled = self.page == 0
+        self.next_button.disabled = self.page >= pages - 1
+
+    def _make_row(self, i: int) -> HBox:
+        row = self.index.row(i)
+        open_button = Button(description='Open', layout=Layout(width='60px'))
+        open_button.on_click(lambda _, url=row['group_url']: self.on_select and self.on_select(url))
+        return HBox([
+            open_button,
+            HTML(f"<a href='{row['group_url']}' target='_blank'>{row['group_url']}</a>", layout=Layout(width='420px')),
+            Label(row['group_description'][:80], layout=Layout(width='360px')),
+            Label(f"{row['language']} {row['currency']}", layout=Layout(width='80px')),
+            Label(row['last_promo_sended']),
+        ])
+
+    def _on_filter_change(self, change):
+        self.refresh()
+
+    def _turn(self, step: int):
+        self.page += step
+        self.render_page()
+
+    def display_widget(self):
+        """ Отображает браузер групп."""
+        display(self.widget)
@@ -0,0 +1,176 @@
+## \file ../src/advertisement/facebook/group_loader.py
+# -*- coding: utf-8 -*-
+# /path/to/interpreter/python
+"""
+Startup loading of group files.
+
+All configured group files are parsed and validated concurrently in a process pool, one
+file per task. The result holds the raw groups of every file, the URLs of the groups due
+for promotion and every invalid group, so bad data is reported in one go before the
+browser opens the first page.
+
+A long-running promoter keeps the parsed files in a `GroupFileCache` and reparses only
+the files whose size or modification time changed.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+from src import gs
+from src.logger import logger
+from src.advertisement.facebook.group_store import load_groups
+from src.advertisement.facebook.models import Group
+
+
+def parse_group_file(path: str | Path) -> tuple[dict, dict[str, Group], list[str]]:
+    """ Parses and validates one group file.
+
+    Returns:
+        tuple[dict, dict[str, Group], list[str]]: Raw groups, the valid groups, error messages.
+    """
+    name = Path(path).name
+    try:
+        raw_groups = load_groups(path)
+    except Exception as ex:
+        return {}, {}, [f"{name}: {type(ex).__name__}: {ex}"]
+    if not isinstance(raw_groups, dict):
+        return {}, {}, [f"{name}: not an object of groups"]
+
+    groups, errors = {}, []
+    for group_url, data in raw_groups.items():
+        if not isinstance(data, dict):
+            errors.append(f"{name}: Group {group_url}: not an object")
+            continue
+        try:
+            groups[group_url] = Group.from_dict(data, group_url=group_url)
+        except ValueError as ex:
+            errors.append(f"{name}: {ex}")
+    return raw_groups, groups, errors
+
+
+def due_groups(groups: dict[str, Group], is_event: bool = False, now: datetime = None) -> list[str]:
+    """ URLs of the groups due for promotion; event runs ignore `interval`. """
+    return [group_url for group_url, group in groups.items() if is_event or group.is_due(now)]
+
+
+def load_group_file(path: str, is_event: bool = False, now: datetime = None) -> tuple[dict, list[str], list[str]]:
+    """ Loads and validates one group file.
+
+    Args:
+        path (str): Full path of a `.json` or `.jsonl` group file.
+        is_event (bool, optional): Event runs ignore `interval`, every valid group is due. Defaults to False.
+        now (datetime, optional): Time the due check is made for. Defaults to now.
+
+    Returns:
+        tuple[dict, list[str], list[str]]: Raw groups, URLs of the due groups, error messages.
+    """
+    raw_groups, groups, errors = parse_group_file(path)
+    return raw_groups, due_groups(groups, is_event, now), errors
+
+
+class LoadedGroups:
+    """ Group files loaded at startup.
+
+    Attributes:
+        raw (dict[str, dict]): Raw groups per group file.
+        due (dict[str, list[str]]): URLs of the groups due for promotion per group file.
+        errors (list[str]): Every invalid file and group.
+    """
+
+    def __init__(self):
+        self.raw: dict[str, dict] = {}
+        self.due: dict[str, list[str]] = {}
+        self.errors: list[str] = []
+
+    @property
+    def due_count(self) -> int:
+        return sum(len(urls) for urls in self.due.values())
+
+    def report(self):
+        """ Logs all invalid groups in one message. """
+        if self.errors:
+            logger.error(f"{len(self.errors)} invalid groups:\n" + "\n".join(self.errors))
+        logger.info(f"{self.due_count} groups due in {len(self.due)} group files")
+
+
+def load_group_files(group_file_paths: list[str], is_event: bool = False, max_workers: int = None, use_processes: bool = True) -> LoadedGroups:
+    """ Loads and validates all group files concurrently.
+
+    Args:
+        group_file_paths (list[str]): Group files in `data/facebook/groups`.
+        is_event (bool, optional): Load for an event run. Defaults to False.
+        max_workers (int, optional): Pool size. Defaults to the number of CPUs, at most one per file.
+        use_processes (bool, optional): Parse in processes (scales with cores) or in threads. Defaults to True.
+
+    Example:
+        >>> loaded = load_group_files(['ru_il.json', 'he_il.json'])
+        >>> loaded.report()
+        >>> loaded.due['ru_il.json']
+    """
+    loaded = LoadedGroups()
+    if not group_file_paths:
+        return loaded
+    paths = [str(gs.path.data / 'facebook' / 'groups' / group_file) for group_file in group_file_paths]
+    workers = min(max_workers or os.cpu_count() or 1, len(paths))
+    now = datetime.now()
+
+    if workers == 1:
+        results = [load_group_file(path, is_event, now) for path in paths]
+    else:
+        pool = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+        with pool(max_workers=workers) as executor:
+            results = list(executor.map(load_group_file, paths, [is_event] * len(paths), [now] * len(paths)))
+
+    for group_file, (raw_groups, due, errors) in zip(group_file_paths, results):
+        loaded.raw[group_file] = raw_groups
+        loaded.due[group_file] = due
+        loaded.errors.extend(errors)
+    return loaded
+
+
+def file_stamp(path: Path) -> tuple[int, int] | None:
+    """ `(mtime_ns, size)` of a file, `None` if it does not exist. """
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class GroupFileCache:
+    """ Parsed group files kept between runs of a long-running promoter.
+
+    A file is reparsed only when its size or modification time changed (the promoter's own
+    saves included); the due check is recomputed from the cached groups on every load.
+
+    Example:
+        >>> cache = GroupFileCache()
+        >>> loaded = cache.load(['ru_il.json', 'he_il.json'])    # parses both files
+        >>> loaded = cache.load(['ru_il.json', 'he_il.json'])    # parses none if nothing changed
+    """
+
+    def __init__(self):
+        self._files: dict[str, tuple[tuple[int, int] | None, dict, dict[str, Group], list[str]]] = {}
+        self.reparsed: int = 0
+
+    def load(self, group_file_paths: list[str], is_event: bool = False) -> LoadedGroups:
+        loaded = LoadedGroups()
+        now = datetime.now()
+        for group_file in group_file_paths or []:
+            path = gs.path.data / 'facebook' / 'groups' / group_file
+            stamp = file_stamp(path)
+            cached = self._files.get(group_file)
+            if not cached or cached[0] != stamp:
+                cached = self._files[group_file] = (stamp, *parse_group_file(path))
+                self.reparsed += 1
+            _, raw_groups, groups, errors = cached
+            loaded.raw[group_file] = raw_groups
+            loaded.due[group_file] = due_groups(groups, is_event, now)
+            loaded.errors.extend(errors)
+        return loaded
+
+    def forget(self, group_file: str):
+        """ Drops a file from the cache (removed or renamed file). """
+        self._files.pop(group_file, None)
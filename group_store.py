@@ -0,0 +1,234 @@
+## \file ../src/advertisement/facebook/group_store.py
+# -*- coding: utf-8 -*-
+# /path/to/interpreter/python
+"""
+Incrementally updatable group files.
+
+A `.jsonl` group file holds one record per line: `{"url": <group_url>, "group": {...}}`.
+An update appends a new record of the group instead of rewriting the file, and the latest
+record of a URL wins. A sidecar index `<file>.jsonl.idx` maps every record to its offset
+(`offset<TAB>length<TAB>url` per line, append-only), so one group is read with a single seek.
+`compact()` folds the updates back into one record per group.
+
+Conversion from and to the JSON group files:
+    python -m src.advertisement.facebook.group_store to-jsonl ru_il.json
+    python -m src.advertisement.facebook.group_store to-json ru_il.jsonl
+    python -m src.advertisement.facebook.group_store compact ru_il.jsonl
+"""
+
+import argparse
+import json
+import os
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Iterator
+
+from src import gs
+from src.utils import j_loads, j_dumps
+from src.logger import logger
+
+GROUP_FILE_SUFFIXES: tuple[str, ...] = ('.json', '.jsonl')
+
+
+def is_group_file(file_name: str | Path) -> bool:
+    """ Group files are `.json` and `.jsonl`; index files and others are skipped. """
+    return Path(file_name).suffix in GROUP_FILE_SUFFIXES
+
+
+def load_groups(path: str | Path) -> dict:
+    """ Loads a `.json` or `.jsonl` group file as `{group_url: group}` dicts. """
+    path = Path(path)
+    if path.suffix == '.jsonl':
+        return dict(GroupStore(path).items(as_ns=False))
+    return j_loads(path) or {}
+
+
+class GroupStore:
+    """ Group file of appended JSON records with an offset index.
+
+    Writers in several processes must serialize `update()` with a shared lock
+    (the sharded runner passes one to `FacebookPromoter`). `compact()` must run
+    while no promoter uses the file.
+
+    Example:
+        >>> store = GroupStore(gs.path.data / 'facebook' / 'groups' / 'ru_il.jsonl')
+        >>> group = store.get('https://www.facebook.com/groups/1/')
+        >>> group.last_promo_sended = '01/01/25 10:00'
+        >>> store.update('https://www.facebook.com/groups/1/', group)
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.index_path = self.path.with_suffix(self.path.suffix + '.idx')
+        self.offsets: dict[str, tuple[int, int]] = {}
+        self.records = 0
+        self._index_pos = 0
+        self._data_end = 0
+        self.refresh()
+
+    def refresh(self):
+        """ Reads index entries appended since the last call and indexes records the index misses. """
+        if self.index_path.exists() and self.index_path.stat().st_size > self._index_pos:
+            with open(self.index_path, 'rb') as f:
+                f.seek(self._index_pos)
+                for line in f:
+                    if not line.endswith(b'\n'):
+                        break  # <- запись индекса ещё не дописана
+                    offset, length, url = line.decode('utf-8').rstrip('\n').split('\t', 2)
+                    self._add(url, int(offset), int(length))
+                    self._index_pos += len(line)
+        data_size = self.path.stat().st_size if self.path.exists() else 0
+        if data_size > self._data_end:
+            self._index_tail()
+
+    def _add(self, url: str, offset: int, length: int):
+        self.offsets[url] = (offset, length)
+        self.records += 1
+        self._data_end = max(self._data_end, offset + length)
+
+    def _index_tail(self):
+        """ Indexes records written after the last index entry (missing or interrupted index).
+
+        A line that does not parse (e.g. a torn write followed by the next record) is skipped with a warning.
+        """
+        entries = []
+        with open(self.path, 'rb') as f:
+            f.seek(self._data_end)
+            offset = self._data_end
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                try:
+                    entries.append((offset, len(line), json.loads(line)['url']))
+                except (ValueError, KeyError, TypeError) as ex:
+                    logger.warning(f"Skipped a broken record at offset {offset} of {self.path.name}: {ex}")
+                offset += len(line)
+        self._data_end = max(self._data_end, offset)  # <- пропущенные строки тоже позади
+        if not entries:
+            return
+        with open(self.index_path, 'ab') as f:
+            f.write(''.join(f"{o}\t{l}\t{u}\n" for o, l, u in entries).encode('utf-8'))
+        for offset, length, url in entries:
+            self._add(url, offset, length)
+        self._index_pos = self.index_path.stat().st_size
+        logger.debug(f"Indexed {len(entries)} records of {self.path.name}", None, False)
+
+    @staticmethod
+    def _encode(url: str, group: SimpleNamespace | dict) -> bytes:
+        group = dict(vars(group) if isinstance(group, SimpleNamespace) else group)
+        group.pop('group_url', None)  # <- URL is the key of the record
+        return (json.dumps({'url': url, 'group': group}, ensure_ascii=False, default=vars) + '\n').encode('utf-8')
+
+    @staticmethod
+    def _decode(data: bytes, as_ns: bool):
+        record = json.loads(data, object_hook=lambda d: SimpleNamespace(**d)) if as_ns else json.loads(data)
+        return record.group if as_ns else record['group']
+
+    def __contains__(self, url: str) -> bool:
+        return url in self.offsets
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def urls(self) -> list[str]:
+        return list(self.offsets)
+
+    def get(self, url: str, as_ns: bool = True) -> SimpleNamespace | dict | None:
+        """ Reads the latest record of one group, or `None` if the group is not in the file. """
+        self.refresh()
+        if url not in self.offsets:
+            return None
+        offset, length = self.offsets[url]
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            return self._decode(f.read(length), as_ns)
+
+    def items(self, as_ns: bool = True) -> Iterator[tuple[str, SimpleNamespace | dict]]:
+        """ Iterates `(group_url, group)` over the latest records in file order. """
+        self.refresh()
+        if not self.offsets:
+            return
+        with open(self.path, 'rb') as f:
+            for url, (offset, length) in sorted(self.offsets.items(), key=lambda item: item[1][0]):
+                f.seek(offset)
+                yield url, self._decode(f.read(length), as_ns)
+
+    def update(self, url: str, group: SimpleNamespace | dict):
+        """ Appends a new record of the group. Costs the size of the record, not of the file. """
+        line = self._encode(url, group)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.refresh()
+        with open(self.path, 'ab') as f:
+            f.seek(0, os.SEEK_END)
+            if f.tell() > self._data_end:
+                # Недописанная строка прерванной записи: иначе новая запись склеится с ней
+                logger.warning(f"Truncated {f.tell() - self._data_end} bytes of an unterminated record in {self.path.name}")
+                f.truncate(self._data_end)
+                f.seek(0, os.SEEK_END)
+            offset = f.tell()
+            f.write(line)
+        with open(self.index_path, 'ab') as f:
+            f.write(f"{offset}\t{len(line)}\t{url}\n".encode('utf-8'))
+            self._index_pos = f.tell()
+        self._add(url, offset, len(line))
+
+    def compact(self) -> int:
+        """ Rewrites the file with only the latest record of every group.
+
+        Returns:
+            int: Number of superseded records dropped.
+        """
+        groups = list(self.items(as_ns=False))
+        dropped = self.records - len(self.offsets)
+        self._write(groups)
+        logger.info(f"Compacted {self.path.name}: {dropped} superseded records dropped")
+        return dropped
+
+    def _write(self, groups: list[tuple[str, dict]]):
+        """ Replaces data and index with one record per group. """
+        tmp_path = self.path.with_suffix('.jsonl.tmp')
+        tmp_index_path = self.index_path.with_suffix('.idx.tmp')
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        offsets = {}
+        with open(tmp_path, 'wb') as data, open(tmp_index_path, 'wb') as index:
+            for url, group in groups:
+                line = self._encode(url, group)
+                offsets[url] = (data.tell(), len(line))
+                index.write(f"{data.tell()}\t{len(line)}\t{url}\n".encode('utf-8'))
+                data.write(line)
+        os.replace(tmp_path, self.path)
+        os.replace(tmp_index_path, self.index_path)
+        self.offsets = offsets
+        self.records = len(offsets)
+        self._index_pos = self.index_path.stat().st_size
+        self._data_end = self.path.stat().st_size
+
+    @classmethod
+    def from_json(cls, json_path: str | Path, path: str | Path = None) -> 'GroupStore':
+        """ Converts a JSON group file to a `.jsonl` store next to it (or at `path`). """
+        json_path = Path(json_path)
+        store = cls(Path(path) if path else json_path.with_suffix('.jsonl'))
+        store._write(list((j_loads(json_path) or {}).items()))
+        return store
+
+    def to_json(self, json_path: str | Path = None) -> Path:
+        """ Writes the latest records as a JSON group file next to the store (or at `json_path`). """
+        json_path = Path(json_path) if json_path else self.path.with_suffix('.json')
+        j_dumps(dict(self.items(as_ns=False)), json_path)
+        return json_path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert and compact group files")
+    parser.add_argument('command', choices=['to-jsonl', 'to-json', 'compact'])
+    parser.add_argument('files', nargs='+', help="Group files in data/facebook/groups")
+    args = parser.parse_args()
+
+    for file_name in args.files:
+        path = gs.path.data / 'facebook' / 'groups' / file_name
+        if args.command == 'to-jsonl':
+            print(GroupStore.from_json(path).path)
+        elif args.command == 'to-json':
+            print(GroupStore(path).to_json())
+        else:
+            GroupStore(path).compact()
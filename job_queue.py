@@ -0,0 +1,566 @@
+## \file ../src/advertisement/facebook/job_queue.py
+# -*- coding: utf-8 -*-
+# /path/to/interpreter/python
+"""
+Durable job queue for running `FacebookPromoter` workers on several hosts.
+
+A coordinator expands campaigns × groups into post jobs (`enqueue_campaigns`, `enqueue_events`).
+Workers lease jobs, send heartbeats while posting and acknowledge them with the result
+(`FacebookPromoter.run_worker`). A job whose lease expires without a heartbeat goes back to
+the queue, or is marked `failed` once it used `max_attempts`. The coordinator folds acknowledged
+results back into the group files (`apply_results`), so workers never write group files.
+
+Pacing: only one job of a group is leased at a time, and the queue keeps the time of the
+latest acknowledged post to every group (`last_promo_sended`). A worker takes the later of
+that time and the one in the job's group record before it checks `interval`, so a group is
+not posted to again for a second campaign before its results reach the group files.
+
+Command line (coordinator and worker):
+    python -m src.advertisement.facebook.job_queue enqueue --campaigns pain --groups ru_il.json he_il.json
+    python -m src.advertisement.facebook.job_queue work --attach 9222
+    python -m src.advertisement.facebook.job_queue apply
+    python -m src.advertisement.facebook.job_queue stats --redis redis://queue-host:6379/0
+
+Backends:
+    - `SQLiteJobQueue` (default): one SQLite file, WAL mode. Workers on other hosts need the file on a shared disk.
+    - `RedisJobQueue` (optional): any redis-py compatible client, e.g. a local Redis or `fakeredis` stand-in.
+"""
+
+import argparse
+import json
+import socket
+import os
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Iterator
+
+from src import gs
+from src.utils import j_loads, j_dumps
+from src.logger import logger
+from src.advertisement.facebook.group_store import GroupStore, load_groups
+from src.advertisement.facebook.promoted_items import PromotedItems, parse_promo_time
+
+DEFAULT_LEASE_SECONDS: int = 600
+DEFAULT_MAX_ATTEMPTS: int = 3
+
+
+def default_worker_id() -> str:
+    """ `<host>:<pid>` - unique enough to tell the lease owners apart. """
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def ns_to_dict(obj):
+    """ Recursively converts `SimpleNamespace` objects to dicts for JSON. """
+    if isinstance(obj, SimpleNamespace):
+        return {k: ns_to_dict(v) for k, v in vars(obj).items()}
+    if isinstance(obj, (list, tuple)):
+        return [ns_to_dict(v) for v in obj]
+    if isinstance(obj, dict):
+        return {k: ns_to_dict(v) for k, v in obj.items()}
+    return obj
+
+
+def dict_to_ns(obj):
+    """ Recursively converts dicts to `SimpleNamespace`, as `j_loads_ns` does. """
+    return json.loads(json.dumps(obj, ensure_ascii=False), object_hook=lambda d: SimpleNamespace(**d))
+
+
+def make_job(campaign_name: str, group_file: str, group_url: str, group: dict, is_event: bool = False, events: list = None) -> dict:
+    """ Builds a job. The group record travels with the job so that workers need no group files. """
+    return {
+        'campaign_name': campaign_name,
+        'group_file': group_file,
+        'group_url': group_url,
+        'group': group,
+        'is_event': is_event,
+        'events': ns_to_dict(events) if events else None,
+    }
+
+
+class SQLiteJobQueue:
+    """ Job queue in a single SQLite database.
+
+    Every operation opens its own short connection, so the queue can be used from
+    heartbeat threads and from any number of processes.
+    """
+
+    def __init__(self, path: str | Path = None, lease_seconds: int = DEFAULT_LEASE_SECONDS, max_attempts: int = DEFAULT_MAX_ATTEMPTS):
+        """
+        Args:
+            path (str | Path, optional): Database file. Defaults to `data/facebook/jobs.sqlite`.
+            lease_seconds (int, optional): Lease time without heartbeat before a job is given to another worker.
+            max_attempts (int, optional): Attempts before a job is marked `failed`.
+        """
+        self.path = Path(path) if path else gs.path.data / 'facebook' / 'jobs.sqlite'
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    campaign_name TEXT,
+                    group_url TEXT NOT NULL,
+                    is_event INTEGER NOT NULL DEFAULT 0,
+                    payload TEXT NOT NULL,
+                    state TEXT NOT NULL DEFAULT 'queued',
+                    worker_id TEXT,
+                    lease_expires REAL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    result TEXT,
+                    error TEXT,
+                    applied INTEGER NOT NULL DEFAULT 0,
+                    created REAL NOT NULL,
+                    updated REAL NOT NULL
+                )""")
+            # Не больше одной активной задачи на пару кампания/группа - повторный запуск координатора не плодит дубли.
+            conn.execute("""
+                CREATE UNIQUE INDEX IF NOT EXISTS jobs_active
+                ON jobs(campaign_name, group_url, is_event) WHERE state IN ('queued', 'leased')""")
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_state ON jobs(state, lease_expires)")
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_group ON jobs(group_url, state)")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def enqueue(self, jobs: list[dict]) -> int:
+        """ Adds jobs, skipping those already queued or leased.
+
+        Returns:
+            int: Number of jobs actually added.
+        """
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            before = conn.total_changes
+            conn.executemany(
+                """INSERT OR IGNORE INTO jobs (campaign_name, group_url, is_event, payload, created, updated)
+                   VALUES (?, ?, ?, ?, ?, ?)""",
+                [(job['campaign_name'], job['group_url'], int(job['is_event']), json.dumps(job, ensure_ascii=False), now, now) for job in jobs],
+            )
+            conn.execute('COMMIT')
+            return conn.total_changes - before
+
+    def lease(self, worker_id: str) -> SimpleNamespace | None:
+        """ Leases the oldest queued job or a job whose lease expired.
+
+        Expired jobs that used `max_attempts` are marked `failed` instead (a job that crashes
+        its worker is not retried forever). Jobs of a group that has a job leased are skipped.
+
+        Returns:
+            SimpleNamespace | None: The job (`id`, `attempts` and the fields of `make_job`), or `None` if no job can be leased.
+        """
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.execute(
+                """UPDATE jobs SET state = 'failed', worker_id = NULL, lease_expires = NULL,
+                       error = COALESCE(error, 'lease expired'), updated = ?
+                   WHERE state = 'leased' AND lease_expires < ? AND attempts >= ?""", (now, now, self.max_attempts))
+            row = conn.execute(
+                """SELECT id, payload, attempts FROM jobs
+                   WHERE (state = 'queued' OR (state = 'leased' AND lease_expires < ?))
+                     AND group_url NOT IN (SELECT group_url FROM jobs WHERE state = 'leased' AND lease_expires >= ?)
+                   ORDER BY id LIMIT 1""", (now, now)).fetchone()
+            if not row:
+                conn.execute('COMMIT')
+                return
+            job_id, payload, attempts = row
+            conn.execute(
+                """UPDATE jobs SET state = 'leased', worker_id = ?, lease_expires = ?, attempts = attempts + 1, updated = ?
+                   WHERE id = ?""", (worker_id, now + self.lease_seconds, now, job_id))
+            conn.execute('COMMIT')
+        job = SimpleNamespace(**json.loads(payload))
+        job.id, job.attempts = job_id, attempts + 1
+        return job
+
+    def heartbeat(self, job_id: int, worker_id: str) -> bool:
+        """ Extends the lease. Returns `False` if the job is no longer leased by this worker. """
+        now = time.time()
+        with self._connect() as conn:
+            cur = conn.execute(
+                "UPDATE jobs SET lease_expires = ?, updated = ? WHERE id = ? AND state = 'leased' AND worker_id = ?",
+                (now + self.lease_seconds, now, job_id, worker_id))
+            return cur.rowcount == 1
+
+    def ack(self, job_id: int, worker_id: str, result: dict = None) -> bool:
+        """ Marks a leased job as done with its result. """
+        with self._connect() as conn:
+            cur = conn.execute(
+                "UPDATE jobs SET state = 'done', result = ?, updated = ? WHERE id = ? AND state = 'leased' AND worker_id = ?",
+                (json.dumps(result or {}, ensure_ascii=False), time.time(), job_id, worker_id))
+            return cur.rowcount == 1
+
+    def fail(self, job_id: int, worker_id: str, error: str = None) -> bool:
+        """ Returns a leased job to the queue, or marks it `failed` after `max_attempts`. """
+        with self._connect() as conn:
+            cur = conn.execute(
+                """UPDATE jobs SET state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'queued' END,
+                       worker_id = NULL, lease_expires = NULL, error = ?, updated = ?
+                   WHERE id = ? AND state = 'leased' AND worker_id = ?""",
+                (self.max_attempts, error, time.time(), job_id, worker_id))
+            return cur.rowcount == 1
+
+    def last_promo_sended(self, group_url: str) -> str | None:
+        """ Time (`dd/mm/yy HH:MM`) of the latest acknowledged post to the group, applied to the group files or not. """
+        with self._connect() as conn:
+            rows = conn.execute("SELECT result FROM jobs WHERE group_url = ? AND state = 'done'", (group_url,)).fetchall()
+        times = [result.get('last_promo_sended') for result in (json.loads(row[0] or '{}') for row in rows) if result.get('promoted')]
+        return max(times, key=parse_promo_time, default=None)
+
+    def pending_results(self) -> Iterator[SimpleNamespace]:
+        """ Yields done jobs whose results were not applied to the group files yet. """
+        with self._connect() as conn:
+            rows = conn.execute("SELECT id, payload, result FROM jobs WHERE state = 'done' AND applied = 0 ORDER BY id").fetchall()
+        for job_id, payload, result in rows:
+            job = SimpleNamespace(**json.loads(payload))
+            job.id, job.result = job_id, json.loads(result or '{}')
+            yield job
+
+    def mark_applied(self, job_id: int):
+        with self._connect() as conn:
+            conn.execute("UPDATE jobs SET applied = 1 WHERE id = ?", (job_id,))
+
+    def stats(self) -> dict[str, int]:
+        """ Number of jobs per state. """
+        with self._connect() as conn:
+            return dict(conn.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall())
+
+
+class RedisJobQueue:
+    """ Job queue on Redis (optional backend).
+
+    Keys (all under `prefix`):
+        `seq` - job id counter, `job:<id>` - job hash, `queued` - list of ids,
+        `leases` - sorted set id -> lease expiry, `done` - list of ids with unapplied results,
+        `active` - set of `campaign|group_url|is_event` keys of queued and leased jobs,
+        `group:<group_url>` - id of the leased job of a group (expires with the lease),
+        `last_promo` - hash group_url -> time of the latest acknowledged post.
+    """
+
+    def __init__(self, client=None, url: str = 'redis://localhost:6379/0', prefix: str = 'fb:jobs',
+                 lease_seconds: int = DEFAULT_LEASE_SECONDS, max_attempts: int = DEFAULT_MAX_ATTEMPTS):
+        """
+        Args:
+            client (optional): redis-py compatible client. If not given, one is created from `url`.
+            url (str, optional): Redis URL used when `client` is not given.
+            prefix (str, optional): Key prefix. Defaults to 'fb:jobs'.
+            lease_seconds (int, optional): Lease time without heartbeat.
+            max_attempts (int, optional): Attempts before a job is marked `failed`.
+        """
+        if client is None:
+            import redis
+            client = redis.Redis.from_url(url, decode_responses=True)
+        self.r = client
+        self.prefix = prefix
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+
+    def _key(self, *parts) -> str:
+        return ':'.join((self.prefix,) + tuple(str(p) for p in parts))
+
+    @staticmethod
+    def _active_key(job: dict) -> str:
+        return f"{job['campaign_name']}|{job['group_url']}|{int(job['is_event'])}"
+
+    @staticmethod
+    def _str(value) -> str:
+        return value.decode('utf-8') if isinstance(value, bytes) else value
+
+    def enqueue(self, jobs: list[dict]) -> int:
+        added = 0
+        for job in jobs:
+            if not self.r.sadd(self._key('active'), self._active_key(job)):
+                continue
+            job_id = self.r.incr(self._key('seq'))
+            self.r.hset(self._key('job', job_id), mapping={
+                'payload': json.dumps(job, ensure_ascii=False),
+                'state': 'queued',
+                'attempts': 0,
+            })
+            self.r.lpush(self._key('queued'), job_id)
+            added += 1
+        return added
+
+    def _payload(self, job_id) -> dict:
+        return json.loads(self._str(self.r.hget(self._key('job', job_id), 'payload')))
+
+    def _release_group(self, job_id, job: dict):
+        """ Frees the group of a job that is no longer leased, unless another job holds it already. """
+        key = self._key('group', job['group_url'])
+        if self._str(self.r.get(key)) == str(job_id):
+            self.r.delete(key)
+
+    def _requeue_expired(self):
+        for job_id in self.r.zrangebyscore(self._key('leases'), '-inf', time.time()):
+            # ZREM возвращает 1 только одному из конкурирующих воркеров.
+            if not self.r.zrem(self._key('leases'), job_id):
+                continue
+            job_id = self._str(job_id)
+            key = self._key('job', job_id)
+            job = self._payload(job_id)
+            self._release_group(job_id, job)
+            if int(self.r.hget(key, 'attempts') or 0) >= self.max_attempts:
+                self.r.hset(key, mapping={'state': 'failed', 'worker_id': '', 'error': 'lease expired'})
+                self.r.srem(self._key('active'), self._active_key(job))
+            else:
+                self.r.hset(key, mapping={'state': 'queued', 'worker_id': ''})
+                self.r.rpush(self._key('queued'), job_id)
+
+    def lease(self, worker_id: str) -> SimpleNamespace | None:
+        self._requeue_expired()
+        for _ in range(self.r.llen(self._key('queued'))):
+            job_id = self.r.rpop(self._key('queued'))
+            if job_id is None:
+                return
+            job_id = self._str(job_id)
+            payload = self._payload(job_id)
+            # Одна задача группы за раз: остальные задачи группы ждут в очереди
+            if not self.r.set(self._key('group', payload['group_url']), job_id, nx=True, px=int(self.lease_seconds * 1000)):
+                self.r.lpush(self._key('queued'), job_id)
+                continue
+            key = self._key('job', job_id)
+            attempts = self.r.hincrby(key, 'attempts', 1)
+            self.r.hset(key, mapping={'state': 'leased', 'worker_id': worker_id})
+            self.r.zadd(self._key('leases'), {job_id: time.time() + self.lease_seconds})
+            job = SimpleNamespace(**payload)
+            job.id, job.attempts = int(job_id), attempts
+            return job
+
+    def _owned(self, job_id: int, worker_id: str) -> bool:
+        key = self._key('job', job_id)
+        return self._str(self.r.hget(key, 'state')) == 'leased' and self._str(self.r.hget(key, 'worker_id')) == worker_id
+
+    def heartbeat(self, job_id: int, worker_id: str) -> bool:
+        if not self._owned(job_id, worker_id):
+            return False
+        self.r.zadd(self._key('leases'), {str(job_id): time.time() + self.lease_seconds})
+        self.r.pexpire(self._key('group', self._payload(job_id)['group_url']), int(self.lease_seconds * 1000))
+        return True
+
+    def ack(self, job_id: int, worker_id: str, result: dict = None) -> bool:
+        if not self._owned(job_id, worker_id):
+            return False
+        key = self._key('job', job_id)
+        job = self._payload(job_id)
+        result = result or {}
+        if result.get('promoted') and parse_promo_time(result.get('last_promo_sended')) > parse_promo_time(self.last_promo_sended(job['group_url'])):
+            self.r.hset(self._key('last_promo'), job['group_url'], result['last_promo_sended'])
+        self.r.zrem(self._key('leases'), str(job_id))
+        self.r.hset(key, mapping={'state': 'done', 'result': json.dumps(result, ensure_ascii=False)})
+        self.r.srem(self._key('active'), self._active_key(job))
+        self._release_group(job_id, job)
+        self.r.rpush(self._key('done'), job_id)
+        return True
+
+    def fail(self, job_id: int, worker_id: str, error: str = None) -> bool:
+        if not self._owned(job_id, worker_id):
+            return False
+        key = self._key('job', job_id)
+        job = self._payload(job_id)
+        self.r.zrem(self._key('leases'), str(job_id))
+        self._release_group(job_id, job)
+        if int(self.r.hget(key, 'attempts') or 0) >= self.max_attempts:
+            self.r.hset(key, mapping={'state': 'failed', 'error': error or ''})
+            self.r.srem(self._key('active'), self._active_key(job))
+        else:
+            self.r.hset(key, mapping={'state': 'queued', 'worker_id': '', 'error': error or ''})
+            self.r.rpush(self._key('queued'), job_id)
+        return True
+
+    def last_promo_sended(self, group_url: str) -> str | None:
+        return self._str(self.r.hget(self._key('last_promo'), group_url))
+
+    def pending_results(self) -> Iterator[SimpleNamespace]:
+        for job_id in self.r.lrange(self._key('done'), 0, -1):
+            job_id = self._str(job_id)
+            key = self._key('job', job_id)
+            job = SimpleNamespace(**json.loads(self._str(self.r.hget(key, 'payload'))))
+            job.id, job.result = int(job_id), json.loads(self._str(self.r.hget(key, 'result')) or '{}')
+            yield job
+
+    def mark_applied(self, job_id: int):
+        self.r.lrem(self._key('done'), 0, str(job_id))
+        self.r.delete(self._key('job', job_id))
+
+    def stats(self) -> dict[str, int]:
+        return {
+            'queued': self.r.llen(self._key('queued')),
+            'leased': self.r.zcard(self._key('leases')),
+            'done': self.r.llen(self._key('done')),
+        }
+
+
+class Heartbeat:
+    """ Sends heartbeats for a leased job from a background thread while the job is processed.
+
+    Example:
+        >>> with Heartbeat(queue, job.id, worker_id):
+        ...     promoter.process_group(group, campaign_name)
+    """
+
+    def __init__(self, queue, job_id: int, worker_id: str, interval: float = None):
+        self.queue, self.job_id, self.worker_id = queue, job_id, worker_id
+        self.interval = interval or max(5.0, queue.lease_seconds / 3)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                if not self.queue.heartbeat(self.job_id, self.worker_id):
+                    logger.warning(f"Lease of job {self.job_id} was lost")
+                    return
+            except Exception as ex:
+                logger.error(f"Heartbeat of job {self.job_id} failed", ex)
+
+    def __enter__(self) -> 'Heartbeat':
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def enqueue_campaigns(queue, campaigns: list[str], group_file_paths: list[str]) -> int:
+    """ Coordinator: expands campaigns × groups into post jobs.
+
+    Args:
+        queue: `SQLiteJobQueue` or `RedisJobQueue`.
+        campaigns (list[str]): Campaign names.
+        group_file_paths (list[str]): Group files in `data/facebook/groups`.
+
+    Returns:
+        int: Number of jobs added.
+
+    Example:
+        >>> enqueue_campaigns(SQLiteJobQueue(), ['pain'], ['ru_il.json', 'he_il.json'])
+    """
+    jobs = []
+    for group_file in group_file_paths:
+        groups: dict = load_groups(gs.path.data / 'facebook' / 'groups' / group_file)
+        for campaign_name in campaigns:
+            jobs.extend(make_job(campaign_name, group_file, group_url, group) for group_url, group in groups.items())
+    added = queue.enqueue(jobs)
+    logger.info(f"Enqueued {added} of {len(jobs)} jobs")
+    return added
+
+
+def enqueue_events(queue, events: list[SimpleNamespace], group_file_paths: list[str]) -> int:
+    """ Coordinator: expands events × groups into post jobs. One job per group carries all events. """
+    jobs = []
+    for group_file in group_file_paths:
+        groups: dict = load_groups(gs.path.data / 'facebook' / 'groups' / group_file)
+        jobs.extend(make_job('', group_file, group_url, group, is_event=True, events=events) for group_url, group in groups.items())
+    return queue.enqueue(jobs)
+
+
+def apply_results(queue) -> int:
+    """ Coordinator: folds the results acknowledged by workers into the group files.
+
+    A result is `{'promoted': [item names], 'last_promo_sended': 'dd/mm/yy HH:MM'}`.
+
+    Returns:
+        int: Number of results applied.
+    """
+    by_file: dict[str, list[SimpleNamespace]] = {}
+    for job in queue.pending_results():
+        by_file.setdefault(job.group_file, []).append(job)
+
+    applied = 0
+    for group_file, jobs in by_file.items():
+        path = gs.path.data / 'facebook' / 'groups' / group_file
+        store = GroupStore(path) if path.suffix == '.jsonl' else None
+        groups: dict = {} if store else j_loads(path) or {}
+        for job in jobs:
+            group = store.get(job.group_url, as_ns=False) if store else groups.get(job.group_url)
+            if group is not None and job.result.get('promoted'):
+                attr = 'promoted_events' if job.is_event else 'promoted_categories'
+                promoted = PromotedItems.coerce(group.get(attr), legacy_time=group.get('last_promo_sended'))
+                promoted_at = parse_promo_time(job.result.get('last_promo_sended')) or None
+                for name in job.result['promoted']:
+                    promoted.add(name, promoted_at)
+                group[attr] = dict(promoted)
+                group['last_promo_sended'] = job.result.get('last_promo_sended', group.get('last_promo_sended'))
+                if store:
+                    store.update(job.group_url, group)
+        if not store:
+            j_dumps(groups, path)
+        for job in jobs:
+            queue.mark_applied(job.id)
+            applied += 1
+    logger.info(f"Applied {applied} job results at {datetime.now():%d/%m/%y %H:%M}")
+    return applied
+
+
+def open_queue(db: str | Path = None, redis_url: str = None):
+    """ `RedisJobQueue` on `redis_url` if given, otherwise `SQLiteJobQueue` in `db`. """
+    return RedisJobQueue(url=redis_url) if redis_url else SQLiteJobQueue(db)
+
+
+def main(argv: list[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Job queue of FacebookPromoter: coordinator and worker commands")
+    parser.add_argument('--db', type=Path, help="SQLite queue file. Defaults to data/facebook/jobs.sqlite")
+    parser.add_argument('--redis', metavar='URL', help="Use the Redis queue at URL instead of SQLite")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    enqueue = commands.add_parser('enqueue', help="Coordinator: queue post jobs for campaigns or events")
+    enqueue.add_argument('--campaigns', nargs='+', default=[])
+    enqueue.add_argument('--events', type=Path, help="JSON file with events")
+    enqueue.add_argument('--groups', nargs='+', help="Group files in data/facebook/groups. Defaults to all files")
+    enqueue.add_argument('--exclude', nargs='+', default=[])
+
+    work = commands.add_parser('work', help="Worker: lease and post jobs with one browser")
+    work.add_argument('--worker-id', help="Lease owner. Defaults to <host>:<pid>")
+    work.add_argument('--attach', type=int, nargs='?', const=9222, default=0, metavar='PORT',
+                      help="Attach to the browser_daemon instance on PORT instead of starting Chrome")
+    work.add_argument('--no-video', action='store_true')
+    work.add_argument('--wait', action='store_true', help="Keep polling when the queue is empty")
+
+    commands.add_parser('apply', help="Coordinator: apply acknowledged results to the group files")
+    commands.add_parser('stats', help="Number of jobs per state")
+    args = parser.parse_args(argv)
+
+    queue = open_queue(args.db, args.redis)
+    if args.command == 'enqueue':
+        from src.advertisement.facebook.cli import load_events, resolve_group_files
+        group_files = resolve_group_files(args.groups, args.exclude)
+        if args.events:
+            enqueue_events(queue, load_events(args.events), group_files)
+        elif args.campaigns:
+            enqueue_campaigns(queue, args.campaigns, group_files)
+        else:
+            parser.error("enqueue needs --campaigns or --events")
+    elif args.command == 'work':
+        from src.webdriver import Driver, Chrome
+        from src.advertisement.facebook.promoter import FacebookPromoter
+        from src.advertisement.facebook.browser_daemon import attach_or_launch
+        d = attach_or_launch(args.attach) if args.attach else Driver(Chrome)
+        promoter = FacebookPromoter(d, group_file_paths=None, no_video=args.no_video)
+        try:
+            promoter.run_worker(queue, worker_id=args.worker_id, idle_exit=not args.wait)
+        except KeyboardInterrupt:
+            logger.info("Worker interrupted.")
+        finally:
+            promoter.stop()
+    elif args.command == 'apply':
+        apply_results(queue)
+    print(queue.stats())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
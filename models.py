@@ -0,0 +1,208 @@
+## \file ../src/advertisement/facebook/models.py
+# -*- coding: utf-8 -*-
+# /path/to/interpreter/python
+"""
+Typed records of the promoter: groups, categories, events and products.
+
+Records are built once at load time. Known fields live in `__slots__` and default to
+`None`, so the code reads `group.interval` instead of probing with `hasattr`. Fields a
+model does not know are kept in `extra` and written back by `to_dict()`, so group
+files round-trip unchanged.
+
+Example:
+    >>> group = Group.from_dict({'language': 'ru', 'currency': 'ils', 'group_categories': ['sale']},
+    ...                         group_url='https://www.facebook.com/groups/1/')
+    >>> group.interval is None, group.group_categories
+    (True, ['sale'])
+    >>> group.to_dict()
+    {'language': 'ru', 'currency': 'ils', 'group_categories': ['sale']}
+"""
+
+import re
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from src.advertisement.facebook.promoted_items import check_items
+
+PROMO_TIME_FORMAT: str = "%d/%m/%y %H:%M"
+
+
+def parse_interval(interval: str) -> timedelta:
+    """ Converts an interval like `1H` or `30M` to `timedelta`.
+
+    Raises:
+        ValueError: If the interval format is invalid.
+    """
+    match = re.match(r"(\d+)([HM])", interval)
+    if not match:
+        raise ValueError(f"Invalid interval format: {interval}")
+    value, unit = match.groups()
+    return timedelta(hours=int(value)) if unit == "H" else timedelta(minutes=int(value))
+
+
+def _ns(value):
+    """ Recursively converts dicts to `SimpleNamespace` (nested event translations). """
+    if isinstance(value, dict):
+        return SimpleNamespace(**{k: _ns(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return [_ns(v) for v in value]
+    return value
+
+
+class Model:
+    """ Base of the slotted records. Subclasses declare `fields` and `__slots__ = fields`. """
+    __slots__ = ('extra',)
+    fields: tuple[str, ...] = ()
+    required: tuple[str, ...] = ()
+    _slot_names: frozenset = frozenset(('extra',))
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._slot_names = frozenset(cls.fields) | {'extra'}
+
+    def __init__(self, **values):
+        object.__setattr__(self, 'extra', None)
+        for name in self.fields:
+            object.__setattr__(self, name, values.pop(name, None))
+        if values:
+            object.__setattr__(self, 'extra', values)
+        self.validate()
+
+    def validate(self):
+        """ Raises `ValueError` if a required field is missing. """
+        missing = [name for name in self.required if getattr(self, name) in (None, '')]
+        if missing:
+            raise ValueError(f"{type(self).__name__} {self.key()}: missing {', '.join(missing)}")
+
+    def key(self) -> str:
+        return str(getattr(self, self.fields[0], None)) if self.fields else ''
+
+    def __getattr__(self, name: str):
+        # Вызывается только для имён вне слотов: ищем среди неизвестных полей
+        extra = object.__getattribute__(self, 'extra')
+        if extra and name in extra:
+            return extra[name]
+        raise AttributeError(name)
+
+    def __setattr__(self, name: str, value):
+        if name in self._slot_names:
+            object.__setattr__(self, name, value)
+        else:
+            if self.extra is None:
+                object.__setattr__(self, 'extra', {})
+            self.extra[name] = value
+
+    @classmethod
+    def from_dict(cls, data: dict, **values) -> 'Model':
+        """ Builds the record from a dict; `values` override or add fields. """
+        return cls(**{**data, **values})
+
+    @classmethod
+    def coerce(cls, obj) -> 'Model':
+        """ Builds the record from a model, dict, `SimpleNamespace` or any object with the fields as attributes.
+
+        Objects that declare the same `fields` (lazy views such as `product_catalog.CatalogProduct`)
+        already read like the record and are returned as they are.
+        """
+        if isinstance(obj, cls) or getattr(type(obj), 'fields', None) == cls.fields:
+            return obj
+        if isinstance(obj, dict):
+            return cls.from_dict(obj)
+        if isinstance(obj, SimpleNamespace):
+            return cls.from_dict(vars(obj))
+        return cls(**{name: getattr(obj, name, None) for name in cls.fields})
+
+    def to_dict(self) -> dict:
+        """ Fields that are set, followed by the unknown fields. """
+        data = {name: getattr(self, name) for name in self.fields if getattr(self, name) is not None}
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.key()!r})"
+
+
+class Group(Model):
+    """ Facebook group. `group_url` is the key in group files and is not part of `to_dict()`. """
+    fields = (
+        'group_url',
+        'language',
+        'currency',
+        'interval',
+        'last_promo_sended',
+        'promoted_categories',
+        'promoted_events',
+        'repromote_after',
+        'account',
+    )
+    __slots__ = fields
+    required = ('group_url', 'language', 'currency')
+    interval_pattern = re.compile(r"\d+[HM]$")
+
+    def validate(self):
+        super().validate()
+        for name in ('interval', 'repromote_after'):
+            value = getattr(self, name)
+            if value is not None and not self.interval_pattern.match(str(value)):
+                raise ValueError(f"Group {self.group_url}: invalid {name} {value!r}")
+        if self.last_promo_sended:
+            try:
+                datetime.strptime(self.last_promo_sended, PROMO_TIME_FORMAT)
+            except (TypeError, ValueError):
+                raise ValueError(f"Group {self.group_url}: invalid last_promo_sended {self.last_promo_sended!r}")
+        for name in ('promoted_categories', 'promoted_events'):
+            try:
+                check_items(getattr(self, name))
+            except ValueError as ex:
+                raise ValueError(f"Group {self.group_url}: invalid {name}: {ex}")
+
+    def is_due(self, now: datetime = None) -> bool:
+        """ Checks whether `interval` has passed since `last_promo_sended`. """
+        if not self.last_promo_sended:
+            return True
+        interval = parse_interval(self.interval) if self.interval else timedelta()
+        return (now or datetime.now()) - datetime.strptime(self.last_promo_sended, PROMO_TIME_FORMAT) >= interval
+
+    def to_dict(self) -> dict:
+        data = super().to_dict()
+        data.pop('group_url', None)
+        return data
+
+
+class Category(Model):
+    """ Campaign category with the products to post. """
+    fields = ('category_name', 'title', 'description', 'products')
+    __slots__ = fields
+    required = ('category_name',)
+
+
+class Event(Model):
+    """ Event; `language` holds the event text per group language (`event.language.RU.title`). """
+    fields = ('event_name', 'language', 'start', 'end', 'promotional_link')
+    __slots__ = fields
+    required = ('event_name',)
+
+    def __init__(self, **values):
+        if isinstance(values.get('language'), dict):
+            values['language'] = _ns(values['language'])
+        super().__init__(**values)
+
+
+class Product(Model):
+    """ Product as used by the posting scenarios. `caption` is set for precompiled payloads. """
+    fields = (
+        'product_id',
+        'language',
+        'product_title',
+        'original_price',
+        'sale_price',
+        'discount',
+        'evaluate_rate',
+        'promotion_link',
+        'tags',
+        'image_local_saved_path',
+        'video_local_saved_path',
+        'caption',
+    )
+    __slots__ = fields
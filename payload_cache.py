@@ -0,0 +1,199 @@
+## \file ../src/advertisement/facebook/payload_cache.py
+# -*- coding: utf-8 -*-
+# /path/to/interpreter/python
+"""
+Ahead-of-time compiled campaign payloads.
+
+The compile stage expands every campaign × locale × category into a ready-to-post payload:
+title, description, resolved media paths and rendered captions. All payloads are written to
+one cache file. The browser stage only memory-maps the file, so several worker processes share
+the same pages of the file. A record is decoded when a group needs it and is not kept after
+that; no process holds its own copy of the payloads.
+
+The modification stamp of every campaign directory is stored with the cache. When a campaign
+changed after the cache was built, its payloads are ignored (the promoter reads the campaign
+itself) until the cache is compiled again.
+
+File layout:
+    MAGIC (8 bytes) | index offset (uint64) | index length (uint64) | records ... | index (JSON)
+The index holds `records`, mapping `campaign|LANGUAGE|CURRENCY` to `[offset, length]` of a
+JSON record, and `campaigns`, mapping a campaign name to its stamp.
+"""
+
+import argparse
+import importlib
+import json
+import mmap
+import os
+import struct
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+from src import gs
+from src.suppliers.aliexpress.campaign import AliCampaignEditor
+from src.utils import j_loads_ns
+from src.logger import logger
+from src.advertisement.facebook.group_store import load_groups
+
+MAGIC: bytes = b'FBPAYLD2'
+HEADER: struct.Struct = struct.Struct('<8sQQ')
+DEFAULT_PATH: Path = gs.path.data / 'facebook' / 'payloads.cache'
+CAMPAIGNS_DIR: Path = gs.path.google_drive / 'aliexpress' / 'campaigns'
+
+post_message_module = importlib.import_module('src.advertisement.facebook.scenarios.post_message')
+
+
+def payload_key(campaign_name: str, language: str, currency: str) -> str:
+    return f"{campaign_name}|{language.upper()}|{currency.upper()}"
+
+
+def campaign_stamp(campaign_name: str, campaigns_dir: str | Path = None) -> int:
+    """ Latest modification time (ns) of the files of a campaign, `0` if the campaign does not exist. """
+    campaign_dir = Path(campaigns_dir or CAMPAIGNS_DIR) / campaign_name
+    stamps = [path.stat().st_mtime_ns for path in campaign_dir.rglob('*') if path.is_file()] if campaign_dir.exists() else []
+    return max(stamps, default=0)
+
+
+def group_locales(group_file_paths: list[str]) -> set[tuple[str, str]]:
+    """ Collects the (language, currency) pairs used by the groups in the files. """
+    locales = set()
+    for group_file in group_file_paths:
+        groups = load_groups(gs.path.data / 'facebook' / 'groups' / group_file)
+        for group in groups.values():
+            if group.get('language') and group.get('currency'):
+                locales.add((group['language'].upper(), group['currency'].upper()))
+    return locales
+
+
+def render_category(ce: AliCampaignEditor, category: SimpleNamespace, language: str, local_units: SimpleNamespace) -> dict:
+    """ Renders one category into a payload: text, media paths and captions of its products. """
+    products = []
+    for product in ce.get_category_products(category.category_name) or []:
+        if not hasattr(product, 'language'):
+            product.language = language
+        record = {
+            'language': product.language,
+            'caption': post_message_module.build_caption(product, local_units),
+            'image_local_saved_path': str(product.image_local_saved_path),
+        }
+        if hasattr(product, 'video_local_saved_path'):
+            record['video_local_saved_path'] = str(product.video_local_saved_path)
+        products.append(record)
+
+    return {
+        'category_name': category.category_name,
+        'title': category.title,
+        'description': category.description,
+        'products': products,
+    }
+
+
+def compile_payloads(campaigns: list[str], group_file_paths: list[str], path: str | Path = None) -> Path:
+    """ Compiles all payloads of the campaigns for the locales used by the groups.
+
+    Args:
+        campaigns (list[str]): Campaign names.
+        group_file_paths (list[str]): Group files in `data/facebook/groups` whose locales are compiled.
+        path (str | Path, optional): Cache file. Defaults to `data/facebook/payloads.cache`.
+
+    Returns:
+        Path: The written cache file.
+
+    Example:
+        >>> compile_payloads(['pain'], ['ru_il.json', 'he_il.json'])
+    """
+    path = Path(path) if path else DEFAULT_PATH
+    local_units = j_loads_ns(gs.path.src / 'advertisement' / 'facebook' / 'scenarios' / 'translations.json')
+    locales = sorted(group_locales(group_file_paths))
+
+    tmp_path = path.with_suffix('.tmp')
+    path.parent.mkdir(parents=True, exist_ok=True)
+    index: dict[str, list[int]] = {}
+    stamps: dict[str, int] = {}
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, 0, 0))
+        for campaign_name in campaigns:
+            stamps[campaign_name] = campaign_stamp(campaign_name)  # <- до чтения: правка во время сборки сделает кэш устаревшим
+            for language, currency in locales:
+                ce = AliCampaignEditor(campaign_name=campaign_name, language=language, currency=currency)
+                categories = [render_category(ce, category, language, local_units)
+                              for category in vars(ce.campaign.category).values()]
+                record = json.dumps(categories, ensure_ascii=False).encode('utf-8')
+                index[payload_key(campaign_name, language, currency)] = [f.tell(), len(record)]
+                f.write(record)
+                logger.info(f"Compiled {campaign_name} {language}/{currency}: {len(categories)} categories")
+
+        index_offset = f.tell()
+        index_bytes = json.dumps({'records': index, 'campaigns': stamps}, ensure_ascii=False).encode('utf-8')
+        f.write(index_bytes)
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, index_offset, len(index_bytes)))
+    os.replace(tmp_path, path)
+    return path
+
+
+class PayloadCache:
+    """ Read-only, memory-mapped view of a compiled payload cache.
+
+    Example:
+        >>> cache = PayloadCache()
+        >>> for category in cache.categories('pain', 'RU', 'ILS'):
+        ...     post_message(d, category)
+    """
+
+    def __init__(self, path: str | Path = None, check_interval: float = 60):
+        """
+        Args:
+            path (str | Path, optional): Cache file. Defaults to `data/facebook/payloads.cache`.
+            check_interval (float, optional): Seconds between checks that a campaign did not change. Defaults to 60.
+        """
+        self.path = Path(path) if path else DEFAULT_PATH
+        self.check_interval = check_interval
+        self._file = open(self.path, 'rb')
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, index_offset, index_length = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"Not a payload cache (or built by an older version): {self.path}")
+        index = json.loads(self._mm[index_offset:index_offset + index_length])
+        self.index: dict[str, list[int]] = index['records']
+        self.campaign_stamps: dict[str, int] = index['campaigns']
+        self._checked: dict[str, tuple[float, bool]] = {}
+
+    def is_current(self, campaign_name: str) -> bool:
+        """ Checks (at most every `check_interval` seconds) that the campaign did not change after the cache was built. """
+        checked_at, current = self._checked.get(campaign_name, (None, True))
+        if checked_at is None or time.monotonic() - checked_at >= self.check_interval:
+            was_current = current
+            current = campaign_stamp(campaign_name) == self.campaign_stamps.get(campaign_name)
+            if was_current and not current:
+                logger.warning(f"Campaign {campaign_name} changed after {self.path.name} was built; "
+                               f"its payloads are ignored until the cache is compiled again")
+            self._checked[campaign_name] = (time.monotonic(), current)
+        return current
+
+    def categories(self, campaign_name: str, language: str, currency: str) -> list[SimpleNamespace] | None:
+        """ Returns the compiled categories of a campaign for a locale.
+
+        Returns:
+            list[SimpleNamespace] | None: Decoded categories, or `None` if the locale was not compiled
+                or the campaign changed since.
+        """
+        key = payload_key(campaign_name, language, currency)
+        if key not in self.index or not self.is_current(campaign_name):
+            return None
+        offset, length = self.index[key]
+        return json.loads(self._mm[offset:offset + length], object_hook=lambda d: SimpleNamespace(**d))
+
+    def close(self):
+        self._mm.close()
+        self._file.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compile campaign payloads for FacebookPromoter")
+    parser.add_argument('campaigns', nargs='+')
+    parser.add_argument('--groups', nargs='+', required=True, help="Group files in data/facebook/groups")
+    parser.add_argument('--output', type=Path, default=DEFAULT_PATH)
+    args = parser.parse_args()
+    print(compile_payloads(args.campaigns, args.groups, args.output))
@@ -0,0 +1,81 @@
+## \file ../src/advertisement/facebook/planner.py
+# -*- coding: utf-8 -*-
+# /path/to/interpreter/python
+"""
+Ordering of due groups into locale batches.
+
+`process_groups` used to visit the due groups in file order, so consecutive groups
+switched between languages, currencies and accounts, and every group reloaded its
+campaign. `plan_jobs` orders the due groups of a run so that switches happen once
+per batch:
+
+    - groups are batched by `(language, currency)` - the campaign categories, their
+      captions and product media are the same for the whole batch;
+    - inside a batch, groups of the same `account` are kept together;
+    - inside an account, the most overdue groups go first.
+
+Batches start with the one holding the most overdue group. With `max_batch` a batch is
+split into rounds of at most that many groups, so a large locale does not hold back the
+due groups of the other locales for a whole pass. Only the order changes: the interval
+of every group is still checked right before it is posted.
+
+Example:
+    >>> jobs = plan_jobs(jobs, max_batch=50)
+"""
+
+import math
+from datetime import datetime
+from itertools import groupby
+
+from src.advertisement.facebook.models import Group, PROMO_TIME_FORMAT, parse_interval
+
+
+def batch_key(group: Group) -> tuple[str, str]:
+    """ Locale batch of a group: `(LANGUAGE, CURRENCY)`. """
+    return ((group.language or '').upper(), (group.currency or '').upper())
+
+
+def overdue_seconds(group: Group, now: datetime = None) -> float:
+    """ Seconds since the group became due; groups never promoted are the most overdue. """
+    if not group.last_promo_sended:
+        return math.inf
+    try:
+        due_at = datetime.strptime(group.last_promo_sended, PROMO_TIME_FORMAT)
+        if group.interval:
+            due_at += parse_interval(group.interval)
+    except (TypeError, ValueError):
+        return math.inf
+    return ((now or datetime.now()) - due_at).total_seconds()
+
+
+def plan_jobs(jobs: list[tuple], now: datetime = None, max_batch: int = None) -> list[tuple]:
+    """ Orders the jobs of a run by locale batch, account and due time.
+
+    Args:
+        jobs (list[tuple]): Jobs whose first element is the `Group`, as built by `process_groups`.
+        now (datetime, optional): Time the due times are measured from. Defaults to now.
+        max_batch (int, optional): Groups of one batch posted before the other batches get a turn. Defaults to no limit.
+
+    Returns:
+        list[tuple]: The same jobs, in posting order.
+    """
+    now = now or datetime.now()
+    overdue = {id(job): overdue_seconds(job[0], now) for job in jobs}
+    ordered = sorted(jobs, key=lambda job: (batch_key(job[0]), job[0].account or '', -overdue[id(job)]))
+
+    batches: list[list[tuple]] = []
+    for _, batch in groupby(ordered, key=lambda job: batch_key(job[0])):
+        batch = list(batch)
+        # аккаунт с самой давно ожидающей группой - первым
+        accounts = [list(account_jobs) for _, account_jobs in groupby(batch, key=lambda job: job[0].account or '')]
+        accounts.sort(key=lambda account_jobs: -overdue[id(account_jobs[0])])
+        batches.append([job for account_jobs in accounts for job in account_jobs])
+    batches.sort(key=lambda batch: -max(overdue[id(job)] for job in batch))
+
+    if not max_batch:
+        return [job for batch in batches for job in batch]
+    planned: list[tuple] = []
+    for start in range(0, max(len(batch) for batch in batches) if batches else 0, max_batch):
+        for batch in batches:
+            planned.extend(batch[start:start + max_batch])
+    return planned
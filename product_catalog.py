@@ -0,0 +1,236 @@
+## \file ../src/advertisement/facebook/product_catalog.py
+# -*- coding: utf-8 -*-
+# /path/to/interpreter/python
+"""
+Memory-mapped product catalog of a campaign.
+
+One file per campaign × locale holds an array-backed product table, a string heap and a
+per-category index. Products of a category are stored contiguously, so the index only
+keeps the first row and the number of rows. Promoter processes map the same file and
+read product fields straight from the shared pages; a product is a small view
+(`CatalogProduct`) that decodes a field only when it is accessed.
+
+The header keeps the campaign stamp (`payload_cache.campaign_stamp`) the catalog was built
+from. `ProductCatalog.is_current` compares it with the campaign files, as
+`PayloadCache.is_current` does; the promoter reopens or rebuilds a stale catalog.
+
+File layout:
+    MAGIC (8 bytes) | rows (uint32) | table offset | heap offset | index offset | index length | campaign stamp (uint64 each)
+    table: per row and field `(heap offset, length)` as uint32; length `MISSING` - the field is absent
+    heap: UTF-8 strings
+    index: JSON `{category_name: {title, description, first, count}}`
+
+Build the catalogs for the locales of the group files:
+    python -m src.advertisement.facebook.product_catalog pain --groups ru_il.json he_il.json
+"""
+
+import argparse
+import json
+import mmap
+import os
+import struct
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+from src import gs
+from src.suppliers.aliexpress.campaign import AliCampaignEditor
+from src.logger import logger
+from src.advertisement.facebook.payload_cache import group_locales, campaign_stamp
+from src.advertisement.facebook.models import Product
+
+MAGIC: bytes = b'FBCATLG2'
+HEADER: struct.Struct = struct.Struct('<8sIQQQQQ')
+MISSING: int = 0xFFFFFFFF
+DEFAULT_DIR: Path = gs.path.data / 'facebook' / 'catalogs'
+
+# Поля товара, которые используют сценарии публикации.
+FIELDS: tuple[str, ...] = (
+    'product_id',
+    'language',
+    'product_title',
+    'original_price',
+    'sale_price',
+    'discount',
+    'evaluate_rate',
+    'promotion_link',
+    'tags',
+    'image_local_saved_path',
+    'video_local_saved_path',
+)
+FIELD_NO: dict[str, int] = {name: i for i, name in enumerate(FIELDS)}
+ROW: struct.Struct = struct.Struct('<' + 'II' * len(FIELDS))
+
+
+def catalog_path(campaign_name: str, language: str, currency: str, catalog_dir: str | Path = None) -> Path:
+    return Path(catalog_dir or DEFAULT_DIR) / f"{campaign_name}_{language.upper()}_{currency.upper()}.catalog"
+
+
+def build_catalog(campaign_name: str, language: str, currency: str, catalog_dir: str | Path = None) -> Path:
+    """ Writes the catalog of one campaign locale.
+
+    Returns:
+        Path: The written catalog file.
+    """
+    path = catalog_path(campaign_name, language, currency, catalog_dir)
+    stamp = campaign_stamp(campaign_name)  # <- до чтения кампании: правка во время сборки сделает каталог устаревшим
+    ce = AliCampaignEditor(campaign_name=campaign_name, language=language, currency=currency)
+
+    heap = bytearray()
+    strings: dict[str, tuple[int, int]] = {}  # <- одинаковые строки (теги, язык) хранятся один раз
+
+    def intern(value) -> tuple[int, int]:
+        if value is None:
+            return 0, MISSING
+        value = str(value)
+        if value not in strings:
+            data = value.encode('utf-8')
+            strings[value] = (len(heap), len(data))
+            heap.extend(data)
+        return strings[value]
+
+    rows = bytearray()
+    index = {}
+    row_count = 0
+    for category in vars(ce.campaign.category).values():
+        products = ce.get_category_products(category.category_name) or []
+        index[category.category_name] = {
+            'title': category.title,
+            'description': category.description,
+            'first': row_count,
+            'count': len(products),
+        }
+        for product in products:
+            refs = []
+            for field in FIELDS:
+                value = getattr(product, field, None)
+                if field == 'language' and value is None:
+                    value = language
+                refs.extend(intern(value))
+            rows.extend(ROW.pack(*refs))
+            row_count += 1
+
+    index_bytes = json.dumps(index, ensure_ascii=False).encode('utf-8')
+    table_offset = HEADER.size
+    heap_offset = table_offset + len(rows)
+    index_offset = heap_offset + len(heap)
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(f".{os.getpid()}.tmp")  # <- процессы промоутера могут пересобирать каталог одновременно
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, row_count, table_offset, heap_offset, index_offset, len(index_bytes), stamp))
+        f.write(rows)
+        f.write(heap)
+        f.write(index_bytes)
+    os.replace(tmp_path, path)
+    logger.info(f"Catalog {path.name}: {len(index)} categories, {row_count} products, {len(heap)} bytes of strings")
+    return path
+
+
+class CatalogProduct:
+    """ View of one product row. Fields are decoded from the mapped file on access.
+
+    Reads like `models.Product`: absent product fields are `None`, and `Product.coerce`
+    keeps the view instead of copying its fields.
+    """
+    __slots__ = ('_catalog', '_row')
+    fields = Product.fields
+
+    def __init__(self, catalog: 'ProductCatalog', row: int):
+        self._catalog = catalog
+        self._row = row
+
+    def __getattr__(self, name: str) -> str | None:
+        if name in FIELD_NO:
+            return self._catalog.field(self._row, FIELD_NO[name])
+        if name in self.fields:
+            return None  # <- `caption` в каталоге не хранится
+        raise AttributeError(name)
+
+    def __repr__(self) -> str:
+        return f"CatalogProduct({self.product_id or self._row})"
+
+
+class ProductCatalog:
+    """ Read-only, memory-mapped product catalog of one campaign locale.
+
+    Example:
+        >>> catalog = ProductCatalog.open('pain', 'RU', 'ILS')
+        >>> for category in catalog.categories():
+        ...     post_message(d, category)        # category.products are `CatalogProduct` views
+    """
+
+    def __init__(self, path: str | Path, campaign_name: str = None, check_interval: float = 60):
+        """
+        Args:
+            path (str | Path): Catalog file.
+            campaign_name (str, optional): Campaign of the catalog; without it `is_current` is always `True`.
+            check_interval (float, optional): Seconds between checks that the campaign did not change. Defaults to 60.
+        """
+        self.path = Path(path)
+        self.campaign_name = campaign_name
+        self.check_interval = check_interval
+        self._checked: tuple[float, bool] | None = None
+        self._file = open(self.path, 'rb')
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError(f"Not a product catalog of this version: {self.path}")
+        (_, self.rows, self._table_offset, self._heap_offset,
+         index_offset, index_length, self.campaign_stamp) = HEADER.unpack_from(self._mm, 0)
+        self.index: dict[str, dict] = json.loads(self._mm[index_offset:index_offset + index_length])
+
+    @classmethod
+    def open(cls, campaign_name: str, language: str, currency: str, catalog_dir: str | Path = None) -> 'ProductCatalog | None':
+        """ Opens the catalog of a campaign locale, or returns `None` if it was not built (or was built by an older version). """
+        path = catalog_path(campaign_name, language, currency, catalog_dir)
+        if not path.exists():
+            return None
+        try:
+            return cls(path, campaign_name)
+        except ValueError as ex:
+            logger.warning(f"{ex}; build it again with product_catalog")
+            return None
+
+    def is_current(self) -> bool:
+        """ Checks (at most every `check_interval` seconds) that the campaign did not change after the catalog was built. """
+        if not self.campaign_name:
+            return True
+        if self._checked is None or time.monotonic() - self._checked[0] >= self.check_interval:
+            current = campaign_stamp(self.campaign_name) == self.campaign_stamp
+            if not current and (self._checked is None or self._checked[1]):
+                logger.warning(f"Campaign {self.campaign_name} changed after {self.path.name} was built")
+            self._checked = (time.monotonic(), current)
+        return self._checked[1]
+
+    def field(self, row: int, field_no: int) -> str | None:
+        offset, length = struct.unpack_from('<II', self._mm, self._table_offset + row * ROW.size + field_no * 8)
+        if length == MISSING:
+            return None
+        start = self._heap_offset + offset
+        return self._mm[start:start + length].decode('utf-8')
+
+    def products(self, category_name: str) -> list[CatalogProduct]:
+        entry = self.index[category_name]
+        return [CatalogProduct(self, row) for row in range(entry['first'], entry['first'] + entry['count'])]
+
+    def categories(self) -> list[SimpleNamespace]:
+        """ Categories ready for `post_message`: `category_name`, `title`, `description` and `products`. """
+        return [SimpleNamespace(category_name=name, title=entry['title'], description=entry['description'],
+                                products=self.products(name))
+                for name, entry in self.index.items()]
+
+    def close(self):
+        self._mm.close()
+        self._file.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build memory-mapped product catalogs for FacebookPromoter")
+    parser.add_argument('campaigns', nargs='+')
+    parser.add_argument('--groups', nargs='+', required=True, help="Group files in data/facebook/groups")
+    parser.add_argument('--output', type=Path, default=DEFAULT_DIR)
+    args = parser.parse_args()
+    for campaign_name in args.campaigns:
+        for language, currency in sorted(group_locales(args.groups)):
+            print(build_catalog(campaign_name, language, currency, args.output))
@@ -0,0 +1,184 @@
+## \file ../src/advertisement/facebook/profiling.py
+# -*- coding: utf-8 -*-
+# /path/to/interpreter/python
+"""
+Profiling mode of promoter runs.
+
+`RunProfiler` samples the stacks of the posting threads from a background thread every
+`interval` seconds for the whole run and, at every group boundary, takes a `tracemalloc`
+snapshot. The posting threads are the thread that starts the profiler and the tab threads
+that register with `track_thread()`; the snapshot writer, watchdog observer and other
+helper threads are not sampled. Samples of a posting thread blocked on a lock, a queue or
+a future (e.g. while its tabs post) are skipped as idle. On `stop()` it writes to
+`tmp/facebook_profiles/<run>/`:
+
+    - `profile.folded` - folded stacks (`frame;frame;frame count`) for flamegraph.pl or speedscope;
+    - `summary.txt` - share of samples spent in our own Python versus waiting on the browser
+      (frames of selenium, urllib3, http.client, socket) and the functions of `promoter.py`
+      and the scenarios with the most samples;
+    - `allocations.txt` - top allocation growth between group boundaries, by line of the
+      promoter package, and the top allocations at the end of the run.
+
+Example:
+    >>> profiler = RunProfiler().start()
+    >>> promoter = FacebookPromoter(d, group_file_paths=files, profiler=profiler)
+    >>> promoter.run_campaigns(['pain'])
+    >>> profiler.stop()
+"""
+
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+
+from src import gs
+from src.logger import logger
+
+# Кадры, в которых промоутер ждёт браузер
+BROWSER_MODULES: tuple[str, ...] = ('selenium', 'urllib3', 'http/client', 'http\\client', 'socket', 'ssl')
+PACKAGE_MARKER: str = 'facebook'
+# Собственные кадры и аллокации профайлера в отчёты не попадают
+MEMORY_FILTERS: tuple = (tracemalloc.Filter(True, f"*{PACKAGE_MARKER}*"), tracemalloc.Filter(False, __file__))
+# Поток, который стоит в этих кадрах, простаивает и не сэмплируется
+IDLE_MODULES: tuple[str, ...] = ('threading.py', 'queue.py', 'selectors.py', 'concurrent/futures', 'concurrent\\futures')
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    return f"{Path(code.co_filename).name}:{code.co_name}"
+
+
+def _is_browser(filename: str) -> bool:
+    return any(module in filename for module in BROWSER_MODULES)
+
+
+def _is_idle(filename: str) -> bool:
+    return any(module in filename for module in IDLE_MODULES)
+
+
+class RunProfiler:
+    """ Low-overhead sampling profiler with allocation snapshots at group boundaries. """
+
+    def __init__(self, output_dir: str | Path = None, interval: float = 0.005, trace_memory: bool = True, top: int = 30):
+        """
+        Args:
+            output_dir (str | Path, optional): Report directory. Defaults to `tmp/facebook_profiles/<date>`.
+            interval (float, optional): Seconds between stack samples. Defaults to 0.005.
+            trace_memory (bool, optional): Take `tracemalloc` snapshots at group boundaries. Defaults to True.
+            top (int, optional): Lines in the reports. Defaults to 30.
+        """
+        self.output_dir = Path(output_dir) if output_dir else gs.path.tmp / 'facebook_profiles' / f"{datetime.now():%y%m%d_%H%M%S}"
+        self.interval = interval
+        self.trace_memory = trace_memory
+        self.top = top
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.browser_samples = 0
+        self.idle_samples = 0
+        self.threads: set[int] = set()
+        self.own_functions: Counter = Counter()
+        self.allocation_growth: Counter = Counter()
+        self.boundaries = 0
+        self._previous_snapshot = None
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    def start(self) -> 'RunProfiler':
+        """ Starts sampling the calling thread (the one that runs the promoter). """
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start(10)
+        self.track_thread()
+        self._thread = threading.Thread(target=self._sample_loop, name='run-profiler', daemon=True)
+        self._thread.start()
+        return self
+
+    def track_thread(self):
+        """ Samples the calling thread too, e.g. a tab thread of `process_groups_in_tabs`. """
+        self.threads.add(threading.get_ident())
+
+    def untrack_thread(self):
+        self.threads.discard(threading.get_ident())
+
+    def _sample_loop(self):
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            for thread_id in list(self.threads):
+                if thread_id in frames:
+                    self._sample(frames[thread_id])
+
+    def _sample(self, frame):
+        if _is_idle(frame.f_code.co_filename):
+            self.idle_samples += 1
+            return
+        names, waiting, own_leaf = [], False, None
+        while frame is not None:
+            filename = frame.f_code.co_filename
+            if _is_browser(filename):
+                waiting = True
+            elif own_leaf is None and PACKAGE_MARKER in filename and filename != __file__ and not waiting:
+                own_leaf = _frame_name(frame)  # <- ближайшая к вершине функция промоутера или сценария
+            names.append(_frame_name(frame))
+            frame = frame.f_back
+        self.stacks[';'.join(reversed(names))] += 1
+        self.samples += 1
+        if waiting:
+            self.browser_samples += 1
+        elif own_leaf:
+            self.own_functions[own_leaf] += 1
+
+    def group_boundary(self, label: str = None):
+        """ Takes an allocation snapshot and adds the growth since the previous boundary, by line. """
+        if not self.trace_memory or not tracemalloc.is_tracing():
+            return
+        with self._lock:
+            snapshot = tracemalloc.take_snapshot().filter_traces(MEMORY_FILTERS)
+            if self._previous_snapshot is not None:
+                for stat in snapshot.compare_to(self._previous_snapshot, 'lineno'):
+                    if stat.size_diff > 0:
+                        frame = stat.traceback[0]
+                        self.allocation_growth[f"{frame.filename}:{frame.lineno}"] += stat.size_diff
+            self._previous_snapshot = snapshot
+            self.boundaries += 1
+        logger.debug(f"Memory snapshot at {label or 'group boundary'}: {tracemalloc.get_traced_memory()[0] / 2**20:.1f} MB traced", None, False)
+
+    def stop(self) -> Path:
+        """ Stops sampling and writes the reports.
+
+        Returns:
+            Path: Report directory.
+        """
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+
+        with open(self.output_dir / 'profile.folded', 'w', encoding='utf-8') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+        own = self.samples - self.browser_samples
+        lines = [
+            f"samples: {self.samples} every {self.interval * 1000:.0f} ms; idle samples skipped: {self.idle_samples}",
+            f"waiting on the browser: {self.browser_samples} ({self.browser_samples / max(self.samples, 1):.0%})",
+            f"own Python and idle: {own} ({own / max(self.samples, 1):.0%})",
+            "",
+            "promoter and scenario functions (innermost on the stack, not waiting on the browser):",
+            *[f"{count:8d}  {name}" for name, count in self.own_functions.most_common(self.top)],
+        ]
+        (self.output_dir / 'summary.txt').write_text("\n".join(lines) + "\n", encoding='utf-8')
+
+        lines = [f"allocation growth over {self.boundaries} group boundaries:"]
+        lines += [f"{size / 1024:10.1f} KiB  {where}" for where, size in self.allocation_growth.most_common(self.top)]
+        if tracemalloc.is_tracing():
+            lines += ["", "top allocations at the end of the run:"]
+            snapshot = tracemalloc.take_snapshot().filter_traces(MEMORY_FILTERS)
+            lines += [f"{stat.size / 1024:10.1f} KiB  {stat.traceback[0].filename}:{stat.traceback[0].lineno}"
+                      for stat in snapshot.statistics('lineno')[:self.top]]
+            tracemalloc.stop()
+        (self.output_dir / 'allocations.txt').write_text("\n".join(lines) + "\n", encoding='utf-8')
+        logger.info(f"Profile written to {self.output_dir}")
+        return self.output_dir
@@ -0,0 +1,137 @@
+## \file ../src/advertisement/facebook/promoted_items.py
+# -*- coding: utf-8 -*-
+# /path/to/interpreter/python
+"""
+Bounded, expiring sets of promoted items.
+
+`group.promoted_categories` and `group.promoted_events` are stored as `{item_name: epoch_seconds}`.
+An item counts as promoted until its TTL runs out; after that it may be promoted again.
+The set keeps at most `max_items` entries - the oldest are dropped first - so group files do
+not grow with every campaign. Legacy lists of names are read with `last_promo_sended` of the
+group as the time of every item; legacy dicts `{item_name: 'dd/mm/yy HH:MM'}` are read with
+the stored time of each item.
+"""
+
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+DEFAULT_MAX_ITEMS: int = 500
+
+
+def parse_promo_time(value: str | None) -> int:
+    """ `last_promo_sended` (`dd/mm/yy HH:MM`) as epoch seconds, `0` if missing or malformed. """
+    try:
+        return int(datetime.strptime(value, "%d/%m/%y %H:%M").timestamp()) if value else 0
+    except ValueError:
+        return 0
+
+
+def item_time(value) -> int:
+    """ Stored time of a promoted item as epoch seconds: a number, or `dd/mm/yy HH:MM` of the legacy format.
+
+    Raises:
+        ValueError: If the value is neither.
+    """
+    if value is None or value == '':
+        return 0
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return int(value)
+    if isinstance(value, str):
+        try:
+            return int(float(value))
+        except ValueError:
+            pass
+        try:
+            return int(datetime.strptime(value.strip(), "%d/%m/%y %H:%M").timestamp())
+        except ValueError:
+            pass
+    raise ValueError(f"invalid promotion time {value!r}")
+
+
+def check_items(value):
+    """ Raises `ValueError` if stored `promoted_categories` / `promoted_events` cannot be read by `PromotedItems.coerce`. """
+    if value is None or isinstance(value, (list, tuple)):
+        return
+    if isinstance(value, SimpleNamespace):
+        value = vars(value)
+    if not isinstance(value, dict):
+        raise ValueError(f"expected a list or an object, got {type(value).__name__}")
+    for name, ts in value.items():
+        try:
+            item_time(ts)
+        except ValueError as ex:
+            raise ValueError(f"{name}: {ex}")
+
+
+class PromotedItems(dict):
+    """ `{item_name: epoch_seconds}` with TTL-aware membership.
+
+    A dict subclass, so it is written to group files as a plain JSON object.
+
+    Example:
+        >>> promoted = PromotedItems.coerce(['pain', 'sleep'], ttl=timedelta(days=30), legacy_time='01/01/25 10:00')
+        >>> 'pain' in promoted
+        False
+        >>> promoted.add('pain')
+        >>> 'pain' in promoted
+        True
+    """
+
+    def __init__(self, items: dict = None, ttl: timedelta = None, max_items: int = DEFAULT_MAX_ITEMS):
+        super().__init__(items or {})
+        self.ttl = ttl
+        self.max_items = max_items
+
+    @classmethod
+    def coerce(cls, value, ttl: timedelta = None, max_items: int = DEFAULT_MAX_ITEMS, legacy_time: str = None) -> 'PromotedItems':
+        """ Builds the set from what is stored in a group: a list of names, a dict or a namespace.
+
+        Args:
+            value: Stored `promoted_categories` / `promoted_events`, or `None`.
+            ttl (timedelta, optional): Time after which an item may be promoted again. `None` - never.
+            max_items (int, optional): Maximum number of kept items. Defaults to 500.
+            legacy_time (str, optional): `last_promo_sended` of the group, the time of items read from a list.
+        """
+        if isinstance(value, cls):
+            value.ttl, value.max_items = ttl, max_items
+            return value.prune()
+        if isinstance(value, SimpleNamespace):
+            value = vars(value)
+        legacy_ts = parse_promo_time(legacy_time) or int(time.time())  # <- without a time the items count as fresh
+        if isinstance(value, dict):
+            items = {}
+            for name, ts in value.items():
+                try:
+                    items[name] = item_time(ts)
+                except ValueError:
+                    items[name] = legacy_ts  # <- `Group.validate` сообщает о таких значениях при загрузке
+        else:
+            items = dict.fromkeys(value or [], legacy_ts)
+        return cls(items, ttl, max_items).prune()
+
+    def __contains__(self, name: str) -> bool:
+        ts = self.get(name)
+        if ts is None:
+            return False
+        return not self.ttl or time.time() - ts < self.ttl.total_seconds()
+
+    def add(self, name: str, ts: float = None):
+        """ Marks the item as promoted now (or at `ts`). """
+        self.pop(name, None)  # <- порядок вставки = порядок по времени
+        self[name] = int(ts if ts is not None else time.time())
+        if len(self) > self.max_items:
+            self.prune()
+
+    append = add  # <- совместимость с кодом, который работал со списками
+
+    def prune(self) -> 'PromotedItems':
+        """ Drops expired items and the oldest items above `max_items`. """
+        if self.ttl:
+            horizon = time.time() - self.ttl.total_seconds()
+            for name in [name for name, ts in self.items() if ts < horizon]:
+                del self[name]
+        if len(self) > self.max_items:
+            for name, _ in sorted(self.items(), key=lambda item: item[1])[:len(self) - self.max_items]:
+                del self[name]
+        return self
@@ -7,19 +7,36 @@ This module handles the promotion of messages and events in Facebook groups.
 It processes campaigns and events, posting them to Facebook groups while avoiding duplicate promotions.
 """
 ...
+import queue
+import threading
 import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from pathlib import Path
-import re
 from urllib.parse import urlencode
 from types import SimpleNamespace
 
 from src import gs
 from src.webdriver import Driver, Chrome
 from src.suppliers.aliexpress.campaign import AliCampaignEditor
-from src.advertisement.facebook.scenarios import post_message, post_event
+from src.advertisement.facebook.scenarios import post_message, post_event, locator_timeouts, ChromeTracer, snapshot_failure
+from src.advertisement.facebook.promotion_log import PromotionLog
+from src.advertisement.facebook.payload_cache import PayloadCache
+from src.advertisement.facebook.product_catalog import ProductCatalog, build_catalog
+from src.advertisement.facebook.job_queue import Heartbeat, default_worker_id, dict_to_ns
+from src.advertisement.facebook.sharding import shard_of
+from src.advertisement.facebook.driver_recycler import DriverRecycler
+from src.advertisement.facebook.group_store import GroupStore, is_group_file
+from src.advertisement.facebook.promoted_items import PromotedItems, DEFAULT_MAX_ITEMS, parse_promo_time
+from src.advertisement.facebook.models import Group, Category, Event, Product, parse_interval
+from src.advertisement.facebook.group_loader import load_group_files, GroupFileCache
+from src.advertisement.facebook.tabs import TabDriver, open_tabs
+from src.advertisement.facebook.verification import VerificationQueue, apply_verifications
+from src.advertisement.facebook.profiling import RunProfiler
+from src.advertisement.facebook.planner import plan_jobs
 from src.utils import get_filenames, get_directory_names
-from src.utils import j_loads_ns, j_dumps
+from src.utils import j_loads, j_dumps
 from src.utils.cursor_spinner import spinning_cursor
 from src.logger import logger
 
@@ -54,18 +71,72 @@ class FacebookPromoter:
     d:Driver = None
     group_file_paths: str | Path = None
     no_video:bool = False
-    def __init__(self, d: Driver, group_file_paths: list[str | Path] | str | Path, no_video: bool = False):
+    tracer: ChromeTracer = None
+    promotion_log: PromotionLog = None
+    payload_cache: PayloadCache = None
+    recycler: DriverRecycler = None
+    repromote_after: timedelta = None
+    max_promoted_items: int = DEFAULT_MAX_ITEMS
+    tabs: int = 1
+    verification: VerificationQueue = None
+    group_cache: GroupFileCache = None
+    profiler: RunProfiler = None
+    max_batch: int = None
+    def __init__(self, d: Driver, group_file_paths: list[str | Path] | str | Path, no_video: bool = False, trace: bool | str | Path = False,
+                 payload_cache: str | Path = None, shard: tuple[int, int] = None, file_lock = None, recycler: DriverRecycler = None,
+                 repromote_after: timedelta = None, max_promoted_items: int = DEFAULT_MAX_ITEMS, product_catalogs: bool | str | Path = False,
+                 tabs: int = 1, verification: VerificationQueue = None, profiler: RunProfiler = None, max_batch: int = None):
         """ Initializes the promoter for Facebook groups.
 
         Args:
             d (Driver): WebDriver instance for browser automation.
             group_file_paths (list[str | Path] | str | Path): List of file paths containing group data.
             no_video (bool, optional): Flag to disable videos in posts. Defaults to False.
+            trace (bool | str | Path, optional): Record driver calls to a Chrome Trace Event file.
+                `True` writes to `tmp/facebook_traces`, a path writes to that file. Defaults to False.
+            payload_cache (str | Path, optional): Cache compiled by `payload_cache.compile_payloads`.
+                Campaigns found in it are posted without loading campaign data in the browser loop.
+            shard (tuple[int, int], optional): `(shard, shards)` - promote only groups whose URL hash falls into `shard`.
+            file_lock (optional): Lock shared by the shard workers; group files are merged under it on save.
+            recycler (DriverRecycler, optional): Restarts the driver between groups when it has served too many pages
+                or uses too much memory.
+            repromote_after (timedelta, optional): Time after which a promoted category or event may be promoted
+                again in the same group. A group can override it with `repromote_after` in interval format (e.g. `720H`).
+                Defaults to None - never.
+            max_promoted_items (int, optional): Promoted items kept per group. Defaults to 500.
+            product_catalogs (bool | str | Path, optional): Read campaign products from catalogs built by
+                `product_catalog.build_catalog`. `True` uses `data/facebook/catalogs`, a path uses that directory.
+            tabs (int, optional): Groups posted concurrently, each in its own tab of the browser. Defaults to 1.
+            verification (VerificationQueue, optional): Published posts are queued here for a `verification.Verifier`.
+            profiler (RunProfiler, optional): Started profiler; memory is snapshotted after every group.
+            max_batch (int, optional): Groups of one locale batch posted before other locales get a turn (see `planner.plan_jobs`).
         """
         self.d = d
-        self.group_file_paths = group_file_paths if group_file_paths else get_filenames(gs.path.data / 'facebook' / 'groups')
+        self.group_file_paths = group_file_paths if group_file_paths else [f for f in get_filenames(gs.path.data / 'facebook' / 'groups') if is_group_file(f)]
         self.no_video = no_video
         self.spinner = spinning_cursor()
+        self.promotion_log = PromotionLog()
+        self.shard = shard
+        self.file_lock = file_lock
+        self.stats = Counter()
+        self.recycler = recycler
+        self.repromote_after = repromote_after
+        self.max_promoted_items = max_promoted_items
+        self.product_catalogs = product_catalogs
+        self._catalogs: dict[tuple[str, str, str], ProductCatalog | None] = {}
+        self.tabs = max(1, tabs)
+        self.verification = verification
+        self.profiler = profiler
+        self.max_batch = max_batch
+        self._campaign_categories: dict[tuple[str, str, str], list[Category]] = {}  # <- категории кампании текущих пакетов
+        self._local = threading.local()  # <- драйвер вкладки текущего потока
+        self._lock = threading.Lock()  # <- сохранение групп и счётчики из потоков вкладок
+        if payload_cache:
+            self.payload_cache = PayloadCache(payload_cache)
+        if trace:
+            self.tracer = ChromeTracer(None if trace is True else trace)
+            self.tracer.attach(self.d)
+            self.tracer.attach(self, ('promote', 'process_groups'))
 
     def parse_interval(self, interval: str) -> timedelta:
         """ Converts a string interval to a timedelta object.
@@ -84,26 +155,25 @@ class FacebookPromoter:
             >>> print(result)
             1:00:00
         """
-        match = re.match(r"(\d+)([HM])", interval)
-        if not match:
-            raise ValueError(f"Invalid interval format: {interval}")
-        value, unit = match.groups()
-        return timedelta(hours=int(value)) if unit == "H" else timedelta(minutes=int(value))
+        return parse_interval(interval)
 
-    def promote(self, group: SimpleNamespace, item: SimpleNamespace, is_event: bool = False) -> bool:
+    def promote(self, group: Group, item: Category | Event, is_event: bool = False, campaign_name: str = None) -> bool:
         """ Promotes a category or event in a Facebook group.
 
+        Every attempt is appended to the promotion log with its duration and outcome.
+
         Args:
-            group (SimpleNamespace): Group object with promotion data.
-            item (SimpleNamespace): The category or event to be promoted.
+            group (Group): Group object with promotion data.
+            item (Category | Event): The category or event to be promoted.
             is_event (bool, optional): Flag indicating if the item is an event. Defaults to False.
+            campaign_name (str, optional): Campaign of the item, written to the promotion log.
 
         Returns:
             bool: True if the item was successfully promoted, otherwise False.
 
         Example:
-            >>> group = SimpleNamespace(promoted_events=[], promoted_categories={})
-            >>> item = SimpleNamespace(event_name="Sale Event")
+            >>> group = Group(group_url="https://www.facebook.com/groups/1/", language="RU", currency="ILS")
+            >>> item = Event(event_name="Sale Event", language=...)
             >>> result = promote(group, item, is_event=True)
             >>> print(result)
             True
@@ -113,38 +183,64 @@ class FacebookPromoter:
 
         item_name = item.event_name if is_event else item.category_name
 
-        if item_name in (group.promoted_events if is_event else group.promoted_categories):
+        promoted_items = self.promoted_items(group, is_event)
+        if item_name in promoted_items:
             logger.debug(f"# Item already promoted", None, False)
             return False  # Item already promoted
 
 
-        self.d.get_url(get_event_url(group.group_url) if is_event else group.group_url)
-        if is_event:
+        locator_timeouts.group_url = group.group_url  # <- таймауты локаторов подбираются по истории группы
+        d = self.current_driver()
+        start = time.monotonic()
+        try:
+            d.get_url(get_event_url(group.group_url) if is_event else group.group_url)
+            if self.recycler:
+                self.recycler.page_served()
+            if is_event:
+
+                ev = getattr(item.language, group.language )
+                ev.start = item.start  # <- Дата Начало мероприятия
+                ev.end = item.end      # <- Дата окончания мероприятия
+                ev.promotional_link = item.promotional_link
+                posted = post_event(d=d, event=ev )
+            else:
+                posted = post_message(d=d,  category=item if not is_event else None, no_video=self.no_video)
+        except Exception as ex:
+            self.log_outcome(group, item_name, is_event, campaign_name, start, success=False, error_class=type(ex).__name__)
+            snapshot_failure(d, 'post_event' if is_event else 'post_message', error=f"{type(ex).__name__}: {ex}")
+            raise
+
+        self.log_outcome(group, item_name, is_event, campaign_name, start, success=bool(posted), error_class=None if posted else 'PostFailed')
+        if not posted:
+            logger.debug(f"Error while posting {'event' if is_event else 'category'} {item_name}", None, False)
+            return False
 
-            ev = getattr(item.language, group.language )
-            ev.start = item.start  # <- Дата Начало мероприятия
-            ev.end = item.end      # <- Дата окончания мероприятия
-            ev.promotional_link = item.promotional_link
-            if not post_event(d=self.d, event=ev ):
-                logger.debug(f"Error while posting {'event' if is_event else 'category'} {item_name}", None, False)
-                return False
-        else:
-            if not post_message(d=self.d,  category=item if not is_event else None, no_video=self.no_video):
-                logger.debug(f"Error while posting {'event' if is_event else 'category'} {item_name}", None, False)
-                return False
 
+        if self.verification:
+            # Проверка публикации - отдельным проходом, не на пути публикации
+            self.verification.add(group.group_url, item_name, marker=ev.title if is_event else item.title,
+                                  is_event=is_event, campaign_name=campaign_name)
 
         timestamp = datetime.now().strftime("%d/%m/%y %H:%M")
-        if is_event:
-            group.promoted_events.append(item_name)
-        else:
-            group.promoted_categories.append(item_name)
-            #group.promoted_categories[item_name] = timestamp
+        promoted_items.add(item_name)
 
         group.last_promo_sended = timestamp
-        input("Next")
         return True
 
+    def promoted_items(self, group: Group, is_event: bool = False) -> PromotedItems:
+        """ Returns `promoted_events` or `promoted_categories` of the group as `PromotedItems`.
+
+        Legacy lists are converted in place; they are written back as `{item_name: epoch_seconds}`.
+        """
+        ttl = self.parse_interval(group.repromote_after) if group.repromote_after else self.repromote_after
+        if is_event:
+            group.promoted_events = PromotedItems.coerce(group.promoted_events, ttl=ttl, max_items=self.max_promoted_items,
+                                                         legacy_time=group.last_promo_sended)
+            return group.promoted_events
+        group.promoted_categories = PromotedItems.coerce(group.promoted_categories, ttl=ttl, max_items=self.max_promoted_items,
+                                                         legacy_time=group.last_promo_sended)
+        return group.promoted_categories
+
     def process_groups(self, campaign_name: str = None, events: list[SimpleNamespace] = None, is_event: bool = False, group_file_paths: list[str] = None):
         """ Processes all groups for the current campaign or event promotion.
 
@@ -162,38 +258,311 @@ class FacebookPromoter:
             logger.debug(f"Nothing to promote!")
             return
 
+        # All files are loaded and validated up front, invalid groups are reported before the first page load
+        if self.group_cache:
+            loaded = self.group_cache.load(group_file_paths, is_event=is_event)  # <- демон: только изменённые файлы
+        else:
+            loaded = load_group_files(group_file_paths, is_event=is_event)
+        loaded.report()
+
+        jobs: list[tuple] = []
         for group_file in group_file_paths:
             path_to_group_file: Path = gs.path.data / 'facebook' / 'groups' / group_file
-            groups_ns: dict = j_loads_ns(path_to_group_file)
-            #logger.info(f"Loaded groups from {group_file}")
+            # `.jsonl` files are updated one group at a time, `.json` files are rewritten
+            store = GroupStore(path_to_group_file) if path_to_group_file.suffix == '.jsonl' else None
+            raw_groups: dict = loaded.raw[group_file]
+            groups: dict[str, Group] = {}
 
-            for group_url, group in vars(groups_ns).items():
-                group.group_url = group_url
-                if not is_event and not self.check_interval(group):
+            for group_url in loaded.due[group_file]:
+                if not self.in_shard(group_url):
                     continue
+                group = groups[group_url] = Group.from_dict(raw_groups[group_url], group_url=group_url)
+                jobs.append((group, raw_groups, groups, path_to_group_file, store))
+
+        # Группы одного языка, валюты и аккаунта подряд: кампания читается один раз на пакет
+        jobs = plan_jobs(jobs, max_batch=self.max_batch)
+        self._campaign_categories.clear()  # <- файлы кампании могли измениться между запусками
+        if self.tabs > 1 and len(jobs) > 1:
+            self.process_groups_in_tabs(jobs, campaign_name=campaign_name, events=events, is_event=is_event)
+            return
+        for job in jobs:
+            self.promote_group(*job, campaign_name=campaign_name, events=events, is_event=is_event)
 
+    def promote_group(self, group: Group, raw_groups: dict, groups: dict[str, Group], path_to_group_file: Path, store: GroupStore = None,
+                      campaign_name: str = None, events: list[SimpleNamespace] = None, is_event: bool = False):
+        """ Promotes in one group of a group file and saves the group. """
+        if self.process_group(group, campaign_name=campaign_name, events=events, is_event=is_event) is None:
+            return
 
-                
-                if not is_event:
-                    # Only create AliCampaignEditor for campaigns, not for events
-                    ce = AliCampaignEditor(campaign_name=campaign_name, language=group.language, currency=group.currency)
-                    items_to_promote = vars(ce.campaign.category).values()
-                else:
-                    items_to_promote = events
+        with self._lock:
+            if store:
+                self.update_group(store, group)
+            else:
+                raw_groups[group.group_url] = group.to_dict()
+                self.save_groups(raw_groups, groups, path_to_group_file)
+            locator_timeouts.save()
+        if self.profiler:
+            self.profiler.group_boundary(group.group_url)
+        if self.tabs == 1:
+            self.recycle_driver()
 
-                for item in items_to_promote:
-                    #logger.info(f"Start promoting {'event' if is_event else 'category'}: {item.event_name if is_event else item.category_name} for {group_url}")
-                    item.products = ce.get_category_products(item.category_name) if not is_event else None                    
-                    if not self.promote(group=group, item=item,  is_event=is_event):
-                        logger.debug(f"Failed to promote {'event' if is_event else 'category'}: {item.event_name if is_event else item.category_name}", None, False)
+    def process_groups_in_tabs(self, jobs: list[tuple], **kwargs):
+        """ Promotes in several groups at once, each in its own tab of the browser (see `tabs.TabDriver`).
 
-                j_dumps(groups_ns, path_to_group_file)
+        The driver is not recycled in this mode: the tabs share one browser session.
 
-    def check_interval(self, group: SimpleNamespace) -> bool:
+        Args:
+            jobs (list[tuple]): Arguments of `promote_group` per group.
+            **kwargs: `campaign_name`, `events`, `is_event` for `promote_group`.
+        """
+        tabs = open_tabs(self.d, min(self.tabs, len(jobs)))
+        free_tabs: queue.Queue[TabDriver] = queue.Queue()
+        for tab in tabs:
+            free_tabs.put(tab)
+
+        def run(job: tuple):
+            tab = free_tabs.get()
+            self._local.d = tab
+            if self.profiler:
+                self.profiler.track_thread()
+            try:
+                self.promote_group(*job, **kwargs)
+            except Exception as ex:
+                logger.error(f"Error while promoting in group {job[0].group_url}", ex)
+            finally:
+                if self.profiler:
+                    self.profiler.untrack_thread()
+                self._local.d = None
+                free_tabs.put(tab)
+
+        with ThreadPoolExecutor(max_workers=len(tabs), thread_name_prefix='tab') as executor:
+            list(executor.map(run, jobs))
+        for tab in tabs[1:]:
+            tab.close_tab()
+
+    def current_driver(self) -> Driver | TabDriver:
+        """ Driver of the calling thread: its tab in `process_groups_in_tabs`, otherwise `self.d`. """
+        return getattr(self._local, 'd', None) or self.d
+
+    def catalog(self, campaign_name: str, language: str, currency: str) -> ProductCatalog | None:
+        """ Returns the product catalog of a campaign locale; catalogs stay mapped for the life of the promoter.
+
+        A catalog whose campaign changed since it was built (`ProductCatalog.is_current`) is opened
+        again - another process may have rebuilt it - and rebuilt if the file is stale too.
+        """
+        key = (campaign_name, language.upper(), currency.upper())
+        catalog_dir = None if self.product_catalogs is True else self.product_catalogs
+        with self._lock:
+            catalog = self._catalogs.get(key)
+            if key not in self._catalogs:
+                catalog = ProductCatalog.open(*key, catalog_dir=catalog_dir)
+            elif catalog and not catalog.is_current():
+                # старый каталог не закрываем: его товары могут ещё читать другие вкладки
+                catalog = ProductCatalog.open(*key, catalog_dir=catalog_dir)
+                if catalog and not catalog.is_current():
+                    build_catalog(*key, catalog_dir=catalog_dir)
+                    catalog = ProductCatalog.open(*key, catalog_dir=catalog_dir)
+            self._catalogs[key] = catalog
+        return catalog
+
+    def campaign_categories(self, campaign_name: str, language: str, currency: str) -> list[Category]:
+        """ Returns the categories of a campaign locale with their products.
+
+        The campaign is read with `AliCampaignEditor` once per locale batch (see `planner.plan_jobs`)
+        instead of once per group. One locale per tab is kept.
+        """
+        key = (campaign_name, language.upper(), currency.upper())
+        with self._lock:
+            categories = self._campaign_categories.get(key)
+        if categories is not None:
+            return categories
+
+        # Only create AliCampaignEditor for campaigns, not for events
+        ce = AliCampaignEditor(campaign_name=campaign_name, language=language, currency=currency)
+        categories = [Category.coerce(item) for item in vars(ce.campaign.category).values()]
+        for category in categories:
+            category.products = [Product.coerce(product) for product in ce.get_category_products(category.category_name) or []]
+        with self._lock:
+            while len(self._campaign_categories) >= self.tabs:
+                self._campaign_categories.pop(next(iter(self._campaign_categories)))  # <- пакет, начатый раньше всех
+            self._campaign_categories[key] = categories
+            self.stats['campaign_loads'] += 1
+        return categories
+
+    def recycle_driver(self):
+        """ Restarts the driver between groups if the recycling policy says so. """
+        if not self.recycler:
+            return
+        d = self.recycler.maybe_recycle(self.d)
+        if d is self.d:
+            return
+        self.d = d
+        self.stats['driver_restarts'] += 1
+        if self.tracer:
+            self.tracer.attach(self.d)
+
+    def in_shard(self, group_url: str) -> bool:
+        """ Checks whether the group belongs to the shard of this promoter (see `sharding.shard_of`). """
+        if not self.shard:
+            return True
+        shard, shards = self.shard
+        return shard_of(group_url, shards) == shard
+
+    def update_group(self, store: GroupStore, group: Group):
+        """ Appends the updated group to a `.jsonl` group store. """
+        if self.file_lock:
+            with self.file_lock:
+                store.update(group.group_url, group.to_dict())
+        else:
+            store.update(group.group_url, group.to_dict())
+
+    def save_groups(self, raw_groups: dict, groups: dict[str, Group], path_to_group_file: Path):
+        """ Saves a group file. A sharded promoter merges only its own groups into the file on disk,
+        so workers sharing a file do not overwrite each other's updates.
+        """
+        if not self.shard:
+            j_dumps(raw_groups, path_to_group_file)
+            return
+        with self.file_lock:
+            on_disk = j_loads(path_to_group_file) or {}
+            for group_url, group in groups.items():
+                if self.in_shard(group_url):
+                    on_disk[group_url] = group.to_dict()
+            j_dumps(on_disk, path_to_group_file)
+
+    def process_group(self, group: Group, campaign_name: str = None, events: list[Event | SimpleNamespace] = None, is_event: bool = False) -> list[str] | None:
+        """ Promotes all categories of the campaign (or all events) in one group.
+
+        Args:
+            group (Group): Group to promote in.
+            campaign_name (str): The name of the campaign being promoted.
+            events (list[SimpleNamespace], optional): List of events to promote if promoting events.
+            is_event (bool, optional): Flag indicating if processing is for events. Defaults to False.
+
+        Returns:
+            list[str] | None: Names of the items promoted now, or `None` if the group is not due yet.
+        """
+        if not is_event and not self.check_interval(group):
+            return
+
+        promoted: list[str] = []
+        with self._lock:
+            self.stats['groups'] += 1
+        if not is_event:
+            # Precompiled payloads already carry products and captions
+            items_to_promote = self.payload_cache.categories(campaign_name, group.language, group.currency) if self.payload_cache else None
+            if items_to_promote is None and self.product_catalogs:
+                # Products are read from the shared catalog file, not copied into the process
+                catalog = self.catalog(campaign_name, group.language, group.currency)
+                items_to_promote = catalog.categories() if catalog else None
+            if items_to_promote is None:
+                items_to_promote = self.campaign_categories(campaign_name, group.language, group.currency)
+            items_to_promote = [Category.coerce(item) for item in items_to_promote]
+        else:
+            items_to_promote = [Event.coerce(event) for event in events]
+
+        for item in items_to_promote:
+            #logger.info(f"Start promoting {'event' if is_event else 'category'}: {item.event_name if is_event else item.category_name} for {group.group_url}")
+            if self.promote(group=group, item=item,  is_event=is_event, campaign_name=campaign_name):
+                promoted.append(item.event_name if is_event else item.category_name)
+                with self._lock:
+                    self.stats['promoted'] += 1
+            else:
+                with self._lock:
+                    self.stats['not_promoted'] += 1
+                logger.debug(f"Failed to promote {'event' if is_event else 'category'}: {item.event_name if is_event else item.category_name}", None, False)
+        return promoted
+
+    def run_worker(self, queue, worker_id: str = None, idle_exit: bool = True, poll_interval: float = 30) -> int:
+        """ Leases post jobs from a job queue and processes them until the queue is empty.
+
+        The lease is kept alive by heartbeats while the group is processed. The result
+        (promoted items and time) is acknowledged to the queue; the coordinator applies it
+        to the group files with `job_queue.apply_results`. Before posting, the group record of
+        the job is brought up to the latest post the queue knows of, so `interval` holds across
+        campaigns even before the results are applied.
+
+        Args:
+            queue: `SQLiteJobQueue` or `RedisJobQueue`.
+            worker_id (str, optional): Lease owner. Defaults to `<host>:<pid>`.
+            idle_exit (bool, optional): Return when the queue is empty instead of polling. Defaults to True.
+            poll_interval (float, optional): Seconds between polls of an empty queue. Defaults to 30.
+
+        Returns:
+            int: Number of jobs acknowledged.
+
+        Example:
+            >>> queue = SQLiteJobQueue()
+            >>> enqueue_campaigns(queue, ['pain'], ['ru_il.json'])   # coordinator
+            >>> FacebookPromoter(d, group_file_paths=None).run_worker(queue)   # any number of workers
+            >>> apply_results(queue)   # coordinator
+        """
+        worker_id = worker_id or default_worker_id()
+        acknowledged = 0
+        while True:
+            job = queue.lease(worker_id)
+            if not job:
+                if idle_exit:
+                    break
+                time.sleep(poll_interval)
+                continue
+
+            try:
+                group = Group.from_dict(job.group, group_url=job.group_url)
+            except ValueError as ex:
+                queue.fail(job.id, worker_id, f"{type(ex).__name__}: {ex}")
+                continue
+            last_promo_sended = queue.last_promo_sended(job.group_url)
+            if parse_promo_time(last_promo_sended) > parse_promo_time(group.last_promo_sended):
+                group.last_promo_sended = last_promo_sended  # <- пост другой кампании, ещё не внесённый в файл группы
+            try:
+                with Heartbeat(queue, job.id, worker_id):
+                    promoted = self.process_group(group, campaign_name=job.campaign_name,
+                                                  events=dict_to_ns(job.events) if job.events else None,
+                                                  is_event=job.is_event)
+            except Exception as ex:
+                logger.error(f"Job {job.id} for {job.group_url} failed", ex)
+                queue.fail(job.id, worker_id, f"{type(ex).__name__}: {ex}")
+                continue
+
+            queue.ack(job.id, worker_id, {'promoted': promoted or [], 'last_promo_sended': group.last_promo_sended})
+            acknowledged += 1
+            locator_timeouts.save()
+            if self.profiler:
+                self.profiler.group_boundary(job.group_url)
+            self.recycle_driver()
+        return acknowledged
+
+    def log_outcome(self, group: Group, item_name: str, is_event: bool, campaign_name: str, start: float, success: bool, error_class: str = None):
+        """ Appends a promotion attempt to the promotion log.
+
+        Args:
+            group (Group): Group the item was posted to.
+            item_name (str): Category or event name.
+            is_event (bool): Flag indicating if the item is an event.
+            campaign_name (str): Campaign of the item.
+            start (float): `time.monotonic()` at the start of the attempt.
+            success (bool): Whether the post was published.
+            error_class (str, optional): Exception class name or `PostFailed` if the scenario returned a failure.
+        """
+        self.promotion_log.record(
+            group_url=group.group_url,
+            item_name=item_name,
+            is_event=is_event,
+            campaign=campaign_name,
+            language=group.language,
+            currency=group.currency,
+            account=group.account,
+            duration=time.monotonic() - start,
+            success=success,
+            error_class=error_class,
+        )
+
+    def check_interval(self, group: Group) -> bool:
         """ Checks if the required interval has passed for the next promotion.
 
         Args:
-            group (SimpleNamespace): Group to check.
+            group (Group): Group to check.
 
         Returns:
             bool: True if the interval has passed, otherwise False.
@@ -202,15 +571,13 @@ class FacebookPromoter:
             ValueError: If the interval format is invalid.
 
         Example:
-            >>> group = SimpleNamespace(interval="1H", last_promo_sended="01/01/23 10:00")
+            >>> group = Group(group_url="https://www.facebook.com/groups/1/", language="RU", currency="ILS", interval="1H", last_promo_sended="01/01/23 10:00")
             >>> result = check_interval(group)
             >>> print(result)
             True
         """
         try:
-            interval_timedelta = self.parse_interval(group.interval) if hasattr(group, 'interval') else timedelta()
-            last_promo_time = datetime.strptime(group.last_promo_sended, "%d/%m/%y %H:%M") if hasattr(group, 'last_promo_sended') else None
-            return not last_promo_time or datetime.now() - last_promo_time >= interval_timedelta
+            return group.is_due()
         except ValueError as e:
             logger.error(f"Error parsing interval for group {group.group_url}: {e}")
             return False
@@ -228,6 +595,7 @@ class FacebookPromoter:
         for campaign_name in campaigns:
             #logger.info(f"Processing campaign: {campaign_name}")
             self.process_groups(group_file_paths = group_file_paths if group_file_paths else self.group_file_paths, campaign_name = campaign_name)
+        self.compact_promotion_log()
 
     def run_events(self, events: list[SimpleNamespace], group_file_paths: list[str]):
         """ Runs event promotion in all groups sequentially.
@@ -241,6 +609,40 @@ class FacebookPromoter:
             >>> promoter.run_events(events=[event], group_file_paths=["group1.json", "group2.json"])
         """
         self.process_groups(group_file_paths=group_file_paths, campaign_name="", is_event=True, events=events)
+        self.compact_promotion_log()
+
+    def apply_verifications(self, group_file_paths: list[str] = None) -> int:
+        """ Writes the checked posts of this promoter's groups to the group files (`verification.apply_verifications`).
+
+        A sharded promoter applies only the groups of its shard, under the shared file lock: the
+        other shards merge only their own groups into the files, so they never overwrite the outcomes.
+
+        Returns:
+            int: Number of outcomes applied.
+        """
+        if not self.verification:
+            return 0
+        try:
+            if self.file_lock:
+                with self.file_lock:
+                    return apply_verifications(self.verification, group_file_paths, self.max_promoted_items, select=self.in_shard)
+            return apply_verifications(self.verification, group_file_paths, self.max_promoted_items, select=self.in_shard)
+        except Exception as ex:
+            logger.error("Verification outcomes could not be applied", ex)
+            return 0
+
+    def compact_promotion_log(self):
+        """ Flushes the promotion log and merges the segments of past days.
+
+        Of several sharded promoters only shard 0 compacts, the others only flush.
+        """
+        if self.shard and self.shard[0] != 0:
+            self.promotion_log.flush()
+            return
+        try:
+            self.promotion_log.compact()
+        except Exception as ex:
+            logger.error("Promotion log could not be compacted", ex)
 
     def stop(self):
         """ Stops the promotion process by quitting the WebDriver instance.
@@ -248,6 +650,9 @@ class FacebookPromoter:
         Example:
             >>> promoter.stop()
         """
+        if self.tracer:
+            self.tracer.save()
+        self.compact_promotion_log()
         self.d.quit()
 
 # Example usage:
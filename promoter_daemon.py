@@ -0,0 +1,249 @@
+## \file ../src/advertisement/facebook/promoter_daemon.py
+# -*- coding: utf-8 -*-
+# /path/to/interpreter/python
+"""
+Hot-reloading daemon mode of `FacebookPromoter`.
+
+The daemon runs the campaigns in cycles with one warm browser and watches three places:
+
+    - `data/facebook/groups` - added, removed and edited group files;
+    - the campaign directory - added and removed campaigns, edited campaign files;
+    - `locators/*.json` - scenario locators.
+
+Changes are applied between campaigns. Only the changed files are reparsed:
+group files through the promoter's `GroupFileCache` and locator files into the
+namespace of their scenario module. With `watchdog` installed (inotify on Linux),
+file events wake the daemon at once; without it the directories are compared with
+their previous modification times every `poll_interval` seconds.
+
+Between cycles the daemon writes the outcomes of verified posts (`--verify`) to the group
+files of its promoter.
+
+Example:
+    >>> promoter = FacebookPromoter(attach_or_launch(), group_file_paths=None)
+    >>> PromoterDaemon(promoter, campaigns=['pain']).run()
+"""
+
+import importlib
+import threading
+from pathlib import Path
+from types import SimpleNamespace
+
+from src import gs
+from src.utils import j_loads_ns
+from src.logger import logger
+from src.advertisement.facebook.group_store import is_group_file
+from src.advertisement.facebook.group_loader import GroupFileCache, file_stamp
+from src.advertisement.facebook.scenarios.tracer import LOCATOR_MODULES
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:
+    Observer = None
+    FileSystemEventHandler = object
+
+GROUPS_DIR: Path = gs.path.data / 'facebook' / 'groups'
+LOCATORS_DIR: Path = gs.path.src / 'advertisement' / 'facebook' / 'locators'
+
+
+class _Wake(FileSystemEventHandler):
+    """ Sets the daemon's event on any file system event. """
+
+    def __init__(self, event: threading.Event):
+        self.event = event
+
+    def on_any_event(self, event):
+        self.event.set()
+
+
+class DirectoryWatcher:
+    """ Reports the files (or subdirectories) of a directory that were added, modified or removed.
+
+    Example:
+        >>> watcher = DirectoryWatcher(GROUPS_DIR, '*.json')
+        >>> added, modified, removed = watcher.changes()
+    """
+
+    def __init__(self, directory: str | Path, pattern: str = '*', directories: bool = False):
+        """
+        Args:
+            directory (str | Path): Watched directory.
+            pattern (str, optional): Glob of the watched entries. Defaults to `*`.
+            directories (bool, optional): Watch subdirectories (campaigns) instead of files. Defaults to False.
+        """
+        self.directory = Path(directory)
+        self.pattern = pattern
+        self.directories = directories
+        self.state = self.snapshot()
+
+    def snapshot(self) -> dict[str, tuple[int, int]]:
+        if not self.directory.exists():
+            return {}
+        return {path.relative_to(self.directory).as_posix(): file_stamp(path) for path in self.directory.glob(self.pattern)
+                if path.is_dir() == self.directories}
+
+    def changes(self) -> tuple[set[str], set[str], set[str]]:
+        """ `(added, modified, removed)` names since the previous call. """
+        state = self.snapshot()
+        added = state.keys() - self.state.keys()
+        removed = self.state.keys() - state.keys()
+        modified = {name for name in state.keys() & self.state.keys() if state[name] != self.state[name]}
+        self.state = state
+        return set(added), modified, set(removed)
+
+
+class PromoterDaemon:
+    """ Runs campaigns in cycles and applies changed files without restarting the browser. """
+
+    def __init__(self, promoter, campaigns: list[str] = None, group_file_paths: list[str] = None, exclude: list[str] = None,
+                 campaigns_dir: str | Path = None, cycle_interval: float = 300, poll_interval: float = 5):
+        """
+        Args:
+            promoter (FacebookPromoter): Promoter with a running driver.
+            campaigns (list[str], optional): Campaigns to run. Defaults to every directory in `campaigns_dir`, following its changes.
+            group_file_paths (list[str], optional): Group files. Defaults to every group file in `data/facebook/groups`,
+                following its changes.
+            exclude (list[str], optional): Group files never promoted.
+            campaigns_dir (str | Path, optional): Campaign directory. Defaults to `google_drive/aliexpress/campaigns`.
+            cycle_interval (float, optional): Seconds between cycles over all campaigns. Defaults to 300.
+            poll_interval (float, optional): Seconds between directory checks without `watchdog`. Defaults to 5.
+        """
+        self.promoter = promoter
+        self.promoter.group_cache = self.promoter.group_cache or GroupFileCache()
+        self.fixed_campaigns = campaigns
+        self.fixed_group_files = group_file_paths
+        self.exclude = set(exclude or [])
+        self.campaigns_dir = Path(campaigns_dir) if campaigns_dir else gs.path.google_drive / 'aliexpress' / 'campaigns'
+        self.cycle_interval = cycle_interval
+        self.poll_interval = poll_interval
+
+        self.groups_watcher = DirectoryWatcher(GROUPS_DIR)
+        self.campaigns_watcher = DirectoryWatcher(self.campaigns_dir, directories=True)
+        self.campaign_files_watcher = DirectoryWatcher(self.campaigns_dir, '*/**/*.json')  # <- как `payload_cache.campaign_stamp`: и файлы категорий
+        self.locators_watcher = DirectoryWatcher(LOCATORS_DIR, '*.json')
+        self.group_files = self._group_files()
+        self.campaigns = self._campaigns()
+
+        self._changed = threading.Event()
+        self._stop = threading.Event()
+        self._observer = None
+        if Observer:
+            self._observer = Observer()
+            for directory in (GROUPS_DIR, self.campaigns_dir, LOCATORS_DIR):
+                if directory.exists():
+                    self._observer.schedule(_Wake(self._changed), str(directory), recursive=directory == self.campaigns_dir)
+            self._observer.daemon = True
+            self._observer.start()
+
+    def _group_files(self) -> list[str]:
+        files = self.fixed_group_files or sorted(name for name in self.groups_watcher.state if is_group_file(name))
+        return [name for name in files if name not in self.exclude]
+
+    def _campaigns(self) -> list[str]:
+        return list(self.fixed_campaigns) if self.fixed_campaigns else sorted(self.campaigns_watcher.state)
+
+    def apply_changes(self) -> bool:
+        """ Applies the file changes since the previous check.
+
+        Returns:
+            bool: `True` if anything changed.
+        """
+        self._changed.clear()
+        changed = False
+
+        added, modified, removed = self.groups_watcher.changes()
+        for group_file in removed:
+            self.promoter.group_cache.forget(group_file)
+        if added or removed:
+            self.group_files = self._group_files()
+        if added or modified or removed:
+            # изменённые файлы перечитает `GroupFileCache` при следующем `process_groups`
+            logger.info(f"Group files: +{sorted(added)} ~{sorted(modified)} -{sorted(removed)}")
+            changed = True
+
+        added, _, removed = self.campaigns_watcher.changes()
+        if added or removed:
+            self.campaigns = self._campaigns()
+            logger.info(f"Campaigns: +{sorted(added)} -{sorted(removed)}; running {self.campaigns}")
+            changed = True
+        added, modified, removed = self.campaign_files_watcher.changes()
+        for campaign_name in {name.split('/')[0] for name in added | modified | removed}:
+            self.drop_campaign(campaign_name)
+            changed = True
+
+        _, modified, _ = self.locators_watcher.changes()
+        for file_name in modified:
+            changed = self.reload_locators(Path(file_name).stem) or changed
+        return changed
+
+    def drop_campaign(self, campaign_name: str):
+        """ Forgets the product catalogs of a changed campaign; the next post reads the campaign again. """
+        for key in [key for key in self.promoter._catalogs if key[0] == campaign_name]:
+            catalog = self.promoter._catalogs.pop(key)
+            if catalog:
+                catalog.close()
+        logger.info(f"Campaign {campaign_name} changed")
+
+    def reload_locators(self, scenario: str) -> bool:
+        """ Reloads `locators/<scenario>.json` into its scenario module. A broken file keeps the old locators. """
+        attr = LOCATOR_MODULES.get(scenario)
+        if not attr:
+            return False
+        locators: SimpleNamespace = j_loads_ns(LOCATORS_DIR / f"{scenario}.json")
+        if not locators or not vars(locators):
+            logger.error(f"Locators {scenario}.json could not be loaded, keeping the previous ones")
+            return False
+        module = importlib.import_module(f"src.advertisement.facebook.scenarios.{scenario}")
+        setattr(module, attr, locators)
+        if self.promoter.tracer:
+            self.promoter.tracer.refresh_locators()
+        logger.info(f"Locators {scenario}.json reloaded")
+        return True
+
+    def wait(self, seconds: float):
+        """ Sleeps up to `seconds`; returns early when a watched file changes. """
+        remaining = seconds
+        while remaining > 0 and not self._stop.is_set():
+            step = min(remaining, self.poll_interval)
+            if self._observer:
+                self._changed.wait(step)
+            else:
+                self._stop.wait(step)
+            if (not self._observer or self._changed.is_set()) and self._step('apply_changes', self.apply_changes):
+                return
+            remaining -= step
+
+    def _step(self, name: str, action, *args, **kwargs):
+        """ Runs one step of a cycle; an error is logged and the daemon goes on with the next step. """
+        try:
+            return action(*args, **kwargs)
+        except Exception as ex:
+            logger.error(f"Daemon step {name} failed", ex, exc_info=True)
+
+    def run(self, cycles: int = None):
+        """ Runs the campaigns until `stop()` (or for `cycles` cycles).
+
+        An exception in a campaign or in a step between campaigns is logged; the daemon keeps cycling.
+        """
+        cycle = 0
+        while not self._stop.is_set() and (cycles is None or cycle < cycles):
+            for campaign_name in list(self.campaigns):
+                if self._stop.is_set():
+                    break
+                self._step('apply_changes', self.apply_changes)
+                if campaign_name not in self.campaigns:
+                    continue
+                self._step(f"campaign {campaign_name}", self.promoter.process_groups,
+                           campaign_name=campaign_name, group_file_paths=self.group_files)
+            cycle += 1
+            self._step('compact_promotion_log', self.promoter.compact_promotion_log)
+            self._step('apply_verifications', self.promoter.apply_verifications, self.group_files)
+            self._step('apply_changes', self.apply_changes)  # <- собственные записи промоутера в файлы групп не будят ожидание
+            if cycles is None or cycle < cycles:
+                self.wait(self.cycle_interval)
+
+    def stop(self):
+        self._stop.set()
+        if self._observer:
+            self._observer.stop()
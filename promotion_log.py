@@ -0,0 +1,237 @@
+## \file ../src/advertisement/facebook/promotion_log.py
+# -*- coding: utf-8 -*-
+# /path/to/interpreter/python
+"""
+Columnar log of promotion outcomes.
+
+Every `FacebookPromoter.promote` attempt is appended as a row to Arrow IPC segments in
+`data/facebook/promotion_log`. Reports (campaign coverage, per-group latency) read only
+the columns they need from the segments and never touch the group files.
+
+Rows are written when `flush_every` rows are buffered or `flush_interval` seconds have
+passed, and on `flush()`. `compact()` merges the segments of past days into one file
+per day; the promoter calls it at the end of a run and between daemon cycles.
+
+`pyarrow` is optional: without it the log is disabled and `record()` does nothing.
+"""
+
+import atexit
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from src import gs
+from src.logger import logger
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+    import pyarrow.ipc as ipc
+except ImportError:
+    pa = None
+
+SCHEMA: 'pa.Schema' = pa.schema([
+    ('ts', pa.timestamp('ms')),
+    ('group_url', pa.string()),
+    ('item_name', pa.string()),
+    ('is_event', pa.bool_()),
+    ('campaign', pa.string()),
+    ('language', pa.string()),
+    ('currency', pa.string()),
+    ('account', pa.string()),
+    ('duration', pa.float32()),
+    ('success', pa.bool_()),
+    ('error_class', pa.string()),
+]) if pa else None
+
+
+class PromotionLog:
+    """ Appends promotion outcomes to Arrow IPC segments and answers reporting queries.
+
+    Rows are buffered in memory and written as a new segment on `flush()` (or when a size or
+    time threshold is reached), so a segment is never rewritten. `compact()` merges the
+    segments of past days into one file per day.
+
+    Example:
+        >>> log = PromotionLog()
+        >>> log.record(group_url='https://www.facebook.com/groups/1/', item_name='pain', campaign='pain',
+        ...            language='RU', currency='ILS', duration=42.1, success=True)
+        >>> log.flush()
+        >>> log.campaign_coverage('pain').to_pandas()
+    """
+
+    def __init__(self, log_dir: str | Path = None, flush_every: int = 500, flush_interval: float = 900):
+        """
+        Args:
+            log_dir (str | Path, optional): Directory with the segments. Defaults to `data/facebook/promotion_log`.
+            flush_every (int, optional): Buffered rows that trigger an automatic flush. Defaults to 500.
+            flush_interval (float, optional): Seconds after which buffered rows are flushed on the next record. Defaults to 900.
+        """
+        self.log_dir = Path(log_dir) if log_dir else gs.path.data / 'facebook' / 'promotion_log'
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.enabled = pa is not None
+        self._rows: list[dict] = []
+        self._segment_no = 0
+        self._flushed_at = time.monotonic()
+        self._lock = threading.Lock()  # <- запись из нескольких вкладок одного промоутера
+        if not self.enabled:
+            logger.warning("pyarrow is not installed, the promotion log is disabled")
+            return
+        atexit.register(self.flush)
+
+    def record(self,
+               group_url: str,
+               item_name: str,
+               success: bool,
+               duration: float,
+               is_event: bool = False,
+               campaign: str = None,
+               language: str = None,
+               currency: str = None,
+               account: str = None,
+               error_class: str = None,
+               ts: datetime = None):
+        """ Buffers one promotion outcome. """
+        if not self.enabled:
+            return
+        row = {
+            'ts': ts or datetime.now(),
+            'group_url': group_url,
+            'item_name': item_name,
+            'is_event': is_event,
+            'campaign': campaign,
+            'language': language,
+            'currency': currency,
+            'account': account,
+            'duration': duration,
+            'success': success,
+            'error_class': error_class,
+        }
+        with self._lock:
+            self._rows.append(row)
+            due = len(self._rows) >= self.flush_every or time.monotonic() - self._flushed_at >= self.flush_interval
+        if due:
+            self.flush()
+
+    def flush(self) -> Path | None:
+        """ Writes buffered rows as a new segment.
+
+        Returns:
+            Path | None: The written segment, or `None` if there was nothing to write.
+        """
+        with self._lock:
+            rows, self._rows = self._rows, []
+            self._flushed_at = time.monotonic()
+            if not rows:
+                return
+            self._segment_no += 1
+            segment_no = self._segment_no
+        table = pa.Table.from_pylist(rows, schema=SCHEMA)
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+        path = self.log_dir / f"{datetime.now():%Y%m%d-%H%M%S}-{os.getpid()}-{segment_no}.arrow"
+        tmp_path = path.with_suffix('.tmp')
+        with pa.OSFile(str(tmp_path), 'wb') as sink, ipc.new_file(sink, SCHEMA) as writer:
+            writer.write_table(table)
+        tmp_path.replace(path)
+        return path
+
+    def dataset(self) -> 'ds.Dataset':
+        """ Returns all segments as one Arrow dataset. """
+        return ds.dataset(sorted(self.log_dir.glob('*.arrow')), schema=SCHEMA, format='arrow')
+
+    def read(self, columns: list[str] = None, since: datetime | timedelta = None, campaign: str = None) -> 'pa.Table':
+        """ Reads the log, projecting `columns` and filtering by time and campaign.
+
+        Args:
+            columns (list[str], optional): Columns to read. Defaults to all.
+            since (datetime | timedelta, optional): Lower time bound, absolute or relative to now.
+            campaign (str, optional): Only rows of this campaign.
+        """
+        if not self.enabled:
+            raise ImportError("pyarrow is required for promotion log reports")
+        self.flush()
+        expression = None
+        if since is not None:
+            since = datetime.now() - since if isinstance(since, timedelta) else since
+            expression = ds.field('ts') >= pa.scalar(since, pa.timestamp('ms'))
+        if campaign:
+            campaign_filter = ds.field('campaign') == campaign
+            expression = campaign_filter if expression is None else expression & campaign_filter
+        if not self.log_dir.exists():
+            return SCHEMA.empty_table().select(columns) if columns else SCHEMA.empty_table()
+        return self.dataset().to_table(columns=columns, filter=expression)
+
+    def campaign_coverage(self, campaign: str = None, since: datetime | timedelta = None) -> 'pa.Table':
+        """ Per campaign and item: attempts, successes and number of distinct groups reached.
+
+        Returns:
+            pa.Table: Columns `campaign`, `item_name`, `attempts`, `successes`, `groups_reached`.
+        """
+        table = self.read(['campaign', 'item_name', 'group_url', 'success'], since=since, campaign=campaign)
+        attempts = table.group_by(['campaign', 'item_name']).aggregate([('success', 'count'), ('success', 'sum')])
+        reached = (table.filter(pc.field('success'))
+                   .group_by(['campaign', 'item_name'])
+                   .aggregate([('group_url', 'count_distinct')]))
+        joined = attempts.join(reached, keys=['campaign', 'item_name'], join_type='left outer')
+        return joined.rename_columns({
+            'success_count': 'attempts',
+            'success_sum': 'successes',
+            'group_url_count_distinct': 'groups_reached',
+        }).sort_by([('campaign', 'ascending'), ('item_name', 'ascending')])
+
+    def group_latency(self, since: datetime | timedelta = None, campaign: str = None) -> 'pa.Table':
+        """ Per group: number of attempts, success rate and post duration statistics in seconds.
+
+        Returns:
+            pa.Table: Columns `group_url`, `attempts`, `success_rate`, `duration_mean`, `duration_median`, `duration_max`.
+        """
+        table = self.read(['group_url', 'duration', 'success'], since=since, campaign=campaign)
+        table = table.append_column('success_int', pc.cast(table['success'], pa.int8()))
+        stats = table.group_by('group_url').aggregate([
+            ('success_int', 'count'),
+            ('success_int', 'mean'),
+            ('duration', 'mean'),
+            ('duration', 'approximate_median'),
+            ('duration', 'max'),
+        ])
+        return stats.rename_columns({
+            'success_int_count': 'attempts',
+            'success_int_mean': 'success_rate',
+            'duration_approximate_median': 'duration_median',
+        }).sort_by([('duration_mean', 'descending')])
+
+    def compact(self) -> int:
+        """ Merges the segments of every finished day into a single `<YYYYMMDD>.arrow` file.
+
+        Returns:
+            int: Number of segments merged.
+        """
+        if not self.enabled or not self.log_dir.exists():
+            return 0
+        self.flush()
+        today = f"{datetime.now():%Y%m%d}"
+        by_day: dict[str, list[Path]] = {}
+        for path in self.log_dir.glob('*-*.arrow'):
+            by_day.setdefault(path.name[:8], []).append(path)
+
+        merged = 0
+        for day, segments in by_day.items():
+            if day >= today:
+                continue
+            target = self.log_dir / f"{day}.arrow"
+            sources = ([target] if target.exists() else []) + sorted(segments)
+            table = ds.dataset(sources, schema=SCHEMA, format='arrow').to_table()
+            tmp_path = target.with_suffix('.tmp')
+            with pa.OSFile(str(tmp_path), 'wb') as sink, ipc.new_file(sink, SCHEMA) as writer:
+                writer.write_table(table)
+            tmp_path.replace(target)
+            for path in segments:
+                path.unlink()
+            merged += len(segments)
+        if merged:
+            logger.info(f"Compacted {merged} promotion log segments")
+        return merged
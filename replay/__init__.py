@@ -0,0 +1,6 @@
+## \file ../src/advertisement/facebook/replay/__init__.py
+# -*- coding: utf-8 -*-
+# /path/to/interpreter/python
+""" Офлайн прогон сценариев фейсбука на сохраненных снимках страниц """
+
+from .server import ReplayServer
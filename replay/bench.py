@@ -0,0 +1,212 @@
+## \file ../src/advertisement/facebook/replay/bench.py
+# -*- coding: utf-8 -*-
+# /path/to/interpreter/python
+""" Офлайн прогон и замер сценариев на снимках фейсбука
+
+Запускает настоящие сценарии `post_message` и `post_event` в браузере против `ReplayServer`,
+проверяет, что публикация дошла до сервера, и выводит задержку каждого шага.
+Браузер запускается как обычно через `Driver(Chrome)`, с `--headless` - безголовый
+Chrome без профиля (`HeadlessChrome`), как в `tests/test_replay.py`.
+
+Запуск:
+    python -m src.advertisement.facebook.replay.bench --runs 5 --output replay_bench.json
+    python -m src.advertisement.facebook.replay.bench --headless
+"""
+
+import argparse
+import importlib
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from functools import wraps
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Callable
+
+from selenium import webdriver
+
+from src.webdriver import Driver, Chrome
+from src.utils import j_dumps
+from src.logger import logger
+from src.advertisement.facebook.scenarios import locator_timeouts
+from src.advertisement.facebook.replay.server import ReplayServer
+
+post_message_module = importlib.import_module('src.advertisement.facebook.scenarios.post_message')
+post_event_module = importlib.import_module('src.advertisement.facebook.scenarios.post_event')
+
+# Шаги, время которых замеряется. Сценарий верхнего уровня идет последним.
+STEPS: dict[str, tuple] = {
+    'post_message': (post_message_module, ('post_title', 'upload_media', 'update_images_captions', 'post_message')),
+    'post_event': (post_event_module, ('post_title', 'post_description', 'post_event')),
+}
+
+
+
+class HeadlessChrome(webdriver.Chrome):
+    """ Headless Chrome with an empty temporary profile; the fixtures need no login. """
+
+    def __init__(self, *args, **kwargs):
+        options = webdriver.ChromeOptions()
+        for argument in ('--headless=new', '--no-sandbox', '--disable-dev-shm-usage', '--window-size=1280,1024'):
+            options.add_argument(argument)
+        super().__init__(options=options)
+
+
+# PNG 1x1 для загрузки в редактор медиа.
+PIXEL_PNG: bytes = bytes.fromhex(
+    '89504e470d0a1a0a0000000d4948445200000001000000010806000000'
+    '1f15c4890000000b49444154789c63f80f040009fb03fdfb5e6b2b0000000049454e44ae426082'
+)
+
+
+@contextmanager
+def timed_steps(scenario: str, timings: dict[str, list[float]]):
+    """ Temporarily wraps the step functions of a scenario module to record their duration.
+
+    Scenario functions call each other through module globals, so wrapping the module
+    attributes also times the nested steps of a real `post_message`/`post_event` call.
+    """
+    module, steps = STEPS[scenario]
+    originals = {name: getattr(module, name) for name in steps}
+
+    def wrap(name: str, func: Callable) -> Callable:
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                timings.setdefault(f"{scenario}.{name}", []).append(time.perf_counter() - start)
+        return wrapper
+
+    for name, func in originals.items():
+        setattr(module, name, wrap(name, func))
+    try:
+        yield
+    finally:
+        for name, func in originals.items():
+            setattr(module, name, func)
+
+
+def make_category(media_dir: Path, products_count: int = 3) -> SimpleNamespace:
+    """ Builds a category with products whose media are local PNG files. """
+    products = []
+    for i in range(products_count):
+        image_path = media_dir / f"product_{i}.png"
+        image_path.write_bytes(PIXEL_PNG)
+        products.append(SimpleNamespace(
+            product_title=f"Replay product {i}",
+            original_price='10.00',
+            sale_price='7.50',
+            discount='25%',
+            evaluate_rate='96.0%',
+            promotion_link=f"https://s.click.aliexpress.com/e/replay{i}",
+            tags='#replay',
+            language='RU',
+            image_local_saved_path=str(image_path),
+        ))
+    return SimpleNamespace(
+        category_name='replay',
+        title='Replay title',
+        description='Replay description',
+        products=products,
+    )
+
+
+def make_event() -> SimpleNamespace:
+    """ Builds an event in the shape `FacebookPromoter.promote` passes to `post_event`. """
+    return SimpleNamespace(
+        title='Replay event',
+        description='Replay event description',
+        promotional_link='https://s.click.aliexpress.com/e/replay',
+        start='01.01.2025 10:00',
+        end='02.01.2025 10:00',
+    )
+
+
+def summarize(timings: dict[str, list[float]]) -> dict[str, dict]:
+    """ Reduces step timings to count, mean, median and p95 in seconds. """
+    summary = {}
+    for step, values in timings.items():
+        ordered = sorted(values)
+        summary[step] = {
+            'count': len(ordered),
+            'mean': round(statistics.fmean(ordered), 3),
+            'median': round(statistics.median(ordered), 3),
+            'p95': round(ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))], 3),
+        }
+    return summary
+
+
+def run_replay(d: Driver, runs: int = 3, scenarios: tuple[str, ...] = ('post_message', 'post_event')) -> dict:
+    """ Runs the scenarios against the fixture server and collects per-step latency.
+
+    Args:
+        d (Driver): Browser to run the scenarios in.
+        runs (int, optional): Number of runs of every scenario. Defaults to 3.
+        scenarios (tuple[str, ...], optional): Scenarios to run. Defaults to both.
+
+    Returns:
+        dict: `{'steps': {step: stats}, 'runs': {scenario: {'ok': n, 'failed': n}}}`.
+    """
+    timings: dict[str, list[float]] = {}
+    results = {scenario: {'ok': 0, 'failed': 0} for scenario in scenarios}
+
+    with tempfile.TemporaryDirectory() as tmp, ReplayServer() as server:
+        tmp = Path(tmp)
+        # Латентности офлайн прогона не должны попасть в историю боевых таймаутов.
+        history, history_path = locator_timeouts.history, locator_timeouts.history_path
+        locator_timeouts.history, locator_timeouts.history_path = {}, tmp / 'locator_latencies.json'
+        category = make_category(tmp)
+        event = make_event()
+
+        try:
+            for run in range(runs):
+                for scenario in scenarios:
+                    expected = len(server.published) + 1
+                    with timed_steps(scenario, timings):
+                        if scenario == 'post_message':
+                            d.get_url(server.group_url(f"replay{run}"))
+                            posted = post_message_module.post_message(d, category, no_video=True)
+                        else:
+                            d.get_url(server.event_url(f"replay{run}"))
+                            posted = post_event_module.post_event(d, event)
+
+                    published = posted and server.wait_published(expected)
+                    results[scenario]['ok' if published else 'failed'] += 1
+                    if not published:
+                        logger.error(f"Replay run {run} of {scenario} did not publish")
+        finally:
+            locator_timeouts.history, locator_timeouts.history_path = history, history_path
+
+    return {'steps': summarize(timings), 'runs': results}
+
+
+def print_report(report: dict):
+    print(f"{'step':45} {'count':>6} {'mean':>8} {'median':>8} {'p95':>8}")
+    for step, stats in report['steps'].items():
+        print(f"{step:45} {stats['count']:>6} {stats['mean']:>8} {stats['median']:>8} {stats['p95']:>8}")
+    for scenario, result in report['runs'].items():
+        print(f"{scenario}: ok={result['ok']} failed={result['failed']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay Facebook scenarios against local snapshots")
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--scenario', choices=list(STEPS), action='append')
+    parser.add_argument('--output', type=Path, help="JSON file for the report")
+    parser.add_argument('--headless', action='store_true', help="Headless Chrome with an empty profile")
+    args = parser.parse_args()
+
+    d = Driver(HeadlessChrome) if args.headless else Driver(Chrome)
+    try:
+        report = run_replay(d, runs=args.runs, scenarios=tuple(args.scenario or STEPS))
+    finally:
+        d.quit()
+
+    print_report(report)
+    if args.output:
+        j_dumps(report, args.output)
+    sys.exit(0 if all(not r['failed'] for r in report['runs'].values()) else 1)
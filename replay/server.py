@@ -0,0 +1,128 @@
+## \file ../src/advertisement/facebook/replay/server.py
+# -*- coding: utf-8 -*-
+# /path/to/interpreter/python
+""" Локальный сервер снимков фейсбука для офлайн прогона сценариев
+
+Отдает сохраненные страницы из `replay/fixtures`:
+    - `/groups/<group_id>/` -> `group.html` (страница группы, окно поста, редактор медиа)
+    - `/events/create/...`  -> `event_create.html` (форма создания мероприятия)
+
+Страницы отправляют результат публикации на `POST /__published`,
+сервер складывает его в `ReplayServer.published`.
+"""
+
+import json
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from pathlib import Path
+from urllib.parse import urlparse
+
+from src.logger import logger
+
+FIXTURES_DIR: Path = Path(__file__).parent / 'fixtures'
+
+
+class ReplayServer:
+    """ HTTP server with the Facebook page snapshots, running in a background thread.
+
+    Example:
+        >>> with ReplayServer() as server:
+        ...     d.get_url(server.group_url('replay'))
+        ...     post_message(d, category)
+        ...     print(server.published[-1]['text'])
+    """
+
+    routes: dict[str, str] = {
+        '/groups/': 'group.html',
+        '/events/create/': 'event_create.html',
+    }
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, fixtures_dir: Path = FIXTURES_DIR):
+        """ Creates the server. Port `0` picks a free port.
+
+        Args:
+            host (str, optional): Interface to listen on. Defaults to '127.0.0.1'.
+            port (int, optional): Port to listen on. Defaults to 0.
+            fixtures_dir (Path, optional): Directory with the HTML snapshots.
+        """
+        self.fixtures_dir = fixtures_dir
+        self.published: list[dict] = []
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._thread: threading.Thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def group_url(self, group_id: str = 'replay') -> str:
+        """ Returns the URL of the group page snapshot. """
+        return f"{self.base_url}/groups/{group_id}/"
+
+    def event_url(self, group_id: str = 'replay') -> str:
+        """ Returns the URL of the event creation form snapshot. """
+        return f"{self.base_url}/events/create/?group_id={group_id}"
+
+    def wait_published(self, count: int, timeout: float = 10) -> bool:
+        """ Waits until the pages have reported `count` publications.
+
+        Returns:
+            bool: `True` if `count` publications were received before the timeout.
+        """
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            with self._lock:
+                if len(self.published) >= count:
+                    return True
+            time.sleep(0.1)
+        return False
+
+    def start(self) -> 'ReplayServer':
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        logger.info(f"Replay server started on {self.base_url}")
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> 'ReplayServer':
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = urlparse(self.path).path
+                fixture = next((name for prefix, name in server.routes.items() if path.startswith(prefix)), None)
+                if not fixture:
+                    self.send_error(404)
+                    return
+                body = (server.fixtures_dir / fixture).read_bytes()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                if urlparse(self.path).path != '/__published':
+                    self.send_error(404)
+                    return
+                length = int(self.headers.get('Content-Length', 0))
+                with server._lock:
+                    server.published.append(json.loads(self.rfile.read(length) or b'{}'))
+                self.send_response(204)
+                self.end_headers()
+
+            def log_message(self, format, *args):
+                ...
+
+        return Handler
@@ -9,6 +9,10 @@ from .version import __version__,  __doc__, __details__
 from .login import login
 from .post_message  import *
 from .switch_account import switch_account
+from .timeouts import locator_timeouts
+from .tracer import ChromeTracer
+from .batch import resolve_locators
+from .snapshots import failure_snapshots, snapshot_failure
 from .post_message import (post_title,   # <- заголовок
                            upload_media, # <- изображения 
                            update_images_captions, # <- подписи к изображениям 
@@ -0,0 +1,114 @@
+## \file ../src/advertisement/facebook/scenarios/batch.py
+# -*- coding: utf-8 -*-
+# /path/to/interpreter/python
+""" Пакетное разрешение локаторов
+
+`resolve_locators` находит несколько локаторов из JSON файла сценария одним вызовом
+`execute_script`: для каждого возвращаются наличие, видимость и найденные элементы.
+Сценарий проверяет состояние формы и получает элементы за один обмен с браузером
+вместо отдельного `execute_locator` на каждый локатор. Если элемент не найден или не
+виден, сценарий переходит к обычному `execute_locator` с ожиданием.
+
+Example:
+    >>> state = resolve_locators(d, locator, ('uploaded_media_frame', 'edit_image_properties_textarea'))
+    >>> state['edit_image_properties_textarea'].elements
+    [<WebElement ...>, <WebElement ...>]
+"""
+
+from types import SimpleNamespace
+
+from src.webdriver import Driver
+from src.logger import logger
+from .timeouts import execute_locator
+from .waits import locator_query
+
+RESOLVE_SCRIPT: str = """
+const result = {};
+for (const [name, by, selector] of arguments[0]) {
+    let nodes = [];
+    try {
+        if (by === 'XPATH') {
+            const snapshot = document.evaluate(selector, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+            for (let i = 0; i < snapshot.snapshotLength; i++) nodes.push(snapshot.snapshotItem(i));
+        } else {
+            nodes = Array.from(document.querySelectorAll(selector));
+        }
+    } catch (e) {
+        result[name] = {present: false, visible: false, elements: [], error: String(e)};
+        continue;
+    }
+    const elements = nodes.filter(node => node.nodeType === Node.ELEMENT_NODE);
+    const visible = elements.some(el => el.getClientRects().length > 0 && getComputedStyle(el).visibility !== 'hidden');
+    result[name] = {present: elements.length > 0, visible: visible, elements: elements};
+}
+return result;
+"""
+
+
+def resolve_locators(d: Driver, locators: SimpleNamespace, names: list[str] | tuple[str, ...]) -> dict[str, SimpleNamespace | None]:
+    """ Resolves several locators of a scenario in one script call.
+
+    Args:
+        d (Driver): The driver instance used for interacting with the webpage.
+        locators (SimpleNamespace): Locators loaded from a JSON file of the scenario.
+        names (list[str] | tuple[str, ...]): Names of the locators inside `locators`.
+
+    Returns:
+        dict[str, SimpleNamespace | None]: `present`, `visible` and `elements` per locator name.
+            `None` for locators the script cannot resolve (unknown `by`, missing locator, script error).
+    """
+    queries = {}
+    for name in names:
+        query = locator_query(getattr(locators, name, None))
+        if query:
+            queries[name] = query
+    state: dict[str, SimpleNamespace | None] = {name: None for name in names}
+    if not queries:
+        return state
+
+    try:
+        found = d.execute_script(RESOLVE_SCRIPT, [[name, by, selector] for name, (by, selector) in queries.items()]) or {}
+    except Exception as ex:
+        logger.debug(f"Batch resolution of {', '.join(queries)} failed: {ex}", None, False)
+        return state
+
+    for name, entry in found.items():
+        if entry.get('error'):
+            logger.debug(f"Locator `{name}`: {entry['error']}", None, False)
+            continue
+        state[name] = SimpleNamespace(present=entry['present'], visible=entry['visible'], elements=entry['elements'] or [])
+    return state
+
+
+def click_resolved(d: Driver, locators: SimpleNamespace, state: dict, locator_name: str, **kwargs) -> bool:
+    """ Clicks an element resolved by `resolve_locators`.
+
+    If the element was not visible, or the click fails, the locator is executed with
+    `timeouts.execute_locator`, which waits for it.
+
+    Args:
+        d (Driver): The driver instance used for interacting with the webpage.
+        locators (SimpleNamespace): Locators loaded from a JSON file of the scenario.
+        state (dict): Result of `resolve_locators`.
+        locator_name (str): Name of the locator to click.
+        **kwargs: Arguments of `timeouts.execute_locator` for the fallback (`default_timeout` etc.).
+    """
+    resolved = state.get(locator_name)
+    if resolved and resolved.visible:
+        try:
+            resolved.elements[0].click()
+            return True
+        except Exception as ex:
+            logger.debug(f"Click on resolved `{locator_name}` failed: {ex}", None, False)
+    return bool(execute_locator(d, locators, locator_name, **kwargs))
+
+
+def resolved_elements(d: Driver, locators: SimpleNamespace, state: dict, locator_name: str, **kwargs) -> list:
+    """ Elements resolved by `resolve_locators`; executes the locator if none were found. """
+    resolved = state.get(locator_name)
+    if resolved and resolved.present:
+        return resolved.elements
+    result = execute_locator(d, locators, locator_name, **kwargs)
+    if not result:
+        return []
+    return result if isinstance(result, list) else [result]
@@ -14,6 +14,8 @@ from src import gs
 from src.webdriver import Driver
 from src.utils import j_loads_ns, pprint
 from src.logger import logger
+from .waits import wait_for_locators
+from .snapshots import snapshot_failure
 
 # Load locators from JSON file.
 locator: SimpleNamespace = j_loads_ns(
@@ -40,6 +42,7 @@ def post_title(d: Driver, event: SimpleNamespace) -> bool:
     # Send title for event
     if not d.execute_locator(locator = locator.event_title, message = event.title):
         logger.error("Failed to send event title", exc_info=False)
+        snapshot_failure(d, 'event_title', locator.event_title)
         return
     return True
 
@@ -64,6 +67,7 @@ def post_date(d: Driver, event: SimpleNamespace) -> bool:
     date, time = event.start.split() 
     if not d.execute_locator(locator = locator.start_date, message = date):
         logger.error("Failed to send event date", exc_info=False)
+        snapshot_failure(d, 'start_date', locator.start_date)
         return
     return True
 
@@ -88,6 +92,7 @@ def post_time(d: Driver, event: SimpleNamespace) -> bool:
     date, time = event.start.split() 
     if not d.execute_locator(locator = locator.start_time, message = time):
         logger.error("Failed to send event time", exc_info=False)
+        snapshot_failure(d, 'start_time', locator.start_time)
         return
     return True
 
@@ -112,6 +117,7 @@ def post_description(d: Driver, event: SimpleNamespace) -> bool:
     d.scroll(1,300,'down')
     if not d.execute_locator(locator = locator.event_description, message = f"{event.description}\n{event.promotional_link}"):
         logger.error("Failed to send event description", exc_info=False)
+        snapshot_failure(d, 'event_description', locator.event_description)
         return
     return True
 
@@ -130,6 +136,8 @@ def post_event(d: Driver, event: SimpleNamespace) -> bool:
         >>> products = [SimpleNamespace(image_local_saved_path='path/to/image.jpg', ...)]
         >>> promote_post(driver, category, products)
     """
+    # Форма мероприятия открывается по ссылке из промоутера; ждём её поле названия
+    wait_for_locators(d, locator, ('event_title',), timeout=30)
     if not post_title(d, event): 
         return
     # if not post_date(d, event): 
@@ -139,8 +147,11 @@ def post_event(d: Driver, event: SimpleNamespace) -> bool:
     if not post_description(d, event): 
         return
     if not d.execute_locator(locator = locator.event_send): 
+        snapshot_failure(d, 'event_send', locator.event_send)
         return
-    time.sleep(30)
+    # Форма закрывается, когда мероприятие создано
+    if not wait_for_locators(d, locator, ('event_send',), timeout=30, appear=False):
+        logger.debug("Event form is still open after 30s", None, False)
     #input()
     return True
 
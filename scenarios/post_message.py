@@ -234,6 +234,12 @@ from src import gs
 from src.webdriver import Driver
 from src.utils import j_loads_ns, pprint
 from src.logger import logger
+from .timeouts import execute_locator
+from .batch import resolve_locators, click_resolved, resolved_elements
+from .waits import wait_for_locators
+from .text_input import insert_text
+from .snapshots import snapshot_failure
+from src.advertisement.facebook.models import Product
 
 # Load locators from JSON file.
 locator: SimpleNamespace = j_loads_ns(
@@ -262,16 +268,24 @@ def post_title(d: Driver, category: SimpleNamespace) -> bool:
         return
 
     # Open the 'add post' box
-    if not d.execute_locator(locator = locator.open_add_post_box, timeout = 120):
+    if not execute_locator(d, locator, 'open_add_post_box', default_timeout = 120):
         logger.debug("Failed to open 'add post' box", exc_info=False)
+        snapshot_failure(d, 'open_add_post_box', locator.open_add_post_box)
         return
 
     # Construct the message with title and description
     message = f"{category.title}; {category.description};"
 
+    # Insert the whole message in one step; `;` is a line break as when typing
+    wait_for_locators(d, locator, ('add_message',), timeout=10)
+    composer = resolve_locators(d, locator, ('add_message',))['add_message']
+    if composer and composer.visible and insert_text(d, composer.elements[-1], message.replace(';', '\n')):
+        return True
+
     # Add the message to the post box
     if not d.execute_locator(locator.add_message, message):
         logger.debug(f"Failed to add message to post box: {message=}", exc_info=False)
+        snapshot_failure(d, 'add_message', locator.add_message)
         return
 
     return True
@@ -297,6 +311,7 @@ def upload_media(d: Driver, products: List[SimpleNamespace], no_video: bool = Fa
     """
     # Step 1: Open the 'add media' form. It may already be open.
     if not d.execute_locator(locator.open_add_foto_video_form): 
+        snapshot_failure(d, 'open_add_foto_video_form', locator.open_add_foto_video_form)
         return
     d.wait(0.5)
 
@@ -306,33 +321,43 @@ def upload_media(d: Driver, products: List[SimpleNamespace], no_video: bool = Fa
 
     # Iterate over products and upload media.
     for product in products:
-        media_path = product.video_local_saved_path if hasattr(product, 'video_local_saved_path') and not no_video else product.image_local_saved_path
+        product = Product.coerce(product)
+        media_path = product.video_local_saved_path if product.video_local_saved_path and not no_video else product.image_local_saved_path
         try:
             # Upload the media file.
-            if d.execute_locator(locator = locator.foto_video_input, message = media_path , timeout = 20):
+            if execute_locator(d, locator, 'foto_video_input', default_timeout = 20, message = media_path):
                 d.wait(1.5)
             else:
                 logger.error(f"Ошибка загрузки изображения {media_path=}")
+                snapshot_failure(d, 'foto_video_input', locator.foto_video_input, f"{media_path=}")
                 return
         except Exception as ex:
             logger.error("Error in media upload", ex, exc_info=True)
+            snapshot_failure(d, 'foto_video_input', locator.foto_video_input, f"{type(ex).__name__}: {ex}")
             return
 
     # Step 3: Update captions for the uploaded media.
-    if not d.execute_locator(locator.edit_uloaded_media_button):
-        logger.error(f"Ошибка загрузки изображения {media_path=}")
-        return
-    uploaded_media_frame = d.execute_locator(locator.uploaded_media_frame)
-    if not uploaded_media_frame:
+    # Состояние окна редактирования проверяется одним скриптом
+    media_form = ('edit_uloaded_media_button', 'uploaded_media_frame', 'edit_image_properties_textarea')
+    state = resolve_locators(d, locator, media_form)
+    editor = state['edit_image_properties_textarea']
+    if not (editor and editor.visible):
+        if not click_resolved(d, locator, state, 'edit_uloaded_media_button'):
+            logger.error(f"Ошибка загрузки изображения {media_path=}")
+            snapshot_failure(d, 'edit_uloaded_media_button', locator.edit_uloaded_media_button)
+            return
+        wait_for_locators(d, locator, ('edit_image_properties_textarea',), timeout=10)
+        state = resolve_locators(d, locator, media_form[1:])
+
+    if not resolved_elements(d, locator, state, 'uploaded_media_frame'):
         logger.debug(f"Не нашлись поля ввода подписей к изображениям")
+        snapshot_failure(d, 'uploaded_media_frame', locator.uploaded_media_frame)
         return
 
-    uploaded_media_frame = uploaded_media_frame[0] if isinstance(uploaded_media_frame, list) else uploaded_media_frame
-    d.wait(0.3)
-
-    textarea_list = d.execute_locator(locator.edit_image_properties_textarea)
+    textarea_list = resolved_elements(d, locator, state, 'edit_image_properties_textarea')
     if not textarea_list:
         logger.error("Не нашлись поля ввода подписи к изображениям")
+        snapshot_failure(d, 'edit_image_properties_textarea', locator.edit_image_properties_textarea)
         return
     # Update image captions.
     update_images_captions(d, products, textarea_list)
@@ -340,9 +365,82 @@ def upload_media(d: Driver, products: List[SimpleNamespace], no_video: bool = Fa
     return ret
 
 
+def build_caption(product: Product | SimpleNamespace, local_units: SimpleNamespace) -> str | None:
+    """ Builds the caption of a product image in the product language.
+
+    Args:
+        product (Product | SimpleNamespace): The product with `language` and the fields to show.
+        local_units (SimpleNamespace): Translations loaded from `translations.json`.
+
+    Returns:
+        str | None: The caption, or `None` if it could not be built.
+
+    Examples:
+        >>> product = SimpleNamespace(language='en', product_title='Lamp', original_price='10$')
+        >>> build_caption(product, local_units)
+        'Lamp\nPrice: 10$\n© All videos, ...'
+    """
+    product = Product.coerce(product)
+    lang = product.language.upper()
+    direction = getattr(local_units.LOCALE, lang, "LTR")
+    message = ""
+
+    # Add product details to message.
+    try:
+        if direction == "LTR":
+            if product.product_title:
+                message += f"{product.product_title}\n"
+
+            if product.original_price:
+                message += f"{getattr(local_units.original_price, lang)}: {product.original_price}\n"
+
+            if product.sale_price and product.discount and product.discount != '0%':
+                message += f"{getattr(local_units.discount, lang)}: {product.discount}\n"
+                message += f"{getattr(local_units.sale_price, lang)}: {product.sale_price}\n"
+
+            if product.evaluate_rate and product.evaluate_rate != '0.0%':
+                message += f"{getattr(local_units.evaluate_rate, lang)}: {product.evaluate_rate}\n"
+
+            if product.promotion_link:
+                message += f"{getattr(local_units.promotion_link, lang)}: {product.promotion_link}\n"
+
+            if product.tags:
+                message += f"{getattr(local_units.tags, lang)}: {product.tags}\n"
+            message += f"{getattr(local_units.COPYRIGHT, lang)}"
+            
+        else:  # RTL direction
+            if product.product_title:
+                message += f"\n{product.product_title}"
+
+            if product.original_price:
+                message += f"\n{product.original_price} :{getattr(local_units.original_price, lang)}"
+
+            if product.sale_price and product.discount and product.discount != '0%':
+                message += f"\n{product.discount} :{getattr(local_units.discount, lang)}"
+                message += f"\n{product.sale_price} :{getattr(local_units.sale_price, lang)}"
+
+            if product.evaluate_rate and product.evaluate_rate != '0.0%':
+                message += f"\n{product.evaluate_rate} :{getattr(local_units.evaluate_rate, lang)}"
+
+            if product.promotion_link:
+                message += f"\n{product.promotion_link} :{getattr(local_units.promotion_link, lang)}"
+
+            if product.tags:
+                message += f"\n{product.tags} :{getattr(local_units.tags, lang)}"
+            message += f"\n{getattr(local_units.COPYRIGHT, lang)}"
+            
+    except Exception as ex:
+        logger.error("Error in message generation", ex, exc_info=True)
+        return 
+
+    return message
+
+
 def update_images_captions(d: Driver, products: List[SimpleNamespace], textarea_list: List[WebElement]) -> None:
     """ Adds descriptions to uploaded media files.
 
+    Products compiled by `payload_cache` carry a ready `caption` and are not rendered again.
+
     Args:
         d (Driver): The driver instance used for interacting with the webpage.
         products (List[SimpleNamespace]): List of products with details to update.
@@ -361,57 +459,10 @@ def update_images_captions(d: Driver, products: List[SimpleNamespace], textarea_
             textarea_list (List[WebElement]): List of textareas where captions are added.
             i (int): Index of the product in the list.
         """
-        lang = product.language.upper()
-        direction = getattr(local_units.LOCALE, lang, "LTR")
-        message = ""
-
-        # Add product details to message.
-        try:
-            if direction == "LTR":
-                if hasattr(product, 'product_title'):
-                    message += f"{product.product_title}\n"
-
-                if hasattr(product, 'original_price'):
-                    message += f"{getattr(local_units.original_price, lang)}: {product.original_price}\n"
-
-                if hasattr(product, 'sale_price') and hasattr(product, 'discount') and product.discount != '0%':
-                    message += f"{getattr(local_units.discount, lang)}: {product.discount}\n"
-                    message += f"{getattr(local_units.sale_price, lang)}: {product.sale_price}\n"
-
-                if hasattr(product, 'evaluate_rate') and product.evaluate_rate != '0.0%':
-                    message += f"{getattr(local_units.evaluate_rate, lang)}: {product.evaluate_rate}\n"
-
-                if hasattr(product, 'promotion_link'):
-                    message += f"{getattr(local_units.promotion_link, lang)}: {product.promotion_link}\n"
-
-                if hasattr(product, 'tags'):
-                    message += f"{getattr(local_units.tags, lang)}: {product.tags}\n"
-                message += f"{getattr(local_units.COPYRIGHT, lang)}"
-                
-            else:  # RTL direction
-                if hasattr(product, 'product_title'):
-                    message += f"\n{product.product_title}"
-
-                if hasattr(product, 'original_price'):
-                    message += f"\n{product.original_price} :{getattr(local_units.original_price, lang)}"
-
-                if hasattr(product, 'sale_price') and hasattr(product, 'discount') and product.discount != '0%':
-                    message += f"\n{product.discount} :{getattr(local_units.discount, lang)}"
-                    message += f"\n{product.sale_price} :{getattr(local_units.sale_price, lang)}"
-
-                if hasattr(product, 'evaluate_rate') and product.evaluate_rate != '0.0%':
-                    message += f"\n{product.evaluate_rate} :{getattr(local_units.evaluate_rate, lang)}"
-
-                if hasattr(product, 'promotion_link'):
-                    message += f"\n{product.promotion_link} :{getattr(local_units.promotion_link, lang)}"
-
-                if hasattr(product, 'tags'):
-                    message += f"\n{product.tags} :{getattr(local_units.tags, lang)}"
-                message += f"\n{getattr(local_units.COPYRIGHT, lang)}"
-                
-        except Exception as ex:
-            logger.error("Error in message generation", ex, exc_info=True)
-            return 
+        product = Product.coerce(product)
+        message = product.caption or build_caption(product, local_units)
+        if message is None:
+            return
 
         # Send message to textarea.
         try:
@@ -446,8 +497,10 @@ def post_message(d: Driver, category: SimpleNamespace,  no_video: bool = False)
 
     if not upload_media(d, category.products, no_video): 
         return
-    if not d.execute_locator(locator = locator.finish_editing_button): 
+    if not click_resolved(d, locator, resolve_locators(d, locator, ('finish_editing_button',)), 'finish_editing_button'):
+        snapshot_failure(d, 'finish_editing_button', locator.finish_editing_button)
         return
-    if not d.execute_locator(locator.publish, timeout = 20): 
+    if not execute_locator(d, locator, 'publish', default_timeout = 20): 
+        snapshot_failure(d, 'publish', locator.publish)
         return
     return True
@@ -14,6 +14,7 @@ from src import gs
 from src.webdriver import Driver
 from src.utils import j_loads_ns, pprint
 from src.logger import logger
+from .timeouts import execute_locator
 
 # Load locators from JSON file.
 locator: SimpleNamespace = j_loads_ns(
@@ -42,7 +43,7 @@ def post_title(d: Driver, category: SimpleNamespace) -> bool:
         return
 
     # Open the 'add post' box
-    if not d.execute_locator(locator.open_add_post_box):
+    if not execute_locator(d, locator, 'open_add_post_box'):
         logger.error("Failed to open 'add post' box", exc_info=False)
         return
 
@@ -89,7 +90,7 @@ async def upload_media(d: Driver, products: List[SimpleNamespace], no_video:bool
         media_path = product.video_local_saved_path if hasattr(product, 'video_local_saved_path') and not no_video else product.image_local_saved_path
         try:
             # Upload the media file.
-            if d.execute_locator(locator.foto_video_input, media_path):
+            if execute_locator(d, locator, 'foto_video_input', message = media_path):
                 d.wait(1.5)
             else:
                 logger.error(f"Ошибка загрузки изображения {media_path=}")
@@ -213,7 +214,7 @@ async def promote_post(d: Driver, category: SimpleNamespace, products: List[Simp
         return
     if not d.execute_locator(locator.finish_editing_button): 
         return
-    if not d.execute_locator(locator.publish): 
+    if not execute_locator(d, locator, 'publish'): 
         return
     return True
 
@@ -0,0 +1,141 @@
+## \file ../src/advertisement/facebook/scenarios/snapshots.py
+# -*- coding: utf-8 -*-
+# /path/to/interpreter/python
+""" Снимки страницы при сбоях сценариев
+
+Когда шаг сценария не удался, `snapshot_failure` снимает скриншот, DOM, текущий URL и
+локатор шага. В потоке публикации делаются только вызовы драйвера (страница не должна
+успеть измениться); сжатие, запись zip-файла и ротация кольцевого буфера на диске
+выполняются в фоновом потоке, так что промоутер сразу переходит к следующей группе.
+Если фоновый поток не успевает, лишние снимки отбрасываются, а не задерживают публикацию.
+
+Example:
+    >>> if not execute_locator(d, locator, 'publish', default_timeout=20):
+    ...     snapshot_failure(d, 'publish', locator.publish)
+"""
+
+import atexit
+import json
+import queue
+import threading
+import zipfile
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+from types import SimpleNamespace
+
+from src import gs
+from src.webdriver import Driver
+from src.logger import logger
+from .timeouts import locator_timeouts
+
+
+class FailureSnapshots:
+    """ Background writer of failure snapshots with an on-disk ring buffer of `max_snapshots` files. """
+
+    def __init__(self, directory: str | Path = None, max_snapshots: int = 200, max_pending: int = 20, enabled: bool = True):
+        """
+        Args:
+            directory (str | Path, optional): Snapshot directory. Defaults to `tmp/facebook_snapshots`.
+            max_snapshots (int, optional): Snapshots kept on disk; the oldest are deleted first. Defaults to 200.
+            max_pending (int, optional): Snapshots waiting for the writer; more are dropped. Defaults to 20.
+            enabled (bool, optional): Capture snapshots. Defaults to True.
+        """
+        self.directory = Path(directory) if directory else gs.path.tmp / 'facebook_snapshots'
+        self.max_snapshots = max_snapshots
+        self.enabled = enabled
+        self._queue: queue.Queue = queue.Queue(maxsize=max_pending)
+        self._files: deque[Path] | None = None
+        self._writer: threading.Thread | None = None
+        self._start_lock = threading.Lock()
+        atexit.register(self.close)
+
+    def capture(self, d: Driver, step: str, locator: SimpleNamespace = None, error: str = None):
+        """ Takes the snapshot data from the browser and hands it to the writer.
+
+        Args:
+            d (Driver): The driver instance used for interacting with the webpage.
+            step (str): Failed scenario step, e.g. `open_add_post_box`.
+            locator (SimpleNamespace, optional): Locator of the step.
+            error (str, optional): Message of the failure.
+        """
+        if not self.enabled:
+            return
+        meta = {
+            'ts': datetime.now().isoformat(timespec='milliseconds'),
+            'step': step,
+            'group_url': locator_timeouts.group_url,
+            'locator': vars(locator) if isinstance(locator, SimpleNamespace) else locator,
+            'error': error,
+        }
+        screenshot = html = None
+        try:
+            meta['url'] = d.current_url
+            screenshot = d.get_screenshot_as_png()
+            html = d.page_source
+        except Exception as ex:
+            meta['capture_error'] = f"{type(ex).__name__}: {ex}"
+
+        self._start()
+        try:
+            self._queue.put_nowait((meta, screenshot, html))
+        except queue.Full:
+            logger.debug(f"Snapshot of {step} dropped: writer is behind", None, False)
+
+    def _start(self):
+        with self._start_lock:
+            if self._writer and self._writer.is_alive():
+                return
+            self._writer = threading.Thread(target=self._run, name='failure-snapshots', daemon=True)
+            self._writer.start()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                self._write(*item)
+            except Exception as ex:
+                logger.error("Failure snapshot could not be written", ex)
+            finally:
+                self._queue.task_done()
+
+    def _write(self, meta: dict, screenshot: bytes | None, html: str | None):
+        if self._files is None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self._files = deque(sorted(self.directory.glob('*.zip')))
+        name = f"{meta['ts'].replace(':', '').replace('-', '').replace('.', '_')}_{meta['step']}.zip"
+        path = self.directory / name
+        tmp_path = path.with_suffix('.tmp')
+        with zipfile.ZipFile(tmp_path, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr('meta.json', json.dumps(meta, ensure_ascii=False, indent=2, default=str))
+            if screenshot:
+                archive.writestr('screenshot.png', screenshot, compress_type=zipfile.ZIP_STORED)  # <- PNG уже сжат
+            if html:
+                archive.writestr('page.html', html)
+        tmp_path.replace(path)
+        self._files.append(path)
+        while len(self._files) > self.max_snapshots:
+            self._files.popleft().unlink(missing_ok=True)
+
+    def close(self, timeout: float = 10):
+        """ Writes the pending snapshots and stops the writer. """
+        if not self._writer or not self._writer.is_alive():
+            return
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        self._writer.join(timeout)
+
+
+failure_snapshots = FailureSnapshots()
+
+
+def snapshot_failure(d: Driver, step: str, locator: SimpleNamespace = None, error: str = None):
+    """ Captures a failure snapshot; never raises into the scenario. """
+    try:
+        failure_snapshots.capture(d, step, locator, error)
+    except Exception as ex:
+        logger.debug(f"Snapshot of {step} failed: {ex}", None, False)
@@ -0,0 +1,100 @@
+## \file ../src/advertisement/facebook/scenarios/text_input.py
+# -*- coding: utf-8 -*-
+# /path/to/interpreter/python
+""" Быстрая вставка текста в поле ввода
+
+Текст поста вставляется в contenteditable поле фейсбука одним вызовом скрипта вместо
+набора по одной клавише. Сначала текст передаётся как вставка из буфера обмена (событие
+`paste` с `text/plain`), редактор фейсбука обрабатывает его как обычную вставку; если
+содержимое поля не совпало с текстом, используется `document.execCommand('insertText')`
+с `insertLineBreak` между строками. Если и это не сработало, поле очищается, и сценарий
+набирает текст как раньше.
+
+Переносы строк и RTL текст (иврит) передаются без изменений: направление определяет редактор.
+Содержимое поля сверяется с текстом построчно, так что потерянный перенос строки не проходит
+проверку.
+"""
+
+from selenium.webdriver.remote.webelement import WebElement
+
+from src.webdriver import Driver
+from src.logger import logger
+
+INSERT_SCRIPT: str = """
+const [element, text] = arguments;
+// Сравнение по строкам: пробелы схлопываются только внутри строки, перенос строки значим.
+// Пустые строки не сравниваются - абзацы редактора дают в innerText лишние переводы строк.
+const normalize = (value) => (value || '').split(/\\r?\\n/)
+    .map((line) => line.replace(/\\s+/g, ' ').trim())
+    .filter((line) => line)
+    .join('\\n');
+const expected = normalize(text);
+const content = () => element.innerText !== undefined ? element.innerText : element.textContent;
+const editable = element.isContentEditable;
+
+function clear() {
+    element.focus();
+    if (editable) {
+        const selection = window.getSelection();
+        selection.selectAllChildren(element);
+        document.execCommand('delete', false);
+    } else {
+        element.value = '';
+        element.dispatchEvent(new Event('input', {bubbles: true}));
+    }
+}
+
+function paste() {
+    const data = new DataTransfer();
+    data.setData('text/plain', text);
+    element.dispatchEvent(new ClipboardEvent('paste', {clipboardData: data, bubbles: true, cancelable: true}));
+}
+
+function insert() {
+    const lines = text.split('\\n');
+    lines.forEach((line, i) => {
+        if (i) document.execCommand('insertLineBreak', false);
+        if (line) document.execCommand('insertText', false, line);
+    });
+}
+
+element.focus();
+if (!editable) {
+    // textarea / input: значение и событие input
+    element.value = text;
+    element.dispatchEvent(new Event('input', {bubbles: true}));
+    return normalize(element.value) === expected ? 'value' : null;
+}
+for (const [mode, run] of [['paste', paste], ['insertText', insert]]) {
+    run();
+    if (normalize(content()) === expected) return mode;
+    clear();
+}
+return null;
+"""
+
+
+def insert_text(d: Driver, element: WebElement, text: str) -> str | None:
+    """ Inserts text into a contenteditable (or textarea) element in one step and verifies it.
+
+    Args:
+        d (Driver): The driver instance used for interacting with the webpage.
+        element (WebElement): Composer element, e.g. `(//div[@role='textbox'])[last()]`.
+        text (str): Text to insert; `\\n` starts a new line.
+
+    Returns:
+        str | None: Mode that produced the text (`paste`, `insertText`, `value`), or `None` if the
+            element content did not match. The element is left empty in that case.
+
+    Example:
+        >>> insert_text(d, composer, "Заголовок\\nОписание")
+        'paste'
+    """
+    try:
+        mode = d.execute_script(INSERT_SCRIPT, element, text)
+    except Exception as ex:
+        logger.debug(f"Text insertion failed: {ex}", None, False)
+        return None
+    if not mode:
+        logger.debug(f"Composer content did not match inserted text ({len(text)} chars)", None, False)
+    return mode
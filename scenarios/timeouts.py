@@ -0,0 +1,187 @@
+## \file ../src/advertisement/facebook/scenarios/timeouts.py
+# -*- coding: utf-8 -*-
+# /path/to/interpreter/python
+""" Адаптивные таймауты локаторов
+
+Время срабатывания `execute_locator` записывается для каждого локатора и каждой группы.
+Таймаут локатора вычисляется из высокого перцентиля его собственной истории плюс запас.
+Константы из сценариев используются только при холодном старте, пока истории нет.
+Неудачные вызовы записываются отдельно (`<locator>:failed`) и в перцентиль не входят:
+их время равно таймауту, и каждый сбой иначе поднимал бы следующий таймаут.
+Зато подряд идущие сбои считаются: после `max_failures` сбоев подряд выученный таймаут
+удваивается с каждым следующим сбоем (не меньше таймаута по умолчанию), пока вызов снова
+не сработает. Иначе слишком короткий таймаут не вырос бы никогда.
+"""
+
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+from src import gs
+from src.webdriver import Driver
+from src.utils import j_loads, j_dumps
+from src.logger import logger
+from .waits import locator_query, observe
+
+
+class LocatorTimeouts:
+    """ Stores observed locator latencies and derives timeouts from them.
+
+    History is kept per group (`group_url`) and for all groups together (`GLOBAL_KEY`).
+    The group history is preferred once it has enough samples, then the global one,
+    then the default passed by the scenario.
+    """
+    GLOBAL_KEY: str = '*'
+    FAILED_SUFFIX: str = ':failed'
+
+    def __init__(self,
+                 history_path: str | Path = None,
+                 percentile: float = 0.95,
+                 margin: float = 1.5,
+                 extra_seconds: float = 2.0,
+                 min_samples: int = 5,
+                 max_samples: int = 100,
+                 min_timeout: float = 5.0,
+                 max_timeout: float = 300.0,
+                 max_failures: int = 2):
+        """ Initializes the latency history.
+
+        Args:
+            history_path (str | Path, optional): JSON file with the history. Defaults to `data/facebook/locator_latencies.json`.
+            percentile (float, optional): Percentile of the history used as the base of the timeout. Defaults to 0.95.
+            margin (float, optional): Multiplier applied to the percentile. Defaults to 1.5.
+            extra_seconds (float, optional): Constant added on top of the multiplied percentile. Defaults to 2.0.
+            min_samples (int, optional): Samples required before the history replaces the default. Defaults to 5.
+            max_samples (int, optional): Only the latest `max_samples` samples are kept per locator. Defaults to 100.
+            min_timeout (float, optional): Lower bound of a learned timeout. Defaults to 5.0.
+            max_timeout (float, optional): Upper bound of a learned timeout. Defaults to 300.0.
+            max_failures (int, optional): Consecutive failures after which a learned timeout is backed off. Defaults to 2.
+        """
+        self.history_path = Path(history_path) if history_path else gs.path.data / 'facebook' / 'locator_latencies.json'
+        self.percentile = percentile
+        self.margin = margin
+        self.extra_seconds = extra_seconds
+        self.min_samples = min_samples
+        self.max_samples = max_samples
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.max_failures = max_failures
+        self.failure_streaks: dict[str, dict[str, int]] = {}  # <- сбои подряд по группе и локатору, только в памяти
+        self._local = threading.local()  # <- текущая группа своя у каждой вкладки (потока)
+        self._lock = threading.Lock()
+        self._dirty: bool = False
+        self.history: dict[str, dict[str, list[float]]] = j_loads(self.history_path) if self.history_path.exists() else {}
+
+    @property
+    def group_url(self) -> str | None:
+        """ Group of the current thread; every posting tab runs in its own thread. """
+        return getattr(self._local, 'group_url', None)
+
+    @group_url.setter
+    def group_url(self, value: str | None):
+        self._local.group_url = value
+
+    def record(self, locator_name: str, seconds: float, group_url: str = None, failed: bool = False):
+        """ Adds an observed latency to the locator history of the group and to the global history.
+
+        Args:
+            locator_name (str): Name of the locator in the JSON file (e.g. `open_add_post_box`).
+            seconds (float): Observed latency.
+            group_url (str, optional): Group of the observation. Defaults to the current `group_url`.
+            failed (bool, optional): The call failed; kept under `<locator>:failed`, out of the percentile. Defaults to False.
+        """
+        group_url = group_url or self.group_url
+        name = f"{locator_name}{self.FAILED_SUFFIX}" if failed else locator_name
+        with self._lock:
+            for key in (group_url, self.GLOBAL_KEY):
+                if not key:
+                    continue
+                samples = self.history.setdefault(key, {}).setdefault(name, [])
+                samples.append(round(seconds, 3))
+                del samples[:-self.max_samples]
+                streaks = self.failure_streaks.setdefault(key, {})
+                streaks[locator_name] = streaks.get(locator_name, 0) + 1 if failed else 0
+            self._dirty = True
+
+    def timeout(self, locator_name: str, default: float = None, group_url: str = None) -> float | None:
+        """ Returns the timeout for the locator.
+
+        Args:
+            locator_name (str): Name of the locator in the JSON file.
+            default (float, optional): Cold-start timeout used while there is not enough history.
+            group_url (str, optional): Group to look up. Defaults to the current `group_url`.
+
+        Returns:
+            float | None: Learned timeout, or `default` if the history is too short. After `max_failures`
+                consecutive failures the learned timeout is doubled per further failure, and is at least `default`.
+
+        Example:
+            >>> locator_timeouts.record('publish', 3.0, group_url='https://www.facebook.com/groups/1')  # x5
+            >>> locator_timeouts.timeout('publish', 20, group_url='https://www.facebook.com/groups/1')
+            6.5
+        """
+        group_url = group_url or self.group_url
+        for key in (group_url, self.GLOBAL_KEY):
+            samples = self.history.get(key, {}).get(locator_name, []) if key else []
+            if len(samples) >= self.min_samples:
+                ordered = sorted(samples)
+                base = ordered[min(len(ordered) - 1, int(self.percentile * len(ordered)))]
+                learned = max(self.min_timeout, base * self.margin + self.extra_seconds)
+                streak = self.failure_streaks.get(key, {}).get(locator_name, 0)
+                if streak >= self.max_failures:
+                    # выученный таймаут, видимо, стал короче реальной задержки
+                    learned = max(learned * 2 ** (streak - self.max_failures + 1), default or 0)
+                return round(min(self.max_timeout, learned), 1)
+        return default
+
+    def save(self):
+        """ Writes the history to disk if it changed. """
+        with self._lock:
+            if not self._dirty:
+                return
+            j_dumps(self.history, self.history_path)
+            self._dirty = False
+
+
+locator_timeouts = LocatorTimeouts()
+
+
+def execute_locator(d: Driver, locators: SimpleNamespace, locator_name: str, default_timeout: float = None, **kwargs):
+    """ Executes a locator with an adaptive timeout and records its latency.
+
+    A call that fails is recorded separately and does not raise the next timeout:
+    its elapsed time is the timeout itself, not a latency. The wait itself is done by a
+    MutationObserver in the page (`waits.observe`); the locator is then executed without
+    polling. If the observer cannot be used, the driver waits as before.
+
+    Args:
+        d (Driver): The driver instance used for interacting with the webpage.
+        locators (SimpleNamespace): Locators loaded from a JSON file of the scenario.
+        locator_name (str): Name of the locator inside `locators`.
+        default_timeout (float, optional): Cold-start timeout. If `None`, the driver default is used until there is history.
+        **kwargs: Other arguments of `Driver.execute_locator` (`message` etc.).
+
+    Returns:
+        The result of `Driver.execute_locator`.
+
+    Example:
+        >>> execute_locator(d, locator, 'open_add_post_box', default_timeout=120)
+    """
+    timeout = locator_timeouts.timeout(locator_name, default_timeout)
+    if timeout:
+        kwargs['timeout'] = timeout
+    start = time.monotonic()
+    query = locator_query(getattr(locators, locator_name)) if timeout else None
+    if query:
+        try:
+            observe(d, [[locator_name, *query]], timeout)
+            kwargs['timeout'] = 0  # <- элемент уже на странице (или время вышло): без опроса
+        except Exception as ex:
+            logger.debug(f"Observer wait for `{locator_name}` failed: {ex}", None, False)
+    result = d.execute_locator(locator=getattr(locators, locator_name), **kwargs)
+    elapsed = time.monotonic() - start
+    locator_timeouts.record(locator_name, elapsed, failed=not result)
+    if not result:
+        logger.debug(f"Locator `{locator_name}` failed after {elapsed:.1f}s (timeout {timeout})", None, False)
+    return result
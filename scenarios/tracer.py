@@ -0,0 +1,204 @@
+## \file ../src/advertisement/facebook/scenarios/tracer.py
+# -*- coding: utf-8 -*-
+# /path/to/interpreter/python
+""" Трассировка вызовов вебдрайвера в формате Chrome Trace Event
+
+Включается явно. Перехватывает `execute_locator`, `get_url`, `scroll`, `wait`,
+`execute_script` и `execute_async_script` драйвера (и, по желанию, методы промоутера),
+записывает начало/конец, имя локатора или скрипта и результат. События дописываются
+в файл порциями (формат JSON Array), так что память не растёт за многодневный прогон.
+Файл открывается в https://ui.perfetto.dev или `chrome://tracing`.
+"""
+
+import atexit
+import importlib
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Callable
+
+from src import gs
+from src.logger import logger
+
+# Модули сценариев и имена их пространств локаторов.
+LOCATOR_MODULES: dict[str, str] = {
+    'post_message': 'locator',
+    'post_event': 'locator',
+    'login': 'locators',
+    'switch_account': 'locator',
+}
+
+# Скрипты сценариев, выполняемые через `execute_script` / `execute_async_script`.
+SCRIPT_NAMES: dict[str, tuple[str, str]] = {
+    'batch': ('RESOLVE_SCRIPT', 'resolve_locators'),
+    'waits': ('OBSERVE_SCRIPT', 'observe'),
+    'text_input': ('INSERT_SCRIPT', 'insert_text'),
+}
+
+
+def _locator_names() -> dict[int, str]:
+    """ Maps `id()` of every loaded locator namespace to `<scenario>.<locator_name>`. """
+    names = {}
+    for module_name, attr in LOCATOR_MODULES.items():
+        module = importlib.import_module(f"src.advertisement.facebook.scenarios.{module_name}")
+        for locator_name, locator in vars(getattr(module, attr)).items():
+            names[id(locator)] = f"{module_name}.{locator_name}"
+    return names
+
+
+def _script_names() -> dict[str, str]:
+    """ Maps the source of every scenario script to `<module>.<function>`. """
+    names = {}
+    for module_name, (attr, function) in SCRIPT_NAMES.items():
+        module = importlib.import_module(f"src.advertisement.facebook.scenarios.{module_name}")
+        names[getattr(module, attr)] = f"{module_name}.{function}"
+    return names
+
+
+def _describe(value: Any) -> Any:
+    """ Reduces an argument or a result to something small and JSON friendly. """
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    if isinstance(value, (str, Path)):
+        value = str(value)
+        return value if len(value) <= 120 else value[:117] + '...'
+    if isinstance(value, (list, tuple)):
+        return f"{type(value).__name__}[{len(value)}]"
+    if isinstance(value, SimpleNamespace):
+        for key in ('group_url', 'category_name', 'event_name', 'title'):
+            if hasattr(value, key):
+                return _describe(getattr(value, key))
+    return type(value).__name__
+
+
+class ChromeTracer:
+    """ Records driver and promoter calls as Chrome Trace Event `X` (complete) events.
+
+    Example:
+        >>> tracer = ChromeTracer()
+        >>> tracer.attach(d)                                  # execute_locator, get_url, scroll, wait, scripts
+        >>> tracer.attach(promoter, ('promote', 'process_groups'))
+        >>> promoter.run_campaigns(['campaign1'])
+        >>> tracer.save()
+    """
+    driver_methods: tuple[str, ...] = ('execute_locator', 'get_url', 'scroll', 'wait', 'execute_script', 'execute_async_script')
+
+    def __init__(self, path: str | Path = None, flush_every: int = 5000):
+        """
+        Args:
+            path (str | Path, optional): Output file. Defaults to `tmp/facebook_traces/trace_<date>.json`.
+            flush_every (int, optional): Events kept in memory before they are appended to the file. Defaults to 5000.
+        """
+        self.path = Path(path) if path else gs.path.tmp / 'facebook_traces' / f"trace_{datetime.now():%y%m%d_%H%M%S}.json"
+        self.flush_every = flush_every
+        self.events: list[dict] = []  # <- ещё не записанные события
+        self.written = 0
+        self.pid = os.getpid()
+        self._origin_ns = time.perf_counter_ns()
+        self._attached: list[tuple[object, str]] = []
+        self._locator_names = _locator_names()
+        self._script_names = _script_names()
+        self._lock = threading.Lock()
+        self.events.append({'name': 'process_name', 'ph': 'M', 'pid': self.pid, 'args': {'name': 'facebook promoter'}})
+        atexit.register(self.save)
+
+    def refresh_locators(self):
+        """ Re-reads the locator names after the scenario locators were reloaded. """
+        self._locator_names = _locator_names()
+
+    def _now_us(self) -> float:
+        return (time.perf_counter_ns() - self._origin_ns) / 1000
+
+    def _record(self, name: str, category: str, start_us: float, args: dict):
+        event = {
+            'name': name,
+            'cat': category,
+            'ph': 'X',
+            'ts': start_us,
+            'dur': self._now_us() - start_us,
+            'pid': self.pid,
+            'tid': threading.get_ident(),
+            'args': args,
+        }
+        with self._lock:
+            self.events.append(event)
+            full = len(self.events) >= self.flush_every
+        if full:
+            self._write()
+
+    def _span_name(self, method: str, args: tuple, kwargs: dict) -> str:
+        """ Uses the locator name for `execute_locator`, the scenario function for scripts and the method name otherwise. """
+        if method == 'execute_locator':
+            locator = kwargs.get('locator', args[0] if args else None)
+            return self._locator_names.get(id(locator), getattr(locator, 'locator_description', None) or method)
+        if method in ('execute_script', 'execute_async_script') and args:
+            return self._script_names.get(args[0], method)
+        return method
+
+    def _wrap(self, method: str, func: Callable) -> Callable:
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            start = self._now_us()
+            if method in ('execute_script', 'execute_async_script'):
+                described = args[1:]  # <- текст скрипта не нужен: имя уже в названии события
+            else:
+                described = [a for a in args if not isinstance(a, SimpleNamespace) or method != 'execute_locator']
+            call_args = {
+                'args': [_describe(a) for a in described],
+                **{k: _describe(v) for k, v in kwargs.items() if k != 'locator'},
+            }
+            try:
+                result = func(*args, **kwargs)
+            except Exception as ex:
+                self._record(self._span_name(method, args, kwargs), method, start, {**call_args, 'exception': type(ex).__name__})
+                raise
+            self._record(self._span_name(method, args, kwargs), method, start, {**call_args, 'result': _describe(result)})
+            return result
+        return wrapper
+
+    def attach(self, obj: object, methods: tuple[str, ...] = None) -> 'ChromeTracer':
+        """ Wraps the methods of `obj` on the instance. Driver methods are used by default. """
+        for method in methods or self.driver_methods:
+            setattr(obj, method, self._wrap(method, getattr(obj, method)))
+            self._attached.append((obj, method))
+        return self
+
+    def detach(self):
+        """ Removes all instance wrappers installed by `attach`. """
+        for obj, method in self._attached:
+            obj.__dict__.pop(method, None)
+        self._attached.clear()
+
+    @contextmanager
+    def span(self, name: str, **args):
+        """ Records an arbitrary block as a span, e.g. `with tracer.span('load groups', file=f):`. """
+        start = self._now_us()
+        try:
+            yield
+        finally:
+            self._record(name, 'span', start, {k: _describe(v) for k, v in args.items()})
+
+    def _write(self):
+        """ Appends the buffered events to `path` in the JSON Array format; the closing `]` is optional there. """
+        with self._lock:
+            events, self.events = self.events, []
+            if not events:
+                return
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, 'a' if self.written else 'w', encoding='utf-8') as f:
+                if not self.written:
+                    f.write('[\n')
+                f.writelines(json.dumps(event, ensure_ascii=False) + ',\n' for event in events)
+            self.written += len(events)
+
+    def save(self) -> Path:
+        """ Appends the buffered events to `path`. Safe to call repeatedly. """
+        self._write()
+        logger.info(f"Trace saved to {self.path} ({self.written} events)")
+        return self.path
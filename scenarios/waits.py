@@ -0,0 +1,147 @@
+## \file ../src/advertisement/facebook/scenarios/waits.py
+# -*- coding: utf-8 -*-
+# /path/to/interpreter/python
+""" Ожидание локаторов через MutationObserver
+
+Вместо опроса из Python (`find_element` до истечения таймаута) в страницу ставится
+MutationObserver на селекторы локаторов. Один вызов `execute_async_script` возвращается,
+как только один из локаторов появился (или исчез), либо по таймауту.
+
+Длинное ожидание делится на отрезки `wait_slice` секунд (по умолчанию меньше script timeout
+драйвера). `TabDriver` задаёт короткий отрезок, чтобы ожидание одной вкладки не держало
+сессию браузера, нужную другим вкладкам.
+
+Example:
+    >>> wait_for_locators(d, locator, ('event_title',), timeout=30)
+    'event_title'
+    >>> wait_for_locators(d, locator, ('event_send',), timeout=30, appear=False)   # форма закрылась
+    'event_send'
+"""
+
+import time
+from types import SimpleNamespace
+
+from src.webdriver import Driver
+from src.logger import logger
+
+DEFAULT_SLICE: float = 25.0
+
+OBSERVE_SCRIPT: str = """
+const [queries, appear, timeoutMs] = arguments;
+const done = arguments[arguments.length - 1];
+
+function present(by, selector) {
+    if (by === 'XPATH') {
+        return document.evaluate(selector, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue !== null;
+    }
+    return document.querySelector(selector) !== null;
+}
+
+function check() {
+    for (const [name, by, selector] of queries) {
+        if (present(by, selector) === appear) return name;
+    }
+    return null;
+}
+
+const first = check();
+if (first !== null || timeoutMs <= 0) {
+    done(first);
+    return;
+}
+
+let finished = false;
+let scheduled = false;
+const finish = (value) => {
+    if (finished) return;
+    finished = true;
+    observer.disconnect();
+    clearTimeout(timer);
+    done(value);
+};
+// Проверка не чаще одного раза за пачку мутаций: страница фейсбука меняется постоянно
+const observer = new MutationObserver(() => {
+    if (scheduled) return;
+    scheduled = true;
+    setTimeout(() => {
+        scheduled = false;
+        const name = check();
+        if (name !== null) finish(name);
+    }, 0);
+});
+observer.observe(document.documentElement, {childList: true, subtree: true, attributes: true});
+const timer = setTimeout(() => finish(null), timeoutMs);
+"""
+
+# Локаторы, отличные от XPATH, переводятся в CSS селектор
+CSS_BY: dict[str, str] = {
+    'CSS_SELECTOR': '{}',
+    'ID': '[id="{}"]',
+    'NAME': '[name="{}"]',
+    'CLASS_NAME': '.{}',
+    'TAG_NAME': '{}',
+}
+
+
+def locator_query(locator: SimpleNamespace) -> tuple[str, str] | None:
+    """ `(by, selector)` of a locator for the page scripts, or `None` if a script cannot resolve it. """
+    by = str(getattr(locator, 'by', '')).upper().replace(' ', '_')
+    selector = getattr(locator, 'selector', None)
+    if not isinstance(selector, str):
+        return None
+    if by == 'XPATH':
+        return by, selector
+    if by in CSS_BY:
+        return 'CSS', CSS_BY[by].format(selector)
+    return None
+
+
+def observe(d: Driver, queries: list[list[str]], timeout: float, appear: bool = True) -> str | None:
+    """ Waits in the page for one of the queries to appear or disappear.
+
+    Args:
+        d (Driver): The driver instance used for interacting with the webpage.
+        queries (list[list[str]]): `[name, by, selector]` per locator (see `locator_query`).
+        timeout (float): Seconds to wait.
+        appear (bool, optional): Wait for an element to appear (`True`) or to disappear. Defaults to True.
+
+    Returns:
+        str | None: Name of the first query that matched, or `None` on timeout.
+
+    Raises:
+        Exception: Errors of `execute_async_script` (invalid selector, navigation during the wait).
+    """
+    slice_seconds = getattr(d, 'wait_slice', None) or DEFAULT_SLICE
+    deadline = time.monotonic() + timeout
+    while True:
+        remaining = max(0.0, deadline - time.monotonic())
+        name = d.execute_async_script(OBSERVE_SCRIPT, queries, appear, int(min(remaining, slice_seconds) * 1000))
+        if name or remaining <= slice_seconds:
+            return name or None
+
+
+def wait_for_locators(d: Driver, locators: SimpleNamespace, names: list[str] | tuple[str, ...], timeout: float, appear: bool = True) -> str | None:
+    """ Waits until one of the locators appears (or disappears) in the page.
+
+    Args:
+        d (Driver): The driver instance used for interacting with the webpage.
+        locators (SimpleNamespace): Locators loaded from a JSON file of the scenario.
+        names (list[str] | tuple[str, ...]): Names of the locators inside `locators`.
+        timeout (float): Seconds to wait.
+        appear (bool, optional): Wait for an element to appear (`True`) or to disappear. Defaults to True.
+
+    Returns:
+        str | None: Name of the first locator that matched, or `None` on timeout or error.
+    """
+    queries = []
+    for name in names:
+        query = locator_query(getattr(locators, name, None))
+        if query:
+            queries.append([name, *query])
+    if not queries:
+        return None
+    try:
+        return observe(d, queries, timeout, appear)
+    except Exception as ex:
+        logger.debug(f"Waiting for {', '.join(names)} failed: {ex}", None, False)
+        return None
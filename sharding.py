@@ -0,0 +1,16 @@
+## \file ../src/advertisement/facebook/sharding.py
+# -*- coding: utf-8 -*-
+# /path/to/interpreter/python
+"""
+Sharding of groups across promoter workers.
+
+`cli.py` starts one worker per shard, and `FacebookPromoter` promotes only the groups of
+its own shard. Both take the shard of a group from here.
+"""
+
+import zlib
+
+
+def shard_of(group_url: str, workers: int) -> int:
+    """ Stable shard number of a group: the same URL always goes to the same worker. """
+    return zlib.crc32(group_url.rstrip('/').encode('utf-8')) % workers
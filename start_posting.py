@@ -3,13 +3,17 @@
 # /path/to/interpreter/python
 """Отправка рекламных объявлений в группы фейсбук """
 
+import sys
+
 import header 
-from src.webdriver import Driver, Chrome
+from src.webdriver import Driver
+from src.advertisement.facebook.browser_daemon import attach_or_launch
 from src.advertisement.facebook import FacebookPromoter
+from src.advertisement.facebook.profiling import RunProfiler
 from src.logger import logger
 
-d = Driver(Chrome)
-d.get_url(r"https://facebook.com")
+profiler: RunProfiler = RunProfiler().start() if '--profile' in sys.argv else None  # <- `python start_posting.py --profile`
+d: Driver = attach_or_launch(launch=False) # <- прогретый браузер `browser_daemon`, без него - `Driver(Chrome)` с рабочим профилем
 
 filenames:list[str] = [ "my_managed_groups.json",
             "ru_usd.json",
@@ -21,9 +25,12 @@ filenames:list[str] = [ "my_managed_groups.json",
 excluded_filenames:list[str] = ["my_managed_groups.json",]
 campaigns:list = ['pain',]
 
-promoter:FacebookPromoter = FacebookPromoter(d, group_file_paths=filenames, no_video=False)
+promoter:FacebookPromoter = FacebookPromoter(d, group_file_paths=filenames, no_video=False, profiler=profiler)
 
 try:
     promoter.run_campaigns(campaigns = campaigns, group_file_paths = filenames)
 except KeyboardInterrupt:
-    logger.info("Campaign promotion interrupted.")
\ No newline at end of file
+    logger.info("Campaign promotion interrupted.")
+finally:
+    if profiler:
+        profiler.stop()
\ No newline at end of file
@@ -3,19 +3,26 @@
 # /path/to/interpreter/python
 """Отправка рекламных объявлений в группы фейсбук """
 
+import sys
+
 import header 
-from src.webdriver import Driver, Chrome
+from src.webdriver import Driver
+from src.advertisement.facebook.browser_daemon import attach_or_launch
 from src.advertisement.facebook.promoter import FacebookPromoter
+from src.advertisement.facebook.profiling import RunProfiler
 from src.logger import logger
 
-d = Driver(Chrome)
-d.get_url(r"https://facebook.com")
+profiler: RunProfiler = RunProfiler().start() if '--profile' in sys.argv else None  # <- `python start_posting_my_groups.py --profile`
+d: Driver = attach_or_launch(launch=False) # <- прогретый браузер `browser_daemon`, без него - `Driver(Chrome)` с рабочим профилем
 
 filenames:list = ['my_managed_groups.json',]
 campaigns:list = ['pain',]
-promoter = FacebookPromoter(d, group_file_paths = filenames, no_video = False)
+promoter = FacebookPromoter(d, group_file_paths = filenames, no_video = False, profiler = profiler)
 
 try:
     promoter.run_campaigns(campaigns)
 except KeyboardInterrupt:
-    logger.info("Campaign promotion interrupted.")
\ No newline at end of file
+    logger.info("Campaign promotion interrupted.")
+finally:
+    if profiler:
+        profiler.stop()
\ No newline at end of file
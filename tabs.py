@@ -0,0 +1,259 @@
+## \file ../src/advertisement/facebook/tabs.py
+# -*- coding: utf-8 -*-
+# /path/to/interpreter/python
+"""
+Concurrent posting flows in tabs of one browser.
+
+A WebDriver session executes one command at a time against the current window. `TabDriver`
+is a driver proxy bound to one tab: every command takes the session lock, switches to its
+tab if needed and runs. Only short commands run under the lock. Waits (`wait`, polling of
+`execute_locator` timeouts), page loads of `get_url` and the typing of long messages happen
+outside it, so while one tab waits for Facebook the other tabs' commands run. Elements
+returned by a tab are proxied the same way, so `send_keys` on an element always reaches its
+own tab.
+
+Example:
+    >>> tabs = open_tabs(d, 3)
+    >>> with ThreadPoolExecutor(3) as pool:
+    ...     pool.map(lambda pair: post_message(pair[0], pair[1]), zip(tabs, categories))
+"""
+
+import re
+import threading
+import time
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.common.keys import Keys
+
+from src.webdriver import Driver
+from src.advertisement.facebook.browser_profile import apply_to_tab
+
+POLL_INTERVAL: float = 0.25
+TYPE_CHUNK: int = 64  # <- символов длинного сообщения за один захват сессии
+MESSAGE_STEP: str = '%EXTERNAL_MESSAGE%'
+PAUSE_STEP = re.compile(r"pause\((\d+(?:\.\d+)?)\)$")
+
+
+class _Session:
+    """ State shared by the tabs of one browser: the command lock and the active tab. """
+
+    def __init__(self, d: Driver):
+        self.d = d
+        self.lock = threading.RLock()
+        self.active_handle: str = d.current_window_handle
+
+    def activate(self, handle: str):
+        """ Switches to the tab; must be called with the lock held. """
+        if self.active_handle != handle:
+            self.d.switch_to.window(handle)
+            self.active_handle = handle
+
+
+class _ElementProxy:
+    """ WebElement of a tab; method calls run under the session lock in that tab. """
+    __slots__ = ('_element', '_tab')
+
+    def __init__(self, element, tab: 'TabDriver'):
+        self._element = element
+        self._tab = tab
+
+    def __getattr__(self, name: str):
+        with self._tab._locked():
+            attr = getattr(self._element, name)
+        if not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            with self._tab._locked():
+                return self._tab._wrap(attr(*args, **kwargs))
+        return call
+
+    def __eq__(self, other) -> bool:
+        return self._element == getattr(other, '_element', other)
+
+    def __hash__(self) -> int:
+        return hash(self._element)
+
+
+class TabDriver:
+    """ Driver proxy bound to one browser tab. """
+    wait_slice: float = 1.0  # <- `waits.observe` держит сессию не дольше секунды за вызов
+
+    def __init__(self, session: _Session, handle: str):
+        self._session = session
+        self.handle = handle
+
+    @contextmanager
+    def _locked(self):
+        """ Holds the session lock with this tab active. """
+        with self._session.lock:
+            self._session.activate(self.handle)
+            yield
+
+    def _wrap(self, result):
+        """ Wraps elements (single or in lists) returned from the session into tab proxies. """
+        if isinstance(result, list):
+            return [self._wrap(item) for item in result]
+        if hasattr(result, 'send_keys') and hasattr(result, 'tag_name') and not isinstance(result, _ElementProxy):
+            return _ElementProxy(result, self)
+        return result
+
+    def __getattr__(self, name: str):
+        with self._locked():
+            attr = getattr(self._session.d, name)
+        if not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            args = [arg._element if isinstance(arg, _ElementProxy) else arg for arg in args]  # <- элементы в execute_script
+            with self._locked():
+                return self._wrap(attr(*args, **kwargs))
+        return call
+
+    def wait(self, seconds: float):
+        """ Sleeps without holding the session, letting the other tabs run. """
+        time.sleep(seconds)
+
+    @contextmanager
+    def _load_slice(self):
+        """ Holds the session lock with the page load timeout cut to `wait_slice`.
+
+        Commands to a loading tab wait for the load; with the short timeout they give the
+        session back instead of holding it for the whole load.
+        """
+        with self._locked():
+            d = self._session.d
+            page_load = d.timeouts.page_load
+            d.set_page_load_timeout(self.wait_slice)
+            try:
+                yield d
+            except TimeoutException:
+                pass
+            finally:
+                d.set_page_load_timeout(page_load)
+
+    def get_url(self, url: str, timeout: float = 60) -> bool:
+        """ Starts loading `url` under the session lock and waits for the page outside it.
+
+        Returns:
+            bool: `True` if the page finished loading within `timeout`.
+        """
+        with self._load_slice() as d:
+            d.get(url)
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            loaded = False
+            with self._load_slice() as d:
+                loaded = d.execute_script("return document.readyState") == 'complete'
+            if loaded:
+                return True
+            time.sleep(POLL_INTERVAL)
+        return False
+
+    def _xpath(self, locator: SimpleNamespace) -> str | None:
+        """ Selector of an XPath locator; `None` for other locators. """
+        selector = getattr(locator, 'selector', None)
+        if str(getattr(locator, 'by', '')).upper() != 'XPATH' or not isinstance(selector, str):
+            return None
+        return selector
+
+    def _present(self, locator: SimpleNamespace) -> bool | None:
+        """ Quick presence check of an XPath locator; `None` if the locator cannot be checked this way. """
+        selector = self._xpath(locator)
+        if not selector:
+            return None
+        with self._locked():
+            return bool(self._session.d.find_elements(By.XPATH, selector))
+
+    def _event_steps(self, locator: SimpleNamespace) -> list[str] | None:
+        """ Steps of the locator `event` (`click();pause(1);%EXTERNAL_MESSAGE%`), `None` unless every step
+        is one `_type` can run: `click()`, `clear()`, `pause(n)` and the message.
+        """
+        steps = [step.strip() for step in str(getattr(locator, 'event', None) or '').split(';') if step.strip()]
+        if MESSAGE_STEP not in steps:
+            return None
+        if any(step not in ('click()', 'clear()', MESSAGE_STEP) and not PAUSE_STEP.match(step) for step in steps):
+            return None
+        return steps
+
+    def _type(self, locator: SimpleNamespace, message: str) -> bool | None:
+        """ Runs the event of an XPath locator with a long message, typing it `TYPE_CHUNK` characters per lock.
+
+        The steps are those of `Driver.execute_locator`: `click()` and `clear()` run under the lock,
+        `pause(n)` sleeps without it, and in the message `;` is a line break (`SHIFT+ENTER`).
+
+        Returns:
+            bool | None: `True` once typed; `None` if the message is short, the locator is not XPath,
+                has other event steps, is not on the page or is a file input - the driver then executes it as usual.
+        """
+        selector = self._xpath(locator)
+        steps = self._event_steps(locator)
+        if not selector or not steps or not isinstance(message, str) or len(message) <= TYPE_CHUNK:
+            return None
+        with self._locked():
+            elements = self._session.d.find_elements(By.XPATH, selector)
+            if not elements or elements[0].get_attribute('type') == 'file':
+                return None  # <- путь к файлу передаётся одним вызовом
+            element = elements[0]
+        for step in steps:
+            pause = PAUSE_STEP.match(step)
+            if pause:
+                time.sleep(float(pause.group(1)))
+            elif step != MESSAGE_STEP:
+                with self._locked():
+                    element.click() if step == 'click()' else element.clear()
+            else:
+                for i, line in enumerate(message.split(';')):
+                    if i:
+                        with self._locked():
+                            element.send_keys(Keys.SHIFT + Keys.ENTER)
+                    for start in range(0, len(line), TYPE_CHUNK):
+                        with self._locked():
+                            element.send_keys(line[start:start + TYPE_CHUNK])
+        return True
+
+    def execute_locator(self, locator: SimpleNamespace, message: str = None, timeout: float = 0, **kwargs):
+        """ Polls for the locator outside the session lock, then executes it in short locked steps. """
+        if timeout:
+            deadline = time.monotonic() + timeout
+            while self._present(locator) is False and time.monotonic() < deadline:
+                time.sleep(POLL_INTERVAL)
+            if self._present(locator) is not None:
+                timeout = 0  # <- элемент уже на странице (или время вышло): не ждём под блокировкой
+        if message and self._type(locator, message):
+            return True
+        if message is not None:
+            kwargs['message'] = message  # <- `execute_locator(locator, message)`, как у `Driver`
+        with self._locked():
+            return self._wrap(self._session.d.execute_locator(locator=locator, timeout=timeout, **kwargs))
+
+    def close_tab(self):
+        """ Closes the tab and returns the session to another open tab. """
+        with self._locked():
+            d = self._session.d
+            d.close()
+            handle = d.window_handles[0]
+            d.switch_to.window(handle)
+            self._session.active_handle = handle
+
+
+def open_tabs(d: Driver, count: int) -> list[TabDriver]:
+    """ Opens `count - 1` new tabs next to the current one and returns drivers for all `count` tabs.
+
+    If the light profile was applied to `d` (`browser_profile.apply_light_profile`), every new tab gets it too.
+    """
+    session = _Session(d)
+    handles = [session.active_handle]
+    patterns = getattr(d, 'blocked_url_patterns', None)
+    with session.lock:
+        for _ in range(count - 1):
+            d.switch_to.new_window('tab')
+            handles.append(d.current_window_handle)
+            if patterns:
+                apply_to_tab(d, patterns)
+        d.switch_to.window(handles[0])
+        session.active_handle = handles[0]
+    return [TabDriver(session, handle) for handle in handles]
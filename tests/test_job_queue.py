@@ -0,0 +1,116 @@
+## \file ../src/advertisement/facebook/tests/test_job_queue.py
+# -*- coding: utf-8 -*-
+# /path/to/interpreter/python
+""" Job queue backends: SQLite in a temporary file, Redis on a `fakeredis` stand-in. """
+
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+from src.advertisement.facebook.job_queue import SQLiteJobQueue, RedisJobQueue, make_job
+from src.advertisement.facebook.models import PROMO_TIME_FORMAT
+
+GROUP_URL = 'https://fb/groups/1/'
+GROUP = {'language': 'RU', 'currency': 'ILS', 'interval': '24H'}
+
+
+@pytest.fixture(params=['sqlite', 'redis'])
+def make_queue(request, tmp_path):
+    def make(**kwargs):
+        if request.param == 'sqlite':
+            return SQLiteJobQueue(tmp_path / 'jobs.sqlite', **kwargs)
+        fakeredis = pytest.importorskip('fakeredis')
+        return RedisJobQueue(client=fakeredis.FakeRedis(decode_responses=True), **kwargs)
+    return make
+
+
+def jobs(*campaigns: str, group_url: str = GROUP_URL) -> list[dict]:
+    return [make_job(campaign_name, 'groups.json', group_url, dict(GROUP)) for campaign_name in campaigns]
+
+
+def test_enqueue_skips_active_duplicates(make_queue):
+    queue = make_queue()
+    assert queue.enqueue(jobs('c1', 'c2')) == 2
+    assert queue.enqueue(jobs('c1')) == 0
+
+
+def test_lease_ack_and_results(make_queue):
+    queue = make_queue()
+    queue.enqueue(jobs('c1'))
+    job = queue.lease('w1')
+    assert (job.campaign_name, job.group_url, job.attempts) == ('c1', GROUP_URL, 1)
+    assert queue.heartbeat(job.id, 'w1')
+    assert not queue.ack(job.id, 'w2', {'promoted': ['a']})
+    assert queue.ack(job.id, 'w1', {'promoted': ['a'], 'last_promo_sended': '19/10/26 10:00'})
+
+    pending = list(queue.pending_results())
+    assert [(p.id, p.result['promoted']) for p in pending] == [(job.id, ['a'])]
+    queue.mark_applied(job.id)
+    assert list(queue.pending_results()) == []
+
+
+def test_one_leased_job_per_group(make_queue):
+    queue = make_queue()
+    queue.enqueue(jobs('c1', 'c2') + jobs('c1', group_url='https://fb/groups/2/'))
+    first = queue.lease('w1')
+    second = queue.lease('w2')
+    assert first.group_url == GROUP_URL
+    assert second.group_url == 'https://fb/groups/2/'  # <- c2 той же группы ждёт
+    assert queue.lease('w3') is None
+
+    queue.ack(first.id, 'w1', {'promoted': ['a'], 'last_promo_sended': '19/10/26 10:00'})
+    third = queue.lease('w3')
+    assert (third.campaign_name, third.group_url) == ('c2', GROUP_URL)
+
+
+def test_last_promo_sended_is_latest_acknowledged_post(make_queue):
+    queue = make_queue()
+    queue.enqueue(jobs('c1', 'c2'))
+    job = queue.lease('w1')
+    queue.ack(job.id, 'w1', {'promoted': ['a'], 'last_promo_sended': '19/10/26 10:00'})
+    job = queue.lease('w1')
+    queue.ack(job.id, 'w1', {'promoted': [], 'last_promo_sended': '20/10/26 10:00'})  # <- ничего не опубликовано
+    assert queue.last_promo_sended(GROUP_URL) == '19/10/26 10:00'
+    assert queue.last_promo_sended('https://fb/groups/2/') is None
+
+
+def test_failed_attempts_end_in_failed_state(make_queue):
+    queue = make_queue(max_attempts=2)
+    queue.enqueue(jobs('c1'))
+    for _ in range(2):
+        job = queue.lease('w1')
+        assert queue.fail(job.id, 'w1', 'boom')
+    assert queue.lease('w1') is None
+
+
+def test_expired_lease_at_attempt_limit_is_not_retried(make_queue):
+    queue = make_queue(lease_seconds=0.05, max_attempts=2)
+    queue.enqueue(jobs('c1'))
+    assert queue.lease('w1').attempts == 1
+    time.sleep(0.1)  # <- воркер упал, не продлив аренду
+    assert queue.lease('w2').attempts == 2
+    time.sleep(0.1)
+    assert queue.lease('w3') is None
+    assert queue.stats().get('queued', 0) == 0
+
+
+def test_worker_keeps_interval_across_campaigns(make_queue, monkeypatch):
+    from src.advertisement.facebook.promoter import FacebookPromoter
+    from src.advertisement.facebook.models import Category
+
+    queue = make_queue()
+    queue.enqueue(jobs('c1', 'c2'))
+    promoter = FacebookPromoter(SimpleNamespace(), group_file_paths=['groups.json'])
+    monkeypatch.setattr(promoter, 'campaign_categories', lambda *args: [Category(category_name='a')])
+    posted = []
+
+    def promote(group, item, is_event=False, campaign_name=None):
+        posted.append(campaign_name)
+        group.last_promo_sended = datetime.now().strftime(PROMO_TIME_FORMAT)
+        return True
+
+    monkeypatch.setattr(promoter, 'promote', promote)
+    assert promoter.run_worker(queue, worker_id='w1') == 2
+    assert posted == ['c1']  # <- группа с интервалом 24H не получает второй пост для c2
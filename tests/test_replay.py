@@ -0,0 +1,42 @@
+## \file ../src/advertisement/facebook/tests/test_replay.py
+# -*- coding: utf-8 -*-
+# /path/to/interpreter/python
+""" Offline replay of `post_message` and `post_event` in headless Chrome against `ReplayServer`. """
+
+import pytest
+
+pytest.importorskip('selenium')
+
+from src.webdriver import Driver
+from src.advertisement.facebook.scenarios import locator_timeouts
+from src.advertisement.facebook.replay.bench import HeadlessChrome, run_replay
+
+
+@pytest.fixture(scope='module')
+def driver():
+    try:
+        d = Driver(HeadlessChrome)
+    except Exception as ex:
+        pytest.skip(f"Headless Chrome is not available: {ex}")
+    yield d
+    d.quit()
+
+
+def test_post_message_publishes(driver):
+    report = run_replay(driver, runs=1, scenarios=('post_message',))
+    assert report['runs']['post_message'] == {'ok': 1, 'failed': 0}
+    assert 'post_message.upload_media' in report['steps']
+
+
+def test_post_event_publishes_without_waiting_for_timeout(driver):
+    report = run_replay(driver, runs=1, scenarios=('post_event',))
+    assert report['runs']['post_event'] == {'ok': 1, 'failed': 0}
+    # форма закрывается после отправки: сценарий не ждёт 30 секунд её исчезновения
+    assert report['steps']['post_event.post_event']['median'] < 20
+
+
+def test_replay_keeps_locator_history(driver):
+    history, history_path = locator_timeouts.history, locator_timeouts.history_path
+    run_replay(driver, runs=1, scenarios=('post_event',))
+    assert locator_timeouts.history is history
+    assert locator_timeouts.history_path == history_path
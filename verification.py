@@ -0,0 +1,360 @@
+## \file ../src/advertisement/facebook/verification.py
+# -*- coding: utf-8 -*-
+# /path/to/interpreter/python
+"""
+Post-publish verification.
+
+`post_message` and `post_event` report success once `publish` is clicked; whether the post
+appeared, is waiting for admin approval or was dropped is not known at that point. The
+promoter only queues every published post (`VerificationQueue.add`) and moves on. A
+`Verifier` with its own browser session checks the queued posts later, at low priority:
+it looks for the first line of the post in the group's "my posted content" view, then in
+"my pending content"; an event is looked for on the group's events page. A check that lands
+on a login wall or on another page than the requested one says nothing about the post: the
+post stays queued and the check is not counted.
+
+`apply_verifications` writes the outcomes to the group files (`verified_posts`). A post
+that was not found is removed from `promoted_categories` / `promoted_events`, so the next
+run promotes the item again. A one-off run applies them once its workers exit; in daemon
+mode every promoter applies the outcomes of its own groups between cycles
+(`FacebookPromoter.apply_verifications`).
+
+    python -m src.advertisement.facebook.verification            # verify due posts, apply outcomes
+"""
+
+import argparse
+import os
+import re
+import sqlite3
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Callable, Iterator
+
+from src import gs
+from src.webdriver import Driver
+from src.utils import j_loads, j_dumps, get_filenames
+from src.logger import logger
+from src.advertisement.facebook.group_store import GroupStore, is_group_file
+from src.advertisement.facebook.promoted_items import PromotedItems, DEFAULT_MAX_ITEMS
+
+PUBLISHED: str = 'published'
+PENDING_REVIEW: str = 'pending_review'
+MISSING: str = 'missing'
+UNCHECKED: str = 'unchecked'  # <- результат проверки, не состояние поста: страница ничего не сказала
+
+# Первая строка поста (заголовок) ищется в тексте страницы без учёта регистра и пробелов.
+# `login` - страница входа, `elsewhere` - открылась не запрошенная страница.
+FIND_SCRIPT: str = """
+const [marker, path] = arguments;
+if (document.querySelector('input[name="pass"]') || location.pathname.includes('/login')) return 'login';
+if (!location.pathname.includes(path)) return 'elsewhere';
+const normalize = (value) => (value || '').replace(/\\s+/g, ' ').trim().toLowerCase();
+return normalize(document.body.innerText).includes(normalize(marker)) ? 'found' : 'page';
+"""
+
+
+def post_marker(text: str, length: int = 60) -> str:
+    """ First line of the post text, shortened: long posts are folded behind "See more".
+
+    Lines are split on `;` as well: `post_message.post_title` inserts `;` as a line break.
+    """
+    lines = [line.strip() for line in re.split(r'[;\n]', text or '') if line.strip()]
+    return lines[0][:length] if lines else ''
+
+
+class VerificationQueue:
+    """ Published posts waiting for verification, in a SQLite database.
+
+    Every operation opens its own short connection, as in `job_queue.SQLiteJobQueue`.
+    """
+
+    def __init__(self, path: str | Path = None):
+        """
+        Args:
+            path (str | Path, optional): Database file. Defaults to `data/facebook/verification.sqlite`.
+        """
+        self.path = Path(path) if path else gs.path.data / 'facebook' / 'verification.sqlite'
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS posts (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    group_url TEXT NOT NULL,
+                    item_name TEXT NOT NULL,
+                    is_event INTEGER NOT NULL DEFAULT 0,
+                    campaign_name TEXT,
+                    marker TEXT NOT NULL,
+                    published REAL NOT NULL,
+                    state TEXT NOT NULL DEFAULT 'queued',
+                    checks INTEGER NOT NULL DEFAULT 0,
+                    checked REAL,
+                    applied INTEGER NOT NULL DEFAULT 0
+                )""")
+            conn.execute("CREATE INDEX IF NOT EXISTS posts_state ON posts(state, published)")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def add(self, group_url: str, item_name: str, marker: str, is_event: bool = False, campaign_name: str = None):
+        """ Queues a post published just now. A post without text to look for is not queued. """
+        marker = post_marker(marker)
+        if not marker:
+            logger.debug(f"No post text to verify {item_name} in {group_url}", None, False)
+            return
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO posts (group_url, item_name, is_event, campaign_name, marker, published) VALUES (?, ?, ?, ?, ?, ?)",
+                (group_url, item_name, int(is_event), campaign_name, marker, time.time()))
+
+    def due(self, min_age: float, retry_after: float, limit: int = 50) -> list[SimpleNamespace]:
+        """ Queued posts published at least `min_age` seconds ago and not checked in the last `retry_after` seconds. """
+        now = time.time()
+        with self._connect() as conn:
+            rows = conn.execute(
+                """SELECT id, group_url, item_name, is_event, campaign_name, marker, checks FROM posts
+                   WHERE state = 'queued' AND published <= ? AND (checked IS NULL OR checked <= ?)
+                   ORDER BY published LIMIT ?""", (now - min_age, now - retry_after, limit)).fetchall()
+        keys = ('id', 'group_url', 'item_name', 'is_event', 'campaign_name', 'marker', 'checks')
+        return [SimpleNamespace(**dict(zip(keys, row))) for row in rows]
+
+    def record(self, post_id: int, state: str = None, counted: bool = True):
+        """ Records a check; `state` is the final outcome, `None` keeps the post queued for another check.
+
+        An inconclusive check (`counted=False`) only postpones the next check by `retry_after`.
+        """
+        with self._connect() as conn:
+            conn.execute("UPDATE posts SET state = COALESCE(?, state), checks = checks + ?, checked = ? WHERE id = ?",
+                         (state, int(counted), time.time(), post_id))
+
+    def pending_results(self) -> list[SimpleNamespace]:
+        """ Verified posts whose outcome was not written to the group files yet. """
+        with self._connect() as conn:
+            rows = conn.execute(
+                """SELECT id, group_url, item_name, is_event, state FROM posts
+                   WHERE state != 'queued' AND applied = 0 ORDER BY id""").fetchall()
+        return [SimpleNamespace(id=row[0], group_url=row[1], item_name=row[2], is_event=bool(row[3]), state=row[4]) for row in rows]
+
+    def mark_applied(self, post_ids: list[int]):
+        with self._connect() as conn:
+            conn.executemany("UPDATE posts SET applied = 1 WHERE id = ?", [(post_id,) for post_id in post_ids])
+
+    def stats(self) -> dict[str, int]:
+        """ Number of posts per state. """
+        with self._connect() as conn:
+            return dict(conn.execute("SELECT state, COUNT(*) FROM posts GROUP BY state").fetchall())
+
+
+class Verifier:
+    """ Checks queued posts in a browser session of its own.
+
+    Example:
+        >>> verifier = Verifier(Driver(Chrome), VerificationQueue())
+        >>> verifier.run_once()
+        >>> apply_verifications(verifier.queue)
+    """
+
+    def __init__(self, d: Driver, queue: VerificationQueue, min_age: float = 600, retry_after: float = 1800,
+                 max_checks: int = 3, page_checks: int = 3, recycler: 'DriverRecycler' = None):
+        """
+        Args:
+            d (Driver): Driver of the verifier, not shared with a promoter.
+            queue (VerificationQueue): Queue the promoters publish to.
+            min_age (float, optional): Seconds after publishing before the first check. Defaults to 600.
+            retry_after (float, optional): Seconds between checks of a post that was not found. Defaults to 1800.
+            max_checks (int, optional): Conclusive checks before a post that was not found is `missing`. Defaults to 3.
+            page_checks (int, optional): Looks at a loaded page before giving up on it (the feed loads lazily). Defaults to 3.
+            recycler (DriverRecycler, optional): Restores the saved promoter session when the verifier meets a login wall.
+        """
+        self.d = d
+        self.queue = queue
+        self.min_age = min_age
+        self.retry_after = retry_after
+        self.max_checks = max_checks
+        self.page_checks = page_checks
+        self.recycler = recycler
+        self.logged_out = False
+
+    def find(self, url: str, marker: str, path: str) -> bool | None:
+        """ Opens the page and looks for the post marker in its text.
+
+        Returns:
+            bool | None: `None` if the page is a login wall or not the page at `path`.
+        """
+        self.d.get_url(url)
+        for _ in range(self.page_checks):
+            state = self.d.execute_script(FIND_SCRIPT, marker, path)
+            if state == 'found':
+                return True
+            if state != 'page':
+                self.logged_out = state == 'login'
+                logger.debug(f"Verification page {url}: {state}", None, False)
+                return None
+            self.d.scroll(1, 1200, 'forward')
+            self.d.wait(2)
+        return False
+
+    def check(self, post: SimpleNamespace) -> str | None:
+        """ Outcome of one post: `published`, `pending_review`, `missing`, `None` to check again later,
+        or `UNCHECKED` if a page could not be checked.
+        """
+        group_url = post.group_url.rstrip('/')
+        if post.is_event:
+            pages = (('events', PUBLISHED),)  # <- мероприятия публикуются не в ленту группы
+        else:
+            pages = (('my_posted_content', PUBLISHED), ('my_pending_content', PENDING_REVIEW))
+        for path, state in pages:
+            found = self.find(f"{group_url}/{path}", post.marker, path)
+            if found is None:
+                return UNCHECKED
+            if found:
+                return state
+        return MISSING if post.checks + 1 >= self.max_checks else None
+
+    def run_once(self, stop=None) -> int:
+        """ Checks the posts that are due, until `stop` (an `Event`) is set.
+
+        Returns:
+            int: Number of posts checked.
+        """
+        posts = self.queue.due(self.min_age, self.retry_after)
+        for post in posts:
+            if stop and stop.is_set():
+                break
+            try:
+                state = self.check(post)
+            except Exception as ex:
+                logger.error(f"Verification of {post.item_name} in {post.group_url} failed", ex)
+                state = UNCHECKED
+            if state == UNCHECKED:
+                self.queue.record(post.id, counted=False)
+            else:
+                self.queue.record(post.id, state)
+            logger.debug(f"{post.group_url} {post.item_name}: {state or 'not found yet'}", None, False)
+            if self.logged_out:
+                # Остальные посты ждут следующего прохода: без сессии каждая проверка впустую
+                logger.warning("Verifier is not logged in to Facebook, restoring the promoter session")
+                if self.recycler:
+                    self.recycler.restore_cookies(self.d)
+                self.logged_out = False
+                break
+        return len(posts)  # <- не проверенные из-за `stop` остаются в очереди
+
+    def run(self, stop=None, poll_interval: float = 60):
+        """ Checks due posts until `stop` (an `Event`) is set. """
+        while not (stop and stop.is_set()):
+            if not self.run_once(stop):
+                if stop:
+                    stop.wait(poll_interval)
+                else:
+                    time.sleep(poll_interval)
+
+
+def apply_verifications(queue: VerificationQueue, group_file_paths: list[str] = None, max_items: int = DEFAULT_MAX_ITEMS,
+                        select: Callable[[str], bool] = None) -> int:
+    """ Writes verification outcomes to the group files.
+
+    The outcome is kept per group in `verified_posts` (`{item_name: state}`, at most `max_items`).
+    A `missing` post is dropped from the promoted items of the group so that it is promoted again.
+    Run it while no promoter writes the groups it applies, as `job_queue.apply_results`.
+
+    Args:
+        queue (VerificationQueue): Queue with the checked posts.
+        group_file_paths (list[str], optional): Group files to update. Defaults to every group file.
+        max_items (int, optional): Outcomes kept per group. Defaults to `DEFAULT_MAX_ITEMS`.
+        select (Callable[[str], bool], optional): Applies only the outcomes of the group URLs it accepts,
+            the others stay in the queue. Defaults to all groups.
+
+    Returns:
+        int: Number of outcomes applied.
+    """
+    results = [result for result in queue.pending_results() if not select or select(result.group_url)]
+    if not results:
+        return 0
+    by_group: dict[str, list[SimpleNamespace]] = {}
+    for result in results:
+        by_group.setdefault(result.group_url, []).append(result)
+
+    def apply(group: dict, outcomes: list[SimpleNamespace]) -> dict:
+        verified = dict(group.get('verified_posts') or {})
+        for outcome in outcomes:
+            verified.pop(outcome.item_name, None)  # <- порядок вставки = порядок проверок
+            verified[outcome.item_name] = outcome.state
+            if outcome.state == MISSING and group.get('promoted_events' if outcome.is_event else 'promoted_categories'):
+                attr = 'promoted_events' if outcome.is_event else 'promoted_categories'
+                promoted = PromotedItems.coerce(group.get(attr), legacy_time=group.get('last_promo_sended'))
+                promoted.pop(outcome.item_name, None)
+                group[attr] = dict(promoted)
+        group['verified_posts'] = dict(list(verified.items())[-max_items:])
+        return group
+
+    group_dir = gs.path.data / 'facebook' / 'groups'
+    files = group_file_paths or [f for f in get_filenames(group_dir) if is_group_file(f)]
+    for group_file in files:
+        path = group_dir / group_file
+        if path.suffix == '.jsonl':
+            store = GroupStore(path)
+            for group_url, group in list(store.items(as_ns=False)):
+                if group_url in by_group:
+                    store.update(group_url, apply(group, by_group[group_url]))
+            continue
+        groups: dict = j_loads(path) or {}
+        matched = [group_url for group_url in groups if group_url in by_group]
+        for group_url in matched:
+            groups[group_url] = apply(groups[group_url], by_group[group_url])
+        if matched:
+            j_dumps(groups, path)
+
+    queue.mark_applied([result.id for result in results])
+    logger.info(f"Applied {len(results)} verification outcomes at {datetime.now():%d/%m/%y %H:%M}")
+    return len(results)
+
+
+def verifier_session() -> 'DriverRecycler':
+    """ Session of the verifier: the cookies saved by the first promoter worker (`shard_0.json`). """
+    from src.advertisement.facebook.driver_recycler import DriverRecycler
+    return DriverRecycler(cookies_path=gs.path.tmp / 'facebook_cookies' / 'shard_0.json')
+
+
+def verifier_driver(session: 'DriverRecycler' = None) -> Driver:
+    """ Own browser of the verifier, logged in with the saved session of the first promoter worker. """
+    return (session or verifier_session()).start()
+
+
+def run_verifier(stop=None):
+    """ Process entry of `cli --verify`: a low-priority verifier next to the promoter workers. """
+    if hasattr(os, 'nice'):
+        os.nice(10)
+    session = verifier_session()
+    d = verifier_driver(session)
+    try:
+        Verifier(d, VerificationQueue(), recycler=session).run(stop)
+    finally:
+        d.quit()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Verify published Facebook posts and write the outcomes to the group files")
+    parser.add_argument('--db', type=Path, help="Verification database. Defaults to data/facebook/verification.sqlite")
+    parser.add_argument('--min-age', type=float, default=600, help="Seconds after publishing before the first check")
+    parser.add_argument('--apply-only', action='store_true', help="Only write verified outcomes to the group files")
+    args = parser.parse_args()
+
+    queue = VerificationQueue(args.db)
+    if not args.apply_only:
+        session = verifier_session()
+        d = verifier_driver(session)
+        try:
+            Verifier(d, queue, min_age=args.min_age, recycler=session).run_once()
+        finally:
+            d.quit()
+    apply_verifications(queue)
+    print(queue.stats())